@@ -0,0 +1,12 @@
+from django.contrib import admin
+from .models import ClientCohortStat
+
+
+@admin.register(ClientCohortStat)
+class ClientCohortStatAdmin(admin.ModelAdmin):
+    list_display = (
+        'cohort_month', 'source', 'clients_count', 'ordered_clients_count',
+        'completed_clients_count', 'orders_count', 'completed_orders_count', 'revenue'
+    )
+    list_filter = ('source',)
+    date_hierarchy = 'cohort_month'
@@ -0,0 +1,179 @@
+# analytics/cohorts.py
+"""
+Когортная аналитика привлечения клиентов.
+
+Частые события (новый клиент, новый заказ, смена статуса, изменение суммы)
+меняют строку когорты атомарными F()-приращениями. Редкие события
+(удаление, смена источника клиента, перенос заказа) пересчитывают только
+затронутые строки агрегирующим запросом.
+"""
+from datetime import date, datetime, time
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from customer_clients.models import Client
+from orders.models import Order
+from .models import ClientCohortStat
+
+COUNTER_FIELDS = (
+    'clients_count', 'ordered_clients_count', 'completed_clients_count',
+    'orders_count', 'completed_orders_count', 'revenue',
+)
+
+
+def cohort_month_of(created_at):
+    """Месяц когорты в текущем часовом поясе (совпадает с TruncMonth)"""
+    local = timezone.localtime(created_at) if timezone.is_aware(created_at) else created_at
+    return local.date().replace(day=1)
+
+
+def _as_date(month):
+    return month.date() if isinstance(month, datetime) else month
+
+
+def apply_cohort_delta(cohort_month, source, **deltas):
+    """Атомарно прибавляет приращения к строке когорты, создавая ее при необходимости"""
+    deltas = {field: value for field, value in deltas.items() if value}
+    if not deltas:
+        return
+
+    updates = {field: F(field) + value for field, value in deltas.items()}
+    rows = ClientCohortStat.objects.filter(cohort_month=cohort_month, source=source)
+
+    if rows.update(**updates):
+        return
+
+    try:
+        with transaction.atomic():
+            ClientCohortStat.objects.create(cohort_month=cohort_month, source=source, **deltas)
+    except IntegrityError:
+        # Строку успел создать параллельный запрос
+        rows.update(**updates)
+
+
+def _aggregate_cohorts(**client_lookups):
+    """
+    Считает строки когорт двумя агрегирующими запросами.
+    client_lookups - необязательные фильтры по полям клиента.
+    Возвращает {(cohort_month, source): {поле: значение}}
+    """
+    completed = Q(status='completed')
+    order_lookups = {f'client__{lookup}': value for lookup, value in client_lookups.items()}
+
+    result = {}
+
+    clients = Client.objects.filter(**client_lookups).annotate(
+        month=TruncMonth('created_at')
+    ).values('month', 'source').annotate(total=Count('id'))
+
+    for row in clients:
+        key = (_as_date(row['month']), row['source'])
+        result[key] = dict.fromkeys(COUNTER_FIELDS, 0)
+        result[key]['revenue'] = Decimal('0')
+        result[key]['clients_count'] = row['total']
+
+    orders = Order.objects.filter(**order_lookups).annotate(
+        month=TruncMonth('client__created_at')
+    ).values('month', 'client__source').annotate(
+        orders=Count('id'),
+        completed_orders=Count('id', filter=completed),
+        ordered_clients=Count('client', distinct=True),
+        completed_clients=Count('client', distinct=True, filter=completed),
+        revenue=Sum('total_cost', filter=completed),
+    )
+
+    for row in orders:
+        key = (_as_date(row['month']), row['client__source'])
+        stats = result.setdefault(key, {**dict.fromkeys(COUNTER_FIELDS, 0), 'revenue': Decimal('0')})
+        stats['orders_count'] = row['orders']
+        stats['completed_orders_count'] = row['completed_orders']
+        stats['ordered_clients_count'] = row['ordered_clients']
+        stats['completed_clients_count'] = row['completed_clients']
+        stats['revenue'] = row['revenue'] or Decimal('0')
+
+    return result
+
+
+def recompute_cohort(cohort_month, source):
+    """Полный пересчет одной строки когорты"""
+    next_month = date(cohort_month.year + cohort_month.month // 12, cohort_month.month % 12 + 1, 1)
+    stats = _aggregate_cohorts(
+        created_at__gte=timezone.make_aware(datetime.combine(cohort_month, time.min)),
+        created_at__lt=timezone.make_aware(datetime.combine(next_month, time.min)),
+        source=source,
+    ).get((cohort_month, source))
+
+    if not stats or not stats['clients_count']:
+        ClientCohortStat.objects.filter(cohort_month=cohort_month, source=source).delete()
+        return
+
+    ClientCohortStat.objects.update_or_create(
+        cohort_month=cohort_month, source=source, defaults=stats
+    )
+
+
+@transaction.atomic
+def rebuild_cohorts():
+    """Полная перестройка таблицы когорт. Возвращает количество строк"""
+    stats = _aggregate_cohorts()
+    ClientCohortStat.objects.all().delete()
+    ClientCohortStat.objects.bulk_create([
+        ClientCohortStat(cohort_month=month, source=source, **values)
+        for (month, source), values in stats.items()
+    ])
+    return len(stats)
+
+
+def get_cohort_matrix(months=24):
+    """
+    Матрица когорт за последние months месяцев одним запросом.
+    Строки - месяцы когорт, внутри - разбивка по источникам и итог.
+    """
+    today = timezone.localdate()
+    month_index = today.year * 12 + today.month - 1 - (months - 1)
+    start_month = date(month_index // 12, month_index % 12 + 1, 1)
+
+    rows = ClientCohortStat.objects.filter(cohort_month__gte=start_month).values(
+        'cohort_month', 'source', *COUNTER_FIELDS
+    )
+    source_labels = dict(Client.SOURCE_CHOICES)
+
+    cohorts = {}
+    for row in rows:
+        cohort = cohorts.setdefault(row['cohort_month'], {
+            'cohort': row['cohort_month'].strftime('%Y-%m'),
+            'sources': [],
+            'total': {**dict.fromkeys(COUNTER_FIELDS, 0), 'revenue': Decimal('0')},
+        })
+        cohort['sources'].append(_funnel_row(row, source=row['source'],
+                                             source_display=source_labels.get(row['source'], row['source'])))
+        for field in COUNTER_FIELDS:
+            cohort['total'][field] += row[field]
+
+    result = []
+    for month in sorted(cohorts):
+        cohort = cohorts[month]
+        cohort['total'] = _funnel_row(cohort['total'])
+        result.append(cohort)
+    return result
+
+
+def _funnel_row(values, **extra):
+    clients = values['clients_count'] or 0
+    ordered = values['ordered_clients_count'] or 0
+    return {
+        **extra,
+        'clients': clients,
+        'ordered_clients': ordered,
+        'completed_clients': values['completed_clients_count'],
+        'orders': values['orders_count'],
+        'completed_orders': values['completed_orders_count'],
+        'revenue': float(values['revenue'] or 0),
+        'order_conversion': round(ordered / clients * 100, 1) if clients else 0,
+        'completion_conversion': round(values['completed_clients_count'] / clients * 100, 1) if clients else 0,
+        'revenue_per_client': round(float(values['revenue'] or 0) / clients, 2) if clients else 0,
+    }
@@ -0,0 +1,277 @@
+# analytics/lead_time.py
+"""
+Аналитика сроков выполнения заказов по журналу OrderStatusEvent.
+
+История загружается одним запросом в компактные массивы NumPy
+(id заказа, код статуса, время в секундах), все длительности и
+перцентили считаются векторно, без цикла по заказам.
+"""
+import numpy as np
+from django.utils import timezone
+
+from customer_clients.models import Client
+from orders.models import Order, OrderStatusEvent
+from user_accounts.models import User
+
+STATUS_CODES = [code for code, _ in Order.STATUS_CHOICES]
+STATUS_INDEX = {code: index for index, code in enumerate(STATUS_CODES)}
+COMPLETED = STATUS_INDEX['completed']
+
+PERCENTILES = (50, 75, 90, 95)
+AGING_BUCKETS_DAYS = (1, 3, 7, 14, 30)
+HOUR = 3600.0
+
+
+def _order_filters(start_date=None, end_date=None, prefix=''):
+    """Фильтр по дате создания заказа"""
+    filters = {}
+    if start_date:
+        filters[f'{prefix}created_at__date__gte'] = start_date
+    if end_date:
+        filters[f'{prefix}created_at__date__lte'] = end_date
+    return filters
+
+
+def _history_arrays(events):
+    """Переводит журнал (order_id, to_status, created_at) в массивы NumPy"""
+    rows = list(events.order_by('order_id', 'created_at', 'id').values_list(
+        'order_id', 'to_status', 'created_at'
+    ))
+    order_ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+    statuses = np.fromiter((STATUS_INDEX[row[1]] for row in rows), dtype=np.int8, count=len(rows))
+    timestamps = np.fromiter((row[2].timestamp() for row in rows), dtype=np.float64, count=len(rows))
+    return order_ids, statuses, timestamps
+
+
+def load_status_history(start_date=None, end_date=None):
+    """
+    Загружает журнал статусов в массивы, отсортированные по (заказ, время).
+    Фильтр по дате создания заказа.
+    """
+    return _history_arrays(OrderStatusEvent.objects.filter(
+        **_order_filters(start_date, end_date, prefix='order__')
+    ))
+
+
+def _lookup(sorted_keys, values, queries):
+    """Значения по ключам (NaN для отсутствующих) через бинарный поиск"""
+    result = np.full(len(queries), np.nan)
+    if not len(sorted_keys):
+        return result
+    position = np.minimum(np.searchsorted(sorted_keys, queries), len(sorted_keys) - 1)
+    found = sorted_keys[position] == queries
+    result[found] = values[position[found]]
+    return result
+
+
+def grouped_percentiles(groups, values, percentiles=PERCENTILES):
+    """
+    Перцентили values внутри каждой группы (линейная интерполяция, как np.percentile).
+    Возвращает (группы, количество, среднее, матрица [группа × перцентиль]).
+    """
+    if not len(values):
+        return groups[:0], np.zeros(0, dtype=np.int64), np.zeros(0), np.zeros((0, len(percentiles)))
+
+    order = np.lexsort((values, groups))
+    sorted_groups = groups[order]
+    sorted_values = values[order]
+
+    unique_groups, starts, counts = np.unique(sorted_groups, return_index=True, return_counts=True)
+    means = np.add.reduceat(sorted_values, starts) / counts
+
+    positions = starts[:, None] + (counts[:, None] - 1) * (np.asarray(percentiles) / 100.0)[None, :]
+    lower = np.floor(positions).astype(np.int64)
+    upper = np.minimum(lower + 1, (starts + counts - 1)[:, None])
+    weight = positions - lower
+    result = sorted_values[lower] * (1 - weight) + sorted_values[upper] * weight
+
+    return unique_groups, counts, means, result
+
+
+def _segment_durations(order_ids, statuses, timestamps, now_ts):
+    """
+    Длительность пребывания в каждом статусе.
+    Последний статус открытого заказа длится до текущего момента,
+    у завершенного заказа финальный статус длительности не имеет.
+    """
+    same_order_next = np.zeros(len(order_ids), dtype=bool)
+    same_order_next[:-1] = order_ids[1:] == order_ids[:-1]
+
+    next_ts = np.empty_like(timestamps)
+    next_ts[:-1] = timestamps[1:]
+    next_ts[-1:] = now_ts
+    durations = np.where(same_order_next, next_ts, now_ts) - timestamps
+
+    valid = same_order_next | (statuses != COMPLETED)
+    return statuses[valid], durations[valid]
+
+
+def get_status_durations(start_date=None, end_date=None):
+    """Время, проведенное заказами в каждом статусе (часы)"""
+    order_ids, statuses, timestamps = load_status_history(start_date, end_date)
+    if not len(order_ids):
+        return []
+
+    status_codes, durations = _segment_durations(
+        order_ids, statuses, timestamps, timezone.now().timestamp()
+    )
+    groups, counts, means, values = grouped_percentiles(status_codes, durations / HOUR)
+    labels = dict(Order.STATUS_CHOICES)
+
+    return [
+        {
+            'status': STATUS_CODES[group],
+            'status_display': labels[STATUS_CODES[group]],
+            'count': int(count),
+            'avg_hours': round(float(mean), 2),
+            **_percentile_fields(row),
+        }
+        for group, count, mean, row in zip(groups, counts, means, values)
+    ]
+
+
+def _first_event_ts(order_ids, statuses, timestamps, status_code):
+    """Время первого перехода каждого заказа в status_code: (заказы, время)"""
+    mask = statuses == status_code
+    ids, first = np.unique(order_ids[mask], return_index=True)
+    return ids, timestamps[mask][first]
+
+
+def get_lead_times(start_date=None, end_date=None):
+    """
+    Перцентили сроков выполнения завершенных заказов по менеджерам
+    и источникам клиентов: создание → начало работ → завершение (часы).
+    """
+    order_ids, statuses, timestamps = load_status_history(start_date, end_date)
+
+    unique_ids, first_index = np.unique(order_ids, return_index=True)
+    completed_ids, completed_ts = _first_event_ts(order_ids, statuses, timestamps, COMPLETED)
+    started_ids, started_ts = _first_event_ts(order_ids, statuses, timestamps, STATUS_INDEX['in_progress'])
+
+    # Менеджер и источник клиента для завершенных заказов
+    source_codes = [code for code, _ in Client.SOURCE_CHOICES]
+    attributes = sorted(Order.objects.filter(
+        status='completed', **_order_filters(start_date, end_date)
+    ).values_list('id', 'manager_id', 'client__source'))
+    attr_ids = np.fromiter((row[0] for row in attributes), dtype=np.int64, count=len(attributes))
+    attr_managers = np.fromiter((row[1] for row in attributes), dtype=np.float64, count=len(attributes))
+    attr_sources = np.fromiter((source_codes.index(row[2]) if row[2] in source_codes else -1
+                                for row in attributes), dtype=np.float64, count=len(attributes))
+
+    created_ts = _lookup(unique_ids, timestamps[first_index], completed_ids)
+    managers = _lookup(attr_ids, attr_managers, completed_ids)
+    sources = _lookup(attr_ids, attr_sources, completed_ids)
+
+    # Заказы, вернувшиеся из 'completed' в работу, не учитываем
+    known = ~np.isnan(managers)
+    lead = (completed_ts - created_ts)[known] / HOUR
+    to_start = (_lookup(started_ids, started_ts, completed_ids) - created_ts)[known] / HOUR
+    managers = managers[known].astype(np.int64)
+    sources = sources[known].astype(np.int64)
+
+    manager_names = {
+        user['id']: f"{user['first_name']} {user['last_name']}".strip() or user['username']
+        for user in User.objects.filter(id__in=np.unique(managers).tolist()).values(
+            'id', 'first_name', 'last_name', 'username'
+        )
+    }
+    source_labels = dict(Client.SOURCE_CHOICES)
+
+    def breakdown(groups, label):
+        unique_groups, counts, means, values = grouped_percentiles(groups, lead)
+        has_start = ~np.isnan(to_start)
+        start_groups, _, start_means, _ = grouped_percentiles(groups[has_start], to_start[has_start])
+        start_avg = dict(zip(start_groups.tolist(), start_means.tolist()))
+
+        return [
+            {
+                **label(group),
+                'orders': int(count),
+                'avg_hours': round(float(mean), 2),
+                'avg_hours_to_start': round(start_avg[group], 2) if group in start_avg else None,
+                **_percentile_fields(row),
+            }
+            for group, count, mean, row in zip(unique_groups.tolist(), counts, means, values)
+        ]
+
+    _, total_count, total_mean, total_values = grouped_percentiles(np.zeros(len(lead), dtype=np.int64), lead)
+
+    return {
+        'total': {
+            'orders': int(total_count[0]),
+            'avg_hours': round(float(total_mean[0]), 2),
+            **_percentile_fields(total_values[0]),
+        } if len(lead) else None,
+        'by_manager': breakdown(managers, lambda group: {
+            'manager_id': group,
+            'manager_name': manager_names.get(group, ''),
+        }),
+        'by_source': breakdown(sources, lambda group: {
+            'source': source_codes[group] if group >= 0 else None,
+            'source_display': source_labels.get(source_codes[group], '') if group >= 0 else '',
+        }),
+    }
+
+
+def get_open_orders_aging(limit=10):
+    """Возраст открытых заказов и время в текущем статусе по корзинам дней"""
+    now_ts = timezone.now().timestamp()
+    rows = list(Order.objects.exclude(status='completed').values_list('id', 'status', 'created_at'))
+    if not rows:
+        return {'open_orders': 0, 'by_status': [], 'oldest': []}
+
+    ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+    statuses = np.fromiter((STATUS_INDEX[row[1]] for row in rows), dtype=np.int8, count=len(rows))
+    ages = (now_ts - np.fromiter((row[2].timestamp() for row in rows), dtype=np.float64, count=len(rows))) / 86400.0
+
+    # Время последнего перехода каждого открытого заказа
+    event_ids, _, event_ts = _history_arrays(
+        OrderStatusEvent.objects.exclude(order__status='completed')
+    )
+    if len(event_ids):
+        last = np.append(np.flatnonzero(event_ids[1:] != event_ids[:-1]), len(event_ids) - 1)
+        event_ids, event_ts = event_ids[last], event_ts[last]
+
+    sort = np.argsort(ids)
+    ids, statuses, ages = ids[sort], statuses[sort], ages[sort]
+    in_status = _lookup(event_ids, (now_ts - event_ts) / 86400.0, ids)
+    in_status = np.where(np.isnan(in_status), ages, in_status)
+
+    edges = np.asarray(AGING_BUCKETS_DAYS, dtype=np.float64)
+    bucket_labels = [f'<{AGING_BUCKETS_DAYS[0]}д'] + [
+        f'{low}-{high}д' for low, high in zip(AGING_BUCKETS_DAYS, AGING_BUCKETS_DAYS[1:])
+    ] + [f'{AGING_BUCKETS_DAYS[-1]}+д']
+    buckets = np.digitize(ages, edges)
+    labels = dict(Order.STATUS_CHOICES)
+
+    by_status = []
+    for code in np.unique(statuses).tolist():
+        mask = statuses == code
+        counts = np.bincount(buckets[mask], minlength=len(bucket_labels))
+        by_status.append({
+            'status': STATUS_CODES[code],
+            'status_display': labels[STATUS_CODES[code]],
+            'count': int(mask.sum()),
+            'avg_age_days': round(float(ages[mask].mean()), 1),
+            'avg_days_in_status': round(float(in_status[mask].mean()), 1),
+            'buckets': dict(zip(bucket_labels, counts.tolist())),
+        })
+
+    oldest = np.argsort(-ages)[:limit]
+    return {
+        'open_orders': len(ids),
+        'by_status': by_status,
+        'oldest': [
+            {
+                'order_id': int(ids[i]),
+                'status': STATUS_CODES[statuses[i]],
+                'age_days': round(float(ages[i]), 1),
+                'days_in_status': round(float(in_status[i]), 1),
+            }
+            for i in oldest
+        ],
+    }
+
+
+def _percentile_fields(row):
+    return {f'p{percentile}_hours': round(float(value), 2) for percentile, value in zip(PERCENTILES, row)}
@@ -0,0 +1,209 @@
+# analytics/live.py
+"""
+Живые обновления дашборда через Server-Sent Events.
+
+Изменения заказов, клиентов и транзакций публикуются как инкрементальные
+дельты метрик. Брокер выбирается через настройку LIVE_DASHBOARD:
+'redis' - общий канал для нескольких воркеров, 'local' - очередь
+внутри процесса для однонодовой установки. Номер события (поле id: SSE)
+выдает брокер: у Redis - общий счетчик INCR, поэтому номера не
+повторяются между воркерами.
+"""
+import asyncio
+import json
+import logging
+import threading
+from itertools import count
+
+from django.conf import settings
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+# Специальное сообщение: очередь подписчика переполнилась, нужен новый снимок
+RESYNC_MESSAGE = {'type': 'resync'}
+
+
+class LocalSubscription:
+    """Подписка на локальный брокер, читается из event loop ASGI-воркера"""
+
+    def __init__(self, broker, max_queue_size):
+        self._broker = broker
+        self._max_queue_size = max_queue_size
+        self._loop = None
+        self._queue = None
+
+    async def open(self):
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(maxsize=self._max_queue_size)
+        self._broker._add(self)
+
+    def deliver(self, message):
+        """Вызывается из потока публикации"""
+        if self._loop is None or self._loop.is_closed():
+            return
+        self._loop.call_soon_threadsafe(self._put, message)
+
+    def _put(self, message):
+        if self._queue.full():
+            # Медленный клиент: сбрасываем накопленные дельты и просим снимок
+            while not self._queue.empty():
+                self._queue.get_nowait()
+            message = RESYNC_MESSAGE
+        self._queue.put_nowait(message)
+
+    async def get(self, timeout):
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def close(self):
+        self._broker._remove(self)
+
+
+class LocalBroker:
+    """Pub/sub внутри процесса (для одной ноды)"""
+
+    def __init__(self, max_queue_size=100):
+        self.max_queue_size = max_queue_size
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._event_ids = count(1)
+
+    def _add(self, subscription):
+        with self._lock:
+            self._subscribers.add(subscription)
+
+    def _remove(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    @property
+    def subscribers_count(self):
+        return len(self._subscribers)
+
+    def publish(self, message):
+        with self._lock:
+            message['id'] = next(self._event_ids)
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            subscription.deliver(message)
+
+    def subscribe(self):
+        return LocalSubscription(self, self.max_queue_size)
+
+
+class RedisSubscription:
+    """Подписка на канал Redis через асинхронный клиент"""
+
+    def __init__(self, url, channel):
+        self._url = url
+        self._channel = channel
+        self._client = None
+        self._pubsub = None
+
+    async def open(self):
+        import redis.asyncio as aioredis
+
+        self._client = aioredis.from_url(self._url)
+        self._pubsub = self._client.pubsub()
+        await self._pubsub.subscribe(self._channel)
+
+    async def get(self, timeout):
+        message = await self._pubsub.get_message(ignore_subscribe_messages=True, timeout=timeout)
+        if not message:
+            return None
+        return json.loads(message['data'])
+
+    async def close(self):
+        if self._pubsub is not None:
+            await self._pubsub.unsubscribe(self._channel)
+            await self._pubsub.aclose()
+        if self._client is not None:
+            await self._client.aclose()
+
+
+class RedisBroker:
+    """Pub/sub через Redis для нескольких воркеров и серверов"""
+
+    def __init__(self, url, channel):
+        import redis
+
+        self.url = url
+        self.channel = channel
+        # Общий для всех воркеров счетчик номеров событий канала
+        self.event_id_key = f'{channel}:event_id'
+        self._client = redis.Redis.from_url(url)
+
+    def publish(self, message):
+        try:
+            message['id'] = self._client.incr(self.event_id_key)
+            self._client.publish(self.channel, json.dumps(message))
+        except Exception as e:
+            logger.warning('Не удалось опубликовать обновление дашборда: %s', e)
+
+    def subscribe(self):
+        return RedisSubscription(self.url, self.channel)
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_live_settings():
+    defaults = {
+        'BROKER': 'local',
+        'REDIS_URL': '',
+        'CHANNEL': 'crm:dashboard',
+        'HEARTBEAT_SECONDS': 15,
+        'MAX_QUEUE_SIZE': 100,
+    }
+    defaults.update(getattr(settings, 'LIVE_DASHBOARD', {}))
+    return defaults
+
+
+def get_broker():
+    """Возвращает брокер согласно настройкам (с откатом на локальный)"""
+    global _broker
+    if _broker is not None:
+        return _broker
+
+    with _broker_lock:
+        if _broker is None:
+            live_settings = get_live_settings()
+            broker = None
+            if live_settings['BROKER'] == 'redis' and live_settings['REDIS_URL']:
+                try:
+                    broker = RedisBroker(live_settings['REDIS_URL'], live_settings['CHANNEL'])
+                except ImportError:
+                    logger.warning('Пакет redis не установлен, используется локальный брокер')
+            if broker is None:
+                broker = LocalBroker(max_queue_size=live_settings['MAX_QUEUE_SIZE'])
+            _broker = broker
+    return _broker
+
+
+def publish_delta(delta, event='delta', **extra):
+    """
+    Публикует дельту метрик после фиксации транзакции БД.
+    delta - словарь {метрика: приращение}
+    """
+    delta = {key: value for key, value in delta.items() if value}
+    if not delta and event == 'delta':
+        return
+
+    message = {'type': event, 'delta': delta, **extra}
+
+    transaction.on_commit(lambda: get_broker().publish(message))
+
+
+def format_sse(data, event=None, event_id=None):
+    """Форматирует сообщение по протоколу text/event-stream"""
+    lines = []
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    if event:
+        lines.append(f'event: {event}')
+    lines.append(f'data: {json.dumps(data, ensure_ascii=False, default=str)}')
+    return '\n'.join(lines) + '\n\n'
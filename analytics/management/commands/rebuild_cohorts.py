@@ -0,0 +1,13 @@
+# analytics/management/commands/rebuild_cohorts.py
+from django.core.management.base import BaseCommand
+from analytics.cohorts import rebuild_cohorts
+
+
+class Command(BaseCommand):
+    help = 'Полная перестройка таблицы когорт привлечения клиентов'
+
+    def handle(self, *args, **options):
+        rows = rebuild_cohorts()
+        self.stdout.write(
+            self.style.SUCCESS(f'Таблица когорт перестроена: {rows} строк')
+        )
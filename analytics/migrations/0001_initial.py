@@ -0,0 +1,35 @@
+# Generated by Django 5.2.1 on 2026-10-19 12:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClientCohortStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cohort_month', models.DateField(verbose_name='Месяц когорты')),
+                ('source', models.CharField(choices=[('avito', 'Авито'), ('vk', 'ВК'), ('website', 'Сайт'), ('recommendations', 'Рекомендации'), ('other', 'Другое')], max_length=15, verbose_name='Источник')),
+                ('clients_count', models.IntegerField(default=0, verbose_name='Клиентов')),
+                ('ordered_clients_count', models.IntegerField(default=0, verbose_name='Клиентов с заказами')),
+                ('completed_clients_count', models.IntegerField(default=0, verbose_name='Клиентов с завершенными заказами')),
+                ('orders_count', models.IntegerField(default=0, verbose_name='Заказов')),
+                ('completed_orders_count', models.IntegerField(default=0, verbose_name='Завершенных заказов')),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Выручка')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Дата обновления')),
+            ],
+            options={
+                'verbose_name': 'Когорта клиентов',
+                'verbose_name_plural': 'Когорты клиентов',
+                'ordering': ['cohort_month', 'source'],
+                'unique_together': {('cohort_month', 'source')},
+            },
+        ),
+    ]
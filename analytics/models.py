@@ -0,0 +1,30 @@
+from django.db import models
+from customer_clients.models import Client
+
+
+class ClientCohortStat(models.Model):
+    """
+    Воронка привлечения по месячным когортам клиентов.
+    Строка = месяц регистрации клиента (Client.created_at) + источник.
+    Обновляется инкрементально сигналами, полностью - командой rebuild_cohorts.
+    """
+    cohort_month = models.DateField(verbose_name="Месяц когорты")
+    source = models.CharField(max_length=15, choices=Client.SOURCE_CHOICES, verbose_name="Источник")
+
+    clients_count = models.IntegerField(default=0, verbose_name="Клиентов")
+    ordered_clients_count = models.IntegerField(default=0, verbose_name="Клиентов с заказами")
+    completed_clients_count = models.IntegerField(default=0, verbose_name="Клиентов с завершенными заказами")
+    orders_count = models.IntegerField(default=0, verbose_name="Заказов")
+    completed_orders_count = models.IntegerField(default=0, verbose_name="Завершенных заказов")
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name="Выручка")
+
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Дата обновления")
+
+    class Meta:
+        verbose_name = "Когорта клиентов"
+        verbose_name_plural = "Когорты клиентов"
+        unique_together = ('cohort_month', 'source')
+        ordering = ['cohort_month', 'source']
+
+    def __str__(self):
+        return f"{self.cohort_month:%Y-%m} / {self.get_source_display()}"
@@ -0,0 +1,229 @@
+# analytics/signals.py
+from django.db.models.signals import post_save, pre_save, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from customer_clients.models import Client
+from orders.models import Order
+from finance.models import Transaction
+from .live import publish_delta
+from .cohorts import apply_cohort_delta, cohort_month_of, recompute_cohort
+
+
+def _current_month():
+    return timezone.localtime(timezone.now()).strftime('%Y-%m')
+
+
+def _is_this_month(value):
+    return bool(value) and timezone.localtime(value).strftime('%Y-%m') == _current_month()
+
+
+def _transaction_delta(transaction_obj, sign=1):
+    """Вклад транзакции в финансовые показатели дашборда"""
+    amount = float(transaction_obj.amount or 0) * sign
+    this_month = _is_this_month(transaction_obj.created_at)
+
+    if transaction_obj.type == 'income':
+        return {
+            'company_balance': amount,
+            'income_this_month': amount if this_month else 0,
+        }
+    return {
+        'company_balance': -amount,
+        'expenses_this_month': amount if this_month else 0,
+    }
+
+
+def _merge(*deltas):
+    result = {}
+    for delta in deltas:
+        for key, value in delta.items():
+            result[key] = result.get(key, 0) + value
+    return result
+
+
+@receiver(post_save, sender=Order)
+def publish_order_changes(sender, instance, created, update_fields=None, **kwargs):
+    """Новый заказ и смена статуса (старый статус сохраняет orders.signals)"""
+    if update_fields is not None and 'status' not in update_fields:
+        return
+
+    if created:
+        publish_delta({
+            'total_orders': 1,
+            'orders_this_month': 1 if _is_this_month(instance.created_at) else 0,
+            'completed_orders': 1 if instance.status == 'completed' else 0,
+        }, event='order_created', month=_current_month(), order={
+            'id': instance.id,
+            'client_name': instance.client.name,
+            'status': instance.status,
+            'total_cost': float(instance.total_cost),
+            'created_at': instance.created_at.isoformat(),
+        })
+        return
+
+    old_status = getattr(instance, '_old_status', None)
+    if old_status is None or old_status == instance.status:
+        return
+
+    completed_change = 0
+    if instance.status == 'completed':
+        completed_change = 1
+    elif old_status == 'completed':
+        completed_change = -1
+
+    publish_delta(
+        {'completed_orders': completed_change},
+        event='order_status',
+        month=_current_month(),
+        order={'id': instance.id, 'old_status': old_status, 'status': instance.status},
+    )
+
+
+@receiver(post_delete, sender=Order)
+def publish_order_deleted(sender, instance, **kwargs):
+    publish_delta({
+        'total_orders': -1,
+        'orders_this_month': -1 if _is_this_month(instance.created_at) else 0,
+        'completed_orders': -1 if instance.status == 'completed' else 0,
+    }, month=_current_month())
+
+
+@receiver(post_save, sender=Client)
+def publish_client_created(sender, instance, created, **kwargs):
+    if created:
+        publish_delta({
+            'total_clients': 1,
+            'clients_this_month': 1 if _is_this_month(instance.created_at) else 0,
+        }, month=_current_month())
+
+
+@receiver(post_delete, sender=Client)
+def publish_client_deleted(sender, instance, **kwargs):
+    publish_delta({
+        'total_clients': -1,
+        'clients_this_month': -1 if _is_this_month(instance.created_at) else 0,
+    }, month=_current_month())
+
+
+@receiver(pre_save, sender=Transaction)
+def track_transaction_change(sender, instance, **kwargs):
+    """Запоминаем прежние тип и сумму для расчета дельты при редактировании"""
+    instance._old_transaction = None
+    if instance.pk:
+        instance._old_transaction = Transaction.objects.filter(pk=instance.pk).only(
+            'type', 'amount', 'created_at'
+        ).first()
+
+
+@receiver(post_save, sender=Transaction)
+def publish_transaction_changes(sender, instance, created, **kwargs):
+    old_transaction = getattr(instance, '_old_transaction', None)
+    if created or old_transaction is None:
+        delta = _transaction_delta(instance)
+    else:
+        delta = _merge(_transaction_delta(old_transaction, sign=-1), _transaction_delta(instance))
+
+    publish_delta(
+        delta,
+        event='transaction' if created else 'delta',
+        month=_current_month(),
+    )
+
+
+@receiver(post_delete, sender=Transaction)
+def publish_transaction_deleted(sender, instance, **kwargs):
+    publish_delta(_transaction_delta(instance, sign=-1), month=_current_month())
+
+
+# Когорты привлечения клиентов
+
+@receiver(pre_save, sender=Client)
+def track_client_source_change(sender, instance, **kwargs):
+    instance._old_source = None
+    if instance.pk:
+        instance._old_source = Client.objects.filter(pk=instance.pk).values_list('source', flat=True).first()
+
+
+@receiver(post_save, sender=Client)
+def update_cohort_on_client_save(sender, instance, created, **kwargs):
+    cohort_month = cohort_month_of(instance.created_at)
+    if created:
+        apply_cohort_delta(cohort_month, instance.source, clients_count=1)
+        return
+
+    old_source = getattr(instance, '_old_source', None)
+    if old_source and old_source != instance.source:
+        recompute_cohort(cohort_month, old_source)
+        recompute_cohort(cohort_month, instance.source)
+
+
+@receiver(post_delete, sender=Client)
+def update_cohort_on_client_delete(sender, instance, **kwargs):
+    recompute_cohort(cohort_month_of(instance.created_at), instance.source)
+
+
+@receiver(post_save, sender=Order)
+def update_cohort_on_order_save(sender, instance, created, update_fields=None, **kwargs):
+    if update_fields is not None and not {'status', 'total_cost', 'client'} & set(update_fields):
+        return
+
+    client = instance.client
+    cohort_month = cohort_month_of(client.created_at)
+    is_completed = instance.status == 'completed'
+
+    if created:
+        apply_cohort_delta(
+            cohort_month, client.source,
+            orders_count=1,
+            ordered_clients_count=1 if _client_orders(client).count() == 1 else 0,
+            completed_orders_count=1 if is_completed else 0,
+            completed_clients_count=1 if is_completed and _client_completed_count(client) == 1 else 0,
+            revenue=instance.total_cost if is_completed else 0,
+        )
+        return
+
+    old_client_id = getattr(instance, '_old_client_id', None)
+    if old_client_id and old_client_id != instance.client_id:
+        # Заказ перенесен на другого клиента - пересчитываем обе когорты
+        old_client = Client.objects.filter(pk=old_client_id).first()
+        if old_client:
+            recompute_cohort(cohort_month_of(old_client.created_at), old_client.source)
+        recompute_cohort(cohort_month, client.source)
+        return
+
+    old_status = getattr(instance, '_old_status', None)
+    old_total = getattr(instance, '_old_total_cost', None) or 0
+    was_completed = old_status == 'completed'
+
+    if is_completed and not was_completed:
+        apply_cohort_delta(
+            cohort_month, client.source,
+            completed_orders_count=1,
+            completed_clients_count=1 if _client_completed_count(client) == 1 else 0,
+            revenue=instance.total_cost,
+        )
+    elif was_completed and not is_completed:
+        apply_cohort_delta(
+            cohort_month, client.source,
+            completed_orders_count=-1,
+            completed_clients_count=-1 if _client_completed_count(client) == 0 else 0,
+            revenue=-old_total,
+        )
+    elif is_completed and instance.total_cost != old_total:
+        apply_cohort_delta(cohort_month, client.source, revenue=instance.total_cost - old_total)
+
+
+@receiver(post_delete, sender=Order)
+def update_cohort_on_order_delete(sender, instance, **kwargs):
+    client = Client.objects.filter(pk=instance.client_id).values('created_at', 'source').first()
+    if client:
+        recompute_cohort(cohort_month_of(client['created_at']), client['source'])
+
+
+def _client_orders(client):
+    return Order.objects.filter(client=client)
+
+
+def _client_completed_count(client):
+    return _client_orders(client).filter(status='completed').count()
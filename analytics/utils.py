@@ -66,4 +66,34 @@ def get_profit_by_day(days=30):
         revenue=Sum('price')
     ).order_by('day')
     
-    return order_items
\ No newline at end of file
+    return order_items
+
+def get_dashboard_metrics(now=None):
+    """
+    Основные числовые показатели дашборда.
+    Используется как начальный снимок для потока живых обновлений.
+    """
+    now = now or timezone.now()
+    start_of_month = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+    income_this_month = Transaction.objects.filter(
+        type='income',
+        created_at__gte=start_of_month
+    ).aggregate(total=Sum('amount'))['total'] or 0
+
+    expenses_this_month = Transaction.objects.filter(
+        type='expense',
+        created_at__gte=start_of_month
+    ).aggregate(total=Sum('amount'))['total'] or 0
+
+    return {
+        'month': start_of_month.strftime('%Y-%m'),
+        'total_orders': Order.objects.count(),
+        'completed_orders': Order.objects.filter(status='completed').count(),
+        'orders_this_month': Order.objects.filter(created_at__gte=start_of_month).count(),
+        'total_clients': Client.objects.count(),
+        'clients_this_month': Client.objects.filter(created_at__gte=start_of_month).count(),
+        'company_balance': float(Transaction.get_company_balance()),
+        'income_this_month': float(income_this_month),
+        'expenses_this_month': float(expenses_this_month),
+    }
@@ -1,4 +1,8 @@
+import time
+
+from asgiref.sync import sync_to_async
 from django.shortcuts import render
+from django.http import StreamingHttpResponse
 from django.contrib.auth.decorators import login_required
 from django.db.models import Count, Sum, Q
 from django.utils import timezone
@@ -11,6 +15,8 @@ from orders.models import Order
 from services.models import Service
 from finance.models import Transaction
 from user_accounts.models import User
+from .live import get_broker, get_live_settings, format_sse, RESYNC_MESSAGE
+from .utils import get_dashboard_metrics
 
 @login_required
 def dashboard(request):
@@ -79,6 +85,48 @@ def dashboard(request):
     
     return render(request, 'dashboard/dashboard.html', context)
 
+@login_required
+async def dashboard_stream(request):
+    """
+    Поток живых обновлений дашборда (Server-Sent Events).
+    Сначала отправляется снимок метрик, затем только дельты.
+    Рассчитан на работу под ASGI-воркером (uvicorn).
+    """
+    live_settings = get_live_settings()
+    heartbeat = live_settings['HEARTBEAT_SECONDS']
+
+    async def event_stream():
+        subscription = get_broker().subscribe()
+        await subscription.open()
+        try:
+            # Подписываемся до снимка, чтобы не потерять изменения между ними
+            snapshot = await sync_to_async(get_dashboard_metrics)()
+            yield format_sse(snapshot, event='snapshot')
+            last_write = time.monotonic()
+
+            while True:
+                message = await subscription.get(timeout=heartbeat)
+                if message is None:
+                    if time.monotonic() - last_write >= heartbeat:
+                        yield ': ping\n\n'
+                        last_write = time.monotonic()
+                    continue
+
+                if message == RESYNC_MESSAGE or message.get('month') not in (None, snapshot['month']):
+                    # Переполнение очереди или смена месяца - отправляем новый снимок
+                    snapshot = await sync_to_async(get_dashboard_metrics)()
+                    yield format_sse(snapshot, event='snapshot')
+                else:
+                    yield format_sse(message, event=message['type'], event_id=message.get('id'))
+                last_write = time.monotonic()
+        finally:
+            await subscription.close()
+
+    response = StreamingHttpResponse(event_stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # Отключаем буферизацию в nginx
+    return response
+
 def get_clients_by_source():
     """Получение статистики клиентов по источникам"""
     return Client.objects.values('source').annotate(count=Count('id'))
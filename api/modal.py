@@ -9,6 +9,7 @@ from django.utils.decorators import method_decorator
 
 from customer_clients.models import Client
 from services.models import Service
+from services.recommendations import get_recommendations_map, suggest_for_services
 from orders.models import Order, OrderItem
 from user_accounts.models import User
 from finance.models import Transaction, SalaryPayment
@@ -66,12 +67,15 @@ class ModalOrderDataView(APIView):
         managers = User.objects.filter(role='manager').values('id', 'first_name', 'last_name')
         installers = User.objects.filter(role='installer').values('id', 'first_name', 'last_name')
         statuses = dict(Order.STATUS_CHOICES)
+        # Предрассчитанные рекомендации из кэша: {id услуги: [...]}
+        recommendations = get_recommendations_map()
         
         data = {
             'clients': list(clients),
             'managers': list(managers),
             'installers': list(installers),
-            'statuses': [{'value': key, 'label': value} for key, value in statuses.items()]
+            'statuses': [{'value': key, 'label': value} for key, value in statuses.items()],
+            'recommendations': recommendations
         }
         
         # Если указан ID заказа - возвращаем данные для редактирования
@@ -90,6 +94,11 @@ class ModalOrderDataView(APIView):
             sellers = User.objects.filter(role__in=['manager', 'installer']).values('id', 'first_name', 'last_name', 'role')
             data['services'] = list(services)
             data['sellers'] = list(sellers)
+            
+            # Что докупают вместе с уже выбранными услугами
+            data['suggested_services'] = suggest_for_services(
+                [item.service_id for item in items], recommendations=recommendations
+            )
         
         return Response(data)
     
@@ -143,7 +152,8 @@ class ModalOrderItemDataView(APIView):
             return Response({
                 'order': OrderSerializer(order).data,
                 'services': services_list,
-                'sellers': list(sellers)
+                'sellers': list(sellers),
+                'suggested_services': suggest_for_services(order.items.values_list('service_id', flat=True))
             })
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
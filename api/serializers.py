@@ -14,7 +14,12 @@ class UserSerializer(serializers.ModelSerializer):
 class ClientSerializer(serializers.ModelSerializer):
     class Meta:
         model = Client
-        fields = ['id', 'name', 'address', 'phone', 'source', 'created_at']
+        fields = [
+            'id', 'name', 'address', 'phone', 'source', 'created_at',
+            'orders_count', 'completed_count', 'lifetime_revenue', 'first_order_at', 'last_order_at',
+            'latitude', 'longitude'
+        ]
+        read_only_fields = Client.COUNTER_FIELDS + ('latitude', 'longitude')
 
 class ServiceSerializer(serializers.ModelSerializer):
     category_display = serializers.CharField(source='get_category_display', read_only=True)
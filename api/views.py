@@ -17,6 +17,8 @@ from customer_clients.models import Client  # Исправлено с clients.mo
 from services.models import Service
 from orders.models import Order, OrderItem
 from finance.models import Transaction, SalaryPayment
+from analytics.cohorts import get_cohort_matrix
+from analytics.lead_time import get_status_durations, get_lead_times, get_open_orders_aging
 from .serializers import (
     UserSerializer, ClientSerializer, ServiceSerializer, 
     OrderSerializer, OrderItemSerializer, TransactionSerializer, 
@@ -36,9 +38,19 @@ class ClientViewSet(viewsets.ModelViewSet):
     authentication_classes = [SessionAuthentication, BasicAuthentication]
     permission_classes = [IsAuthenticated]
     #permission_classes = []
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter]
-    filterset_fields = ['source']
+    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filterset_fields = {
+        'source': ['exact'],
+        'created_at': ['gte', 'lte'],
+        'orders_count': ['exact', 'gte', 'lte'],
+        'completed_count': ['gte', 'lte'],
+        'lifetime_revenue': ['gte', 'lte'],
+        'last_order_at': ['gte', 'lte', 'isnull'],
+    }
     search_fields = ['name', 'phone', 'address']
+    # Сортировка по денормализованным счетчикам - без агрегатов по заказам
+    ordering_fields = ['created_at', 'name', 'orders_count', 'completed_count', 'lifetime_revenue', 'last_order_at']
+    ordering = ['-created_at']
 
     @action(detail=False, methods=['get'], url_path='stats/by-source')
     def stats_by_source(self, request):
@@ -76,6 +88,16 @@ class ClientViewSet(viewsets.ModelViewSet):
         
         return Response({'months': result})
 
+    @action(detail=False, methods=['get'], url_path='stats/cohorts')
+    def stats_cohorts(self, request):
+        """Воронка привлечения по месячным когортам и источникам"""
+        try:
+            months = min(max(int(request.query_params.get('months', 24)), 1), 120)
+        except ValueError:
+            return Response({'error': 'Параметр months должен быть числом'}, status=400)
+
+        return Response({'months': months, 'cohorts': get_cohort_matrix(months)})
+
 class ServiceViewSet(viewsets.ModelViewSet):
     queryset = Service.objects.all()
     serializer_class = ServiceSerializer
@@ -215,6 +237,41 @@ class OrderViewSet(viewsets.ModelViewSet):
             })
         
         return Response({'managers': result})
+    
+    def _period_params(self, request):
+        """Необязательный период по дате создания заказа"""
+        start_date = request.query_params.get('start_date')
+        end_date = request.query_params.get('end_date')
+        if start_date:
+            start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
+        if end_date:
+            end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
+        return start_date, end_date
+    
+    @action(detail=False, methods=['get'], url_path='stats/status-durations')
+    def stats_status_durations(self, request):
+        """Время пребывания заказов в каждом статусе"""
+        try:
+            start_date, end_date = self._period_params(request)
+        except ValueError:
+            return Response({'error': 'Неверный формат даты. Используйте YYYY-MM-DD'}, status=400)
+        
+        return Response({'statuses': get_status_durations(start_date, end_date)})
+    
+    @action(detail=False, methods=['get'], url_path='stats/lead-times')
+    def stats_lead_times(self, request):
+        """Перцентили сроков выполнения по менеджерам и источникам клиентов"""
+        try:
+            start_date, end_date = self._period_params(request)
+        except ValueError:
+            return Response({'error': 'Неверный формат даты. Используйте YYYY-MM-DD'}, status=400)
+        
+        return Response(get_lead_times(start_date, end_date))
+    
+    @action(detail=False, methods=['get'], url_path='stats/aging')
+    def stats_aging(self, request):
+        """Возраст открытых заказов"""
+        return Response(get_open_orders_aging())
 
 class TransactionViewSet(viewsets.ModelViewSet):
     queryset = Transaction.objects.all()
@@ -3,7 +3,7 @@ from django.contrib import admin
 from django.utils.html import format_html
 from django.urls import reverse
 from django.utils.safestring import mark_safe
-from .models import InstallationSchedule, RouteOptimization, RoutePoint
+from .models import CalendarFeedToken, GeocodeCache, InstallationSchedule, InstallerAssignment, InstallerDayOccupancy, RouteOptimization, RoutePoint, SlotHold, TravelTimeCache
 
 class RoutePointInline(admin.TabularInline):
     model = RoutePoint
@@ -225,4 +225,44 @@ class RoutePointAdmin(admin.ModelAdmin):
     def client_name(self, obj):
         return obj.schedule.order.client.name
     client_name.short_description = 'Клиент'
-    client_name.admin_order_field = 'schedule__order__client__name'
\ No newline at end of file
+    client_name.admin_order_field = 'schedule__order__client__name'
+
+@admin.register(GeocodeCache)
+class GeocodeCacheAdmin(admin.ModelAdmin):
+    list_display = ['address', 'latitude', 'longitude', 'found', 'provider', 'expires_at', 'updated_at']
+    list_filter = ['found', 'provider']
+    search_fields = ['address', 'address_key']
+    readonly_fields = ['address_key', 'created_at', 'updated_at']
+
+@admin.register(TravelTimeCache)
+class TravelTimeCacheAdmin(admin.ModelAdmin):
+    list_display = ['origin', 'destination', 'provider', 'time_bucket', 'distance_km', 'duration_minutes', 'expires_at']
+    list_filter = ['provider', 'time_bucket']
+    search_fields = ['origin', 'destination']
+
+@admin.register(CalendarFeedToken)
+class CalendarFeedTokenAdmin(admin.ModelAdmin):
+    list_display = ['installer', 'created_at']
+    search_fields = ['installer__first_name', 'installer__last_name', 'installer__username']
+    readonly_fields = ['token', 'created_at']
+
+@admin.register(InstallerDayOccupancy)
+class InstallerDayOccupancyAdmin(admin.ModelAdmin):
+    list_display = ['installer', 'date', 'installations_count', 'updated_at']
+    list_filter = ['date']
+    search_fields = ['installer__first_name', 'installer__last_name', 'installer__username']
+    readonly_fields = ['installer', 'date', 'slots', 'installations_count', 'updated_at']
+
+@admin.register(InstallerAssignment)
+class InstallerAssignmentAdmin(admin.ModelAdmin):
+    list_display = ['installer', 'schedule', 'starts_at', 'ends_at']
+    list_filter = ['starts_at']
+    search_fields = ['installer__first_name', 'installer__last_name', 'installer__username']
+    readonly_fields = ['schedule', 'installer', 'starts_at', 'ends_at']
+
+@admin.register(SlotHold)
+class SlotHoldAdmin(admin.ModelAdmin):
+    list_display = ['installer', 'date', 'start_time', 'end_time', 'expires_at', 'created_by']
+    list_filter = ['date']
+    search_fields = ['token', 'installer__first_name', 'installer__last_name', 'installer__username']
+    readonly_fields = ['token', 'created_at']
@@ -7,5 +7,4 @@ class CalendarAppConfig(AppConfig):
     verbose_name = 'Календарь монтажей'
     
     def ready(self):
-        # Импортируем сигналы, если они понадобятся
-        pass
\ No newline at end of file
+        import calendar_app.signals  # Геокодирование адресов клиентов
\ No newline at end of file
@@ -0,0 +1,234 @@
+# calendar_app/availability.py
+"""
+Индекс занятости монтажников.
+
+Все интервалы за период и по набору монтажников загружаются одним запросом
+к промежуточной таблице InstallationSchedule.installers. Дальше проверки
+конфликтов и поиск свободных окон выполняются в памяти по индексу
+(монтажник, день) → отсортированные интервалы в минутах от начала суток.
+Неистекшие временные брони (calendar_app.holds) загружаются отдельным запросом
+и занимают окна наравне с монтажами.
+"""
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime, time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+
+from user_accounts.models import User
+from .holds import active_holds
+from .models import InstallationSchedule
+
+ACTIVE_STATUSES = ('scheduled', 'in_progress')
+MINUTES_PER_DAY = 24 * 60
+
+
+def to_minutes(value: time) -> int:
+    """Время суток в минуты от полуночи"""
+    return value.hour * 60 + value.minute
+
+
+def from_minutes(minutes: int) -> time:
+    """Минуты от полуночи во время суток (24:00 ограничивается 23:59)"""
+    minutes = max(0, min(minutes, MINUTES_PER_DAY - 1))
+    return time(minutes // 60, minutes % 60)
+
+
+def get_work_hours() -> Tuple[int, int]:
+    """Рабочие часы из CALENDAR_SETTINGS в минутах"""
+    calendar_settings = getattr(settings, 'CALENDAR_SETTINGS', {})
+    start = datetime.strptime(calendar_settings.get('DEFAULT_WORK_START_TIME', '08:00'), '%H:%M').time()
+    end = datetime.strptime(calendar_settings.get('DEFAULT_WORK_END_TIME', '18:00'), '%H:%M').time()
+    return to_minutes(start), to_minutes(end)
+
+
+@dataclass
+class BusyInterval:
+    """Занятый интервал монтажника: монтаж или временная бронь (hold_id)"""
+    start: int
+    end: int
+    schedule_id: int
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+    hold_id: Optional[int] = None
+
+
+class AvailabilityIndex:
+    """
+    Занятость монтажников по дням.
+    Строится методом load() за один запрос (плюс запросы имен и временных броней),
+    после чего отвечает на любые проверки без обращения к базе.
+    """
+
+    def __init__(self, intervals: Dict[Tuple[int, object], List[BusyInterval]],
+                 installers: Dict[int, str], unknown: Iterable[int] = ()):
+        self.intervals = intervals
+        self.installers = installers
+        self.unknown = sorted(set(unknown))
+        self._merged = {}
+
+    @classmethod
+    def load(cls, date_from, date_to=None, installer_ids: Optional[Iterable[int]] = None,
+             exclude_schedule_ids: Iterable[int] = (), hold_token: Optional[str] = None):
+        """
+        Загружает интервалы за период [date_from, date_to].
+        installer_ids=None - все активные монтажники.
+        hold_token - собственные брони вызывающего, окна под ними свободны.
+        """
+        date_to = date_to or date_from
+
+        installers_query = User.objects.filter(role='installer', is_active=True)
+        requested = None
+        if installer_ids is not None:
+            requested = {int(installer_id) for installer_id in installer_ids}
+            installers_query = User.objects.filter(id__in=requested)
+
+        installers = {
+            row['id']: f"{row['first_name']} {row['last_name']}".strip() or row['username']
+            for row in installers_query.values('id', 'first_name', 'last_name', 'username')
+        }
+        unknown = requested - installers.keys() if requested is not None else ()
+
+        through = InstallationSchedule.installers.through.objects.filter(
+            user_id__in=list(installers),
+            installationschedule__scheduled_date__range=(date_from, date_to),
+            installationschedule__status__in=ACTIVE_STATUSES,
+        )
+        exclude_schedule_ids = list(exclude_schedule_ids)
+        if exclude_schedule_ids:
+            through = through.exclude(installationschedule_id__in=exclude_schedule_ids)
+
+        intervals = defaultdict(list)
+        for installer_id, schedule_id, day, start, end, latitude, longitude in through.values_list(
+            'user_id', 'installationschedule_id',
+            'installationschedule__scheduled_date',
+            'installationschedule__scheduled_time_start',
+            'installationschedule__scheduled_time_end',
+            'installationschedule__latitude',
+            'installationschedule__longitude',
+        ):
+            intervals[(installer_id, day)].append(
+                BusyInterval(to_minutes(start), to_minutes(end), schedule_id, latitude, longitude)
+            )
+        for hold_id, installer_id, day, start, end in active_holds(
+            date_from, date_to, list(installers), exclude_token=hold_token
+        ):
+            intervals[(installer_id, day)].append(
+                BusyInterval(to_minutes(start), to_minutes(end), 0, hold_id=hold_id)
+            )
+
+        for day_intervals in intervals.values():
+            day_intervals.sort(key=lambda interval: (interval.start, interval.end))
+
+        return cls(dict(intervals), installers, unknown)
+
+    def add(self, installer_id: int, day, start: int, end: int, schedule_id: int = 0,
+            latitude: Optional[float] = None, longitude: Optional[float] = None):
+        """Добавляет интервал в индекс (например, только что запланированный монтаж)"""
+        day_intervals = self.intervals.setdefault((installer_id, day), [])
+        interval = BusyInterval(start, end, schedule_id, latitude, longitude)
+        position = bisect_right(day_intervals, (start, end), key=lambda item: (item.start, item.end))
+        day_intervals.insert(position, interval)
+        self._merged.pop((installer_id, day), None)
+
+    def day_intervals(self, installer_id: int, day) -> List[BusyInterval]:
+        return self.intervals.get((installer_id, day), [])
+
+    def busy(self, installer_id: int, day) -> List[Tuple[int, int]]:
+        """Объединенные занятые интервалы монтажника за день"""
+        key = (installer_id, day)
+        if key not in self._merged:
+            merged = []
+            for interval in self.intervals.get(key, []):
+                if merged and interval.start <= merged[-1][1]:
+                    merged[-1][1] = max(merged[-1][1], interval.end)
+                else:
+                    merged.append([interval.start, interval.end])
+            self._merged[key] = (
+                [start for start, _ in merged],
+                [end for _, end in merged],
+            )
+        starts, ends = self._merged[key]
+        return list(zip(starts, ends))
+
+    def is_free(self, installer_id: int, day, start: int, end: int) -> bool:
+        """Свободен ли монтажник в окне [start, end) - бинарный поиск по объединенным интервалам"""
+        self.busy(installer_id, day)
+        starts, ends = self._merged[(installer_id, day)]
+        # Последний занятый интервал, начавшийся раньше конца окна
+        position = bisect_left(starts, end) - 1
+        return position < 0 or ends[position] <= start
+
+    def conflicting_schedules(self, installer_id: int, day, start: int, end: int) -> List[int]:
+        """id расписаний, пересекающихся с окном"""
+        return [
+            interval.schedule_id for interval in self.day_intervals(installer_id, day)
+            if interval.start < end and interval.end > start and interval.hold_id is None
+        ]
+
+    def conflicting_holds(self, installer_id: int, day, start: int, end: int) -> List[int]:
+        """id временных броней, пересекающихся с окном"""
+        return [
+            interval.hold_id for interval in self.day_intervals(installer_id, day)
+            if interval.start < end and interval.end > start and interval.hold_id is not None
+        ]
+
+    def check(self, installer_ids: Iterable[int], day, windows: Iterable[Tuple[int, int]]) -> Dict[int, List[bool]]:
+        """Доступность набора монтажников сразу для нескольких окон"""
+        windows = list(windows)
+        return {
+            installer_id: [self.is_free(installer_id, day, start, end) for start, end in windows]
+            for installer_id in installer_ids
+            if installer_id in self.installers
+        }
+
+    def free_windows(self, installer_id: int, day, work_start: Optional[int] = None,
+                     work_end: Optional[int] = None, min_duration: int = 0) -> List[Tuple[int, int]]:
+        """Свободные окна монтажника в рабочие часы"""
+        if work_start is None or work_end is None:
+            default_start, default_end = get_work_hours()
+            work_start = default_start if work_start is None else work_start
+            work_end = default_end if work_end is None else work_end
+
+        windows = []
+        cursor = work_start
+        for start, end in self.busy(installer_id, day):
+            if end <= cursor:
+                continue
+            if start >= work_end:
+                break
+            if start - cursor >= max(min_duration, 1):
+                windows.append((cursor, start))
+            cursor = max(cursor, end)
+        if work_end - cursor >= max(min_duration, 1):
+            windows.append((cursor, work_end))
+        return windows
+
+    def common_free_windows(self, installer_ids: Iterable[int], day, work_start: Optional[int] = None,
+                            work_end: Optional[int] = None, min_duration: int = 0) -> List[Tuple[int, int]]:
+        """Окна, в которые свободны одновременно все указанные монтажники"""
+        common = None
+        for installer_id in installer_ids:
+            windows = self.free_windows(installer_id, day, work_start, work_end)
+            common = windows if common is None else _intersect(common, windows)
+            if not common:
+                return []
+        return [window for window in (common or []) if window[1] - window[0] >= max(min_duration, 1)]
+
+
+def _intersect(first: List[Tuple[int, int]], second: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    """Пересечение двух отсортированных списков непересекающихся интервалов"""
+    result = []
+    i = j = 0
+    while i < len(first) and j < len(second):
+        start = max(first[i][0], second[j][0])
+        end = min(first[i][1], second[j][1])
+        if start < end:
+            result.append((start, end))
+        if first[i][1] < second[j][1]:
+            i += 1
+        else:
+            j += 1
+    return result
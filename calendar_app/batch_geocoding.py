@@ -0,0 +1,220 @@
+# calendar_app/batch_geocoding.py
+"""
+Пакетное геокодирование адресов без координат.
+
+Адреса клиентов без координат собираются одним запросом, дедуплицируются
+по нормализованному адресу и сначала ищутся в кэше (calendar_app.geocoding).
+Остальные запрашиваются у провайдера пулом потоков под общим ограничением
+запросов в секунду; временные ошибки (сеть, 429, 5xx) повторяются с
+экспоненциальной задержкой. Результаты записываются пакетно: GeocodeCache -
+одним upsert, клиенты и их расписания - bulk_update.
+
+Запускается командой geocode_addresses или фоновым потоком GeocodingWorker,
+который будится после сохранения клиента с новым адресом и после создания
+расписания без координат - обработчики запросов геокодер не ждут.
+"""
+import logging
+import random
+import threading
+import time as time_module
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, Iterable, Optional, Tuple
+
+from django.db import close_old_connections, transaction
+
+from . import geocoding
+from .geocoding import GeocodingError, get_geocoder, get_geocoder_settings, normalize_address
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimiter:
+    """Общий для потоков лимит запросов в секунду (равномерные интервалы)"""
+
+    def __init__(self, qps: float):
+        self.interval = 1.0 / qps if qps and qps > 0 else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time_module.monotonic()
+            moment = max(now, self._next)
+            self._next = moment + self.interval
+        if moment > now:
+            time_module.sleep(moment - now)
+
+
+@dataclass
+class BatchStats:
+    """Итоги пакетного геокодирования"""
+    addresses: int = 0
+    cached: int = 0
+    requested: int = 0
+    found: int = 0
+    not_found: int = 0
+    failed: int = 0
+    retries: int = 0
+    clients_updated: int = 0
+    schedules_updated: int = 0
+    elapsed: float = 0.0
+
+
+def _geocode_with_retries(geocoder, limiter: RateLimiter, address: str, max_retries: int,
+                          backoff: float, stats: BatchStats, lock: threading.Lock):
+    """Координаты, None (не найден) или исключение после исчерпания повторов"""
+    for attempt in range(max_retries + 1):
+        limiter.acquire()
+        try:
+            return geocoder.geocode(address)
+        except GeocodingError as e:
+            if not e.retryable or attempt == max_retries:
+                raise
+            with lock:
+                stats.retries += 1
+            # Экспоненциальная задержка с небольшим случайным разбросом
+            time_module.sleep(backoff * (2 ** attempt) * (1 + random.random() * 0.1))
+
+
+def geocode_many(addresses: Iterable[str], workers: Optional[int] = None, qps: Optional[float] = None,
+                 max_retries: Optional[int] = None, backoff: Optional[float] = None,
+                 geocoder=None, stats: Optional[BatchStats] = None) -> Dict[str, Optional[Tuple[float, float]]]:
+    """
+    Координаты набора адресов: {адрес: (широта, долгота) или None}.
+    Адреса, которые не удалось запросить из-за ошибок, в результат не попадают.
+    """
+    config = get_geocoder_settings()
+    workers = workers or config['BATCH_WORKERS']
+    qps = config['BATCH_QPS'] if qps is None else qps
+    max_retries = config['MAX_RETRIES'] if max_retries is None else max_retries
+    backoff = config['BACKOFF_SECONDS'] if backoff is None else backoff
+    stats = stats if stats is not None else BatchStats()
+
+    addresses = [address for address in dict.fromkeys(addresses) if address and normalize_address(address)]
+    stats.addresses += len(addresses)
+    result = geocoding.cached_many(addresses)
+    stats.cached += len(result)
+
+    # Один запрос на нормализованный адрес
+    pending = {}
+    for address in addresses:
+        if address not in result:
+            pending.setdefault(normalize_address(address), []).append(address)
+
+    geocoder = geocoder or get_geocoder()
+    if not pending or not geocoder.available:
+        return result
+
+    limiter = RateLimiter(qps)
+    lock = threading.Lock()
+
+    def resolve(key):
+        address = pending[key][0]
+        try:
+            return key, _geocode_with_retries(geocoder, limiter, address, max_retries, backoff, stats, lock), None
+        except GeocodingError as e:
+            return key, None, e
+
+    resolved = {}
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(pending)))) as executor:
+        for key, coordinates, error in executor.map(resolve, list(pending)):
+            stats.requested += 1
+            if error is not None:
+                stats.failed += 1
+                logger.warning("Ошибка геокодирования для адреса '%s': %s", pending[key][0], error)
+                continue
+            if coordinates:
+                stats.found += 1
+            else:
+                stats.not_found += 1
+            resolved[pending[key][0]] = coordinates
+            for address in pending[key]:
+                result[address] = coordinates
+
+    if resolved:
+        geocoding.store_many(resolved, geocoder.name)
+    return result
+
+
+def geocode_pending(limit: Optional[int] = None, **options) -> BatchStats:
+    """
+    Геокодирует клиентов без координат и переносит координаты клиентов
+    в расписания без координат. options - параметры geocode_many()
+    """
+    from customer_clients.models import Client
+    from .models import InstallationSchedule
+
+    started = time_module.perf_counter()
+    stats = BatchStats()
+
+    clients = Client.objects.filter(latitude__isnull=True).exclude(address='').order_by('-id')
+    if limit:
+        clients = clients[:limit]
+    clients = list(clients.values_list('id', 'address'))
+
+    coordinates = geocode_many([address for _, address in clients], stats=stats, **options)
+    updated_clients = [
+        Client(id=client_id, latitude=coordinates[address][0], longitude=coordinates[address][1])
+        for client_id, address in clients if coordinates.get(address)
+    ]
+
+    with transaction.atomic():
+        Client.objects.bulk_update(updated_clients, ['latitude', 'longitude'], batch_size=500)
+
+        schedules = [
+            InstallationSchedule(id=schedule_id, latitude=latitude, longitude=longitude)
+            for schedule_id, latitude, longitude in InstallationSchedule.objects.filter(
+                latitude__isnull=True, order__client__latitude__isnull=False
+            ).values_list('id', 'order__client__latitude', 'order__client__longitude')
+        ]
+        InstallationSchedule.objects.bulk_update(schedules, ['latitude', 'longitude'], batch_size=500)
+
+    stats.clients_updated = len(updated_clients)
+    stats.schedules_updated = len(schedules)
+    stats.elapsed = time_module.perf_counter() - started
+    return stats
+
+
+class GeocodingWorker:
+    """
+    Фоновый поток внутри процесса: спит до запроса request() и выполняет
+    geocode_pending(). Повторные запросы во время работы схлопываются в один.
+    """
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def request(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='geocoding-worker', daemon=True)
+                self._thread.start()
+        self._event.set()
+
+    def _run(self):
+        while True:
+            self._event.wait()
+            self._event.clear()
+            close_old_connections()
+            try:
+                stats = geocode_pending()
+                if stats.requested:
+                    logger.info('Фоновое геокодирование: %s', stats)
+            except Exception:
+                logger.exception('Ошибка фонового геокодирования')
+            finally:
+                close_old_connections()
+
+
+worker = GeocodingWorker()
+
+
+def request_background_geocoding():
+    """Будит фоновый поток после коммита транзакции (если он включен в GEOCODER)"""
+    if get_geocoder_settings()['BACKGROUND']:
+        transaction.on_commit(worker.request)
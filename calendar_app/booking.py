@@ -0,0 +1,122 @@
+# calendar_app/booking.py
+"""
+Атомарное бронирование монтажников.
+
+Проверка доступности и запись расписания выполняются в одной критической
+секции (booking_section):
+- SQLite: секция сериализуется - блокировка процесса и первая же запись
+  в транзакции (захват RESERVED-блокировки базы), поэтому проверка
+  доступности видит все закоммиченные брони;
+- другие базы: SELECT ... FOR UPDATE строк монтажников в порядке id -
+  секции с общими монтажниками выполняются по очереди. Это защищает и
+  временные брони (SlotHold), которых нет в InstallerAssignment;
+- PostgreSQL дополнительно: таблица InstallerAssignment с ограничением
+  исключения installer_assignment_no_overlap (installer_id WITH =,
+  tstzrange WITH &&) - пересекающийся интервал отклоняется базой, даже
+  если запись сделана в обход секции.
+
+InstallerAssignment повторяет назначения активных монтажей. Внутри секции
+ее синхронизация строгая (пересечение - BookingConflict), в остальных
+путях (изменение, перенос, переназначение при оптимизации) пересечение
+только записывается в журнал - такие монтажи видит отчет schedule_conflicts.
+"""
+import contextvars
+import logging
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Iterable
+
+from django.db import IntegrityError, connection, transaction
+from django.utils import timezone
+
+from user_accounts.models import User
+from .availability import ACTIVE_STATUSES
+from .models import InstallationSchedule, InstallerAssignment
+
+logger = logging.getLogger(__name__)
+
+NO_OVERLAP_CONSTRAINT = 'installer_assignment_no_overlap'
+
+_process_lock = threading.RLock()
+_strict = contextvars.ContextVar('booking_strict', default=False)
+
+
+class BookingConflict(ValueError):
+    """Монтажник уже занят в это время"""
+
+
+def _bounds(day, start, end):
+    return (
+        timezone.make_aware(datetime.combine(day, start)),
+        timezone.make_aware(datetime.combine(day, end)),
+    )
+
+
+def _reserve_sqlite():
+    """Первая запись транзакции: SQLite выдает RESERVED-блокировку только одному соединению"""
+    with connection.cursor() as cursor:
+        cursor.execute(f'UPDATE {InstallerAssignment._meta.db_table} SET id = id WHERE id = -1')
+
+
+@contextmanager
+def booking_section(installer_ids: Iterable[int]):
+    """Транзакция, в которой проверка занятости и запись брони не пересекаются с другими"""
+    installer_ids = sorted({int(installer_id) for installer_id in installer_ids})
+    token = _strict.set(True)
+    try:
+        if connection.vendor == 'sqlite':
+            with _process_lock, transaction.atomic():
+                _reserve_sqlite()
+                yield
+        else:
+            with transaction.atomic():
+                list(User.objects.select_for_update().filter(id__in=installer_ids).order_by('id').values_list('id'))
+                yield
+    finally:
+        _strict.reset(token)
+
+
+def sync_assignments(schedule_ids: Iterable[int]):
+    """
+    Пересоздает назначения расписаний по их монтажникам и времени.
+    В booking_section пересечение вызывает BookingConflict, вне ее -
+    конфликтующее назначение пропускается с предупреждением
+    """
+    schedule_ids = [schedule_id for schedule_id in set(schedule_ids) if schedule_id]
+    if not schedule_ids:
+        return
+
+    rows = []
+    for installer_id, schedule_id, day, start, end in InstallationSchedule.installers.through.objects.filter(
+        installationschedule_id__in=schedule_ids,
+        installationschedule__status__in=ACTIVE_STATUSES,
+    ).values_list(
+        'user_id', 'installationschedule_id', 'installationschedule__scheduled_date',
+        'installationschedule__scheduled_time_start', 'installationschedule__scheduled_time_end',
+    ):
+        starts_at, ends_at = _bounds(day, start, end)
+        rows.append(InstallerAssignment(
+            schedule_id=schedule_id, installer_id=installer_id, starts_at=starts_at, ends_at=ends_at,
+        ))
+
+    with transaction.atomic():
+        InstallerAssignment.objects.filter(schedule_id__in=schedule_ids).delete()
+        try:
+            with transaction.atomic():
+                InstallerAssignment.objects.bulk_create(rows)
+            return
+        except IntegrityError as e:
+            if _strict.get():
+                raise BookingConflict(f'Монтажник уже занят в это время: {e}') from e
+
+        # Вне бронирования сохраняем все, что не пересекается
+        for row in rows:
+            try:
+                with transaction.atomic():
+                    row.save(force_insert=True)
+            except IntegrityError:
+                logger.warning(
+                    'Монтаж #%s пересекается с другим монтажом монтажника #%s - назначение не защищено ограничением',
+                    row.schedule_id, row.installer_id,
+                )
@@ -0,0 +1,214 @@
+# calendar_app/conflicts.py
+"""
+Отчет о проблемах в уже составленном расписании.
+
+Активные монтажи за период загружаются одним запросом к промежуточной
+таблице InstallationSchedule.installers, сортируются по монтажнику и
+времени, после чего каждый монтажник проходится заметающей прямой:
+в куче хранятся монтажи, еще не закончившиеся к началу текущего, и
+каждый из них пересекается с текущим. Сложность O(n log n + k), где k -
+число найденных пересечений, поэтому год расписаний проверяется за секунды.
+
+Находятся:
+- overlaps - пересекающиеся монтажи одного монтажника (двойное бронирование);
+- outside_hours - монтажи вне рабочих часов CALENDAR_SETTINGS;
+- overloads - дни, где монтажей больше MAX_INSTALLATIONS_PER_DAY;
+- gaps - простои между соседними монтажами: слишком короткие для еще одного
+  монтажа (unusable) или меньше времени на дорогу (no_travel_time).
+"""
+import heapq
+import time as time_module
+from dataclasses import dataclass, field
+from datetime import date as date_type
+from itertools import groupby
+from math import ceil
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+
+from user_accounts.models import User
+from .availability import ACTIVE_STATUSES, from_minutes, get_work_hours, to_minutes
+from .models import InstallationSchedule
+from .services import RouteCalculationService
+
+MINUTES_PER_DAY = 24 * 60
+DEFAULT_MIN_GAP_MINUTES = 45
+
+
+@dataclass
+class Booking:
+    """Монтаж монтажника: минуты от полуночи"""
+    schedule_id: int
+    installer_id: int
+    day: date_type
+    start: int
+    end: int
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+
+    @property
+    def point(self) -> Optional[Tuple[float, float]]:
+        if self.latitude is None or self.longitude is None:
+            return None
+        return self.latitude, self.longitude
+
+
+@dataclass
+class ConflictReport:
+    """Результат проверки расписания"""
+    date_from: date_type
+    date_to: date_type
+    bookings: int = 0
+    installers: Dict[int, str] = field(default_factory=dict)
+    overlaps: List[Dict] = field(default_factory=list)
+    outside_hours: List[Dict] = field(default_factory=list)
+    overloads: List[Dict] = field(default_factory=list)
+    gaps: List[Dict] = field(default_factory=list)
+    elapsed: float = 0.0
+
+    @property
+    def has_conflicts(self) -> bool:
+        return bool(self.overlaps or self.outside_hours or self.overloads)
+
+    def summary(self) -> Dict:
+        return {
+            'bookings': self.bookings,
+            'overlaps': len(self.overlaps),
+            'outside_hours': len(self.outside_hours),
+            'overloads': len(self.overloads),
+            'gaps': len(self.gaps),
+            'idle_minutes': sum(gap['idle_minutes'] for gap in self.gaps if gap['kind'] == 'unusable'),
+        }
+
+
+def load_bookings(date_from, date_to, installer_ids: Optional[Iterable[int]] = None) -> List[Booking]:
+    """Активные монтажи за период одним запросом, отсортированные по монтажнику и времени"""
+    through = InstallationSchedule.installers.through.objects.filter(
+        installationschedule__scheduled_date__range=(date_from, date_to),
+        installationschedule__status__in=ACTIVE_STATUSES,
+    )
+    if installer_ids is not None:
+        through = through.filter(user_id__in=[int(installer_id) for installer_id in installer_ids])
+
+    bookings = [
+        Booking(schedule_id, installer_id, day, to_minutes(start), to_minutes(end), latitude, longitude)
+        for installer_id, schedule_id, day, start, end, latitude, longitude in through.values_list(
+            'user_id', 'installationschedule_id',
+            'installationschedule__scheduled_date',
+            'installationschedule__scheduled_time_start',
+            'installationschedule__scheduled_time_end',
+            'installationschedule__latitude',
+            'installationschedule__longitude',
+        ).iterator(chunk_size=5000)
+    ]
+    bookings.sort(key=lambda booking: (booking.installer_id, booking.day, booking.start, booking.end))
+    return bookings
+
+
+def _travel_minutes(first: Booking, second: Booking) -> int:
+    if first.point is None or second.point is None:
+        return 0
+    distance = RouteCalculationService.calculate_distance(*first.point, *second.point)
+    return ceil(RouteCalculationService.estimate_travel_time(distance).total_seconds() / 60)
+
+
+def _booking(booking: Booking) -> Dict:
+    return {
+        'schedule_id': booking.schedule_id,
+        'start_time': from_minutes(booking.start),
+        'end_time': from_minutes(booking.end),
+    }
+
+
+def sweep_installer(bookings: List[Booking], report: ConflictReport, work_start: int, work_end: int,
+                    max_per_day: Optional[int], min_gap: int, job_minutes: int):
+    """Заметающая прямая по отсортированным монтажам одного монтажника"""
+    active = []  # куча (абсолютный конец, порядковый номер, монтаж)
+    for day, day_bookings in groupby(bookings, key=lambda booking: booking.day):
+        day_bookings = list(day_bookings)
+        installer_id = day_bookings[0].installer_id
+        offset = day.toordinal() * MINUTES_PER_DAY
+
+        if max_per_day and len(day_bookings) > max_per_day:
+            report.overloads.append({
+                'installer_id': installer_id,
+                'date': day,
+                'installations': len(day_bookings),
+                'limit': max_per_day,
+                'schedule_ids': [booking.schedule_id for booking in day_bookings],
+            })
+
+        latest = None  # монтаж, заканчивающийся позже всех предыдущих за день
+        for number, booking in enumerate(day_bookings):
+            start, end = offset + booking.start, offset + booking.end
+            while active and active[0][0] <= start:
+                heapq.heappop(active)
+            for _, _, other in active:
+                report.overlaps.append({
+                    'installer_id': installer_id,
+                    'date': day,
+                    'first': _booking(other),
+                    'second': _booking(booking),
+                    'overlap_minutes': min(other.end, booking.end) - booking.start,
+                })
+            heapq.heappush(active, (end, number, booking))
+
+            if booking.start < work_start or booking.end > work_end:
+                report.outside_hours.append({
+                    'installer_id': installer_id,
+                    'date': day,
+                    **_booking(booking),
+                })
+
+            if latest is not None and booking.start >= latest.end:
+                travel = _travel_minutes(latest, booking)
+                idle = booking.start - latest.end - travel
+                kind = None
+                if idle < 0:
+                    kind = 'no_travel_time'
+                elif min_gap <= idle < job_minutes:
+                    kind = 'unusable'
+                if kind:
+                    report.gaps.append({
+                        'installer_id': installer_id,
+                        'date': day,
+                        'kind': kind,
+                        'after_schedule_id': latest.schedule_id,
+                        'before_schedule_id': booking.schedule_id,
+                        'start_time': from_minutes(latest.end),
+                        'end_time': from_minutes(booking.start),
+                        'travel_minutes': travel,
+                        'idle_minutes': idle,
+                    })
+            if latest is None or booking.end > latest.end:
+                latest = booking
+
+
+def find_conflicts(date_from, date_to, installer_ids: Optional[Iterable[int]] = None,
+                   min_gap: int = DEFAULT_MIN_GAP_MINUTES, work_hours: Optional[Tuple[int, int]] = None,
+                   max_per_day: Optional[int] = None) -> ConflictReport:
+    """
+    Пересечения, монтажи вне рабочих часов, перегрузки и неэффективные
+    простои за период. Два запроса независимо от объема данных
+    """
+    began = time_module.perf_counter()
+    calendar_settings = getattr(settings, 'CALENDAR_SETTINGS', {})
+    work_start, work_end = work_hours or get_work_hours()
+    if max_per_day is None:
+        max_per_day = calendar_settings.get('MAX_INSTALLATIONS_PER_DAY')
+    job_minutes = int(calendar_settings.get('DEFAULT_INSTALLATION_DURATION', 2) * 60)
+
+    bookings = load_bookings(date_from, date_to, installer_ids)
+    report = ConflictReport(date_from, date_to, bookings=len(bookings))
+    report.installers = {
+        row['id']: f"{row['first_name']} {row['last_name']}".strip() or row['username']
+        for row in User.objects.filter(id__in={booking.installer_id for booking in bookings}).values(
+            'id', 'first_name', 'last_name', 'username'
+        )
+    }
+
+    for _, installer_bookings in groupby(bookings, key=lambda booking: booking.installer_id):
+        sweep_installer(list(installer_bookings), report, work_start, work_end, max_per_day, min_gap, job_minutes)
+
+    report.elapsed = time_module.perf_counter() - began
+    return report
@@ -0,0 +1,239 @@
+# calendar_app/daymodel.py
+"""
+Компактная модель дней для маршрутизации.
+
+DayModel хранит монтажи одним структурированным массивом NumPy (JOB_DTYPE):
+id расписания, день, координаты (NaN - нет), окно и длительность в минутах
+от полуночи, ранг приоритета. Бригады монтажей лежат плоским массивом
+crew_ids со смещениями crew_offsets: бригады монтажа i - это
+crew_ids[crew_offsets[i]:crew_offsets[i + 1]].
+
+Загрузка (DayModel.load) - два запроса values_list без экземпляров
+моделей и ленивых связей, время и длительности переводятся в минуты один
+раз. Из модели строятся входы обоих движков - монтажи дневного решателя
+(to_jobs) и задачи маршрутов по монтажникам (to_route_tasks). Обратно в
+ORM пишутся только измененные поля пакетными запросами (fill_coordinates).
+"""
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+from django.db.models import Q
+
+from user_accounts.models import User
+from . import geocoding
+from .availability import to_minutes
+from .batch_geocoding import geocode_many, request_background_geocoding
+from .models import InstallationSchedule
+from .route_tasks import DEFAULT_DURATION_MINUTES, PRIORITY_RANK, RouteTask, TaskStop
+from .vrp import Job
+
+JOB_DTYPE = np.dtype([
+    ('schedule_id', np.int64),
+    ('day', 'datetime64[D]'),
+    ('latitude', np.float64),
+    ('longitude', np.float64),
+    ('window_start', np.int16),
+    ('window_end', np.int16),
+    ('duration', np.int16),  # -1 - длительность не указана
+    ('priority', np.int8),  # PRIORITY_RANK
+])
+PRIORITY_NAMES = {rank: name for name, rank in PRIORITY_RANK.items()}
+NORMAL_PRIORITY = PRIORITY_RANK['normal']
+
+
+def installer_names(installer_ids: Iterable[int]) -> Dict[int, str]:
+    """Имена монтажников одним запросом: полное имя или логин"""
+    return {
+        installer_id: f'{first_name} {last_name}'.strip() or username
+        for installer_id, first_name, last_name, username in User.objects.filter(
+            id__in=list(installer_ids)
+        ).values_list('id', 'first_name', 'last_name', 'username')
+    }
+
+
+class DayModel:
+    """Монтажи нескольких дней в массивах; бригады - плоским списком со смещениями"""
+    __slots__ = ('jobs', 'crew_offsets', 'crew_ids', 'names', 'clients', '_rows')
+
+    def __init__(self, jobs: np.ndarray, crew_offsets: np.ndarray, crew_ids: np.ndarray,
+                 names: Optional[Dict[int, str]] = None,
+                 clients: Optional[Dict[int, Tuple[str, Optional[float], Optional[float]]]] = None):
+        self.jobs = jobs
+        self.crew_offsets = crew_offsets
+        self.crew_ids = crew_ids
+        self.names = names or {}
+        # Только для монтажей без координат: id расписания → (адрес, широта и долгота клиента)
+        self.clients = clients or {}
+        self._rows = None
+
+    def __len__(self) -> int:
+        return len(self.jobs)
+
+    @classmethod
+    def load(cls, dates, installer_ids: Optional[Iterable[int]] = None, statuses=('scheduled',),
+             installers_only: bool = False) -> 'DayModel':
+        """
+        Монтажи дней dates в статусах statuses по порядку (день, начало, id).
+        installer_ids - только монтажи этих монтажников и только они в бригадах;
+        installers_only - в бригадах только пользователи с ролью installer
+        """
+        dates = list(dates)
+        Through = InstallationSchedule.installers.through
+        assignments = Through.objects.filter(
+            installationschedule__scheduled_date__in=dates,
+            installationschedule__status__in=statuses,
+        )
+        schedules = InstallationSchedule.objects.filter(scheduled_date__in=dates, status__in=statuses)
+        if installer_ids is not None:
+            installer_ids = [int(installer_id) for installer_id in installer_ids]
+            assignments = assignments.filter(user_id__in=installer_ids)
+            schedules = schedules.filter(
+                Q(installers__in=installer_ids) & (Q(installers__role='installer') if installers_only else Q())
+            ).distinct()
+        if installers_only:
+            assignments = assignments.filter(user__role='installer')
+        pairs = list(assignments.values_list('installationschedule_id', 'user_id'))
+
+        rows = list(schedules.order_by('scheduled_date', 'scheduled_time_start', 'id').values_list(
+            'id', 'scheduled_date', 'latitude', 'longitude',
+            'scheduled_time_start', 'scheduled_time_end', 'estimated_duration', 'priority',
+            'order__client__address', 'order__client__latitude', 'order__client__longitude',
+        ))
+        jobs = np.empty(len(rows), dtype=JOB_DTYPE)
+        clients = {}
+        for row, (schedule_id, day, latitude, longitude, start, end, duration, priority,
+                  address, client_latitude, client_longitude) in enumerate(rows):
+            if not latitude or not longitude:
+                latitude = longitude = np.nan
+                clients[schedule_id] = (address, client_latitude, client_longitude)
+            jobs[row] = (
+                schedule_id, day, latitude, longitude, to_minutes(start), to_minutes(end),
+                int(duration.total_seconds() // 60) if duration else -1,
+                PRIORITY_RANK.get(priority, NORMAL_PRIORITY),
+            )
+
+        # Бригады по строкам монтажей: сортировка пар по строке и смещения
+        position = {schedule_id: row for row, schedule_id in enumerate(jobs['schedule_id'].tolist())}
+        pairs = sorted((position[schedule_id], user_id) for schedule_id, user_id in pairs if schedule_id in position)
+        crew_rows = np.fromiter((row for row, _ in pairs), dtype=np.int64, count=len(pairs))
+        crew_ids = np.fromiter((user_id for _, user_id in pairs), dtype=np.int64, count=len(pairs))
+        counts = np.bincount(crew_rows, minlength=len(jobs))
+        if installers_only:
+            # Монтажи без монтажников в маршруты не попадают
+            keep = counts > 0
+            clients = {
+                schedule_id: client for schedule_id, client in clients.items() if keep[position[schedule_id]]
+            }
+            jobs, counts = jobs[keep], counts[keep]
+        crew_offsets = np.zeros(len(jobs) + 1, dtype=np.int64)
+        np.cumsum(counts, out=crew_offsets[1:])
+        return cls(jobs, crew_offsets, crew_ids, clients=clients)
+
+    def load_names(self) -> Dict[int, str]:
+        """Имена всех монтажников модели (для задач маршрутов)"""
+        self.names = installer_names(self.installer_ids())
+        return self.names
+
+    def installer_ids(self) -> Set[int]:
+        return set(self.crew_ids.tolist())
+
+    def crews(self, row: int) -> Tuple[int, ...]:
+        return tuple(self.crew_ids[self.crew_offsets[row]:self.crew_offsets[row + 1]].tolist())
+
+    def row(self, schedule_id: int) -> Optional[int]:
+        if self._rows is None:
+            self._rows = {schedule_id: row for row, schedule_id in enumerate(self.jobs['schedule_id'].tolist())}
+        return self._rows.get(schedule_id)
+
+    def crews_of(self, schedule_id: int) -> Tuple[int, ...]:
+        row = self.row(schedule_id)
+        return self.crews(row) if row is not None else ()
+
+    def durations(self, default: Optional[int] = None) -> np.ndarray:
+        """Длительности в минутах; без указанной - default или ширина окна"""
+        fallback = (self.jobs['window_end'] - self.jobs['window_start']).clip(min=0) if default is None else default
+        return np.where(self.jobs['duration'] >= 0, self.jobs['duration'], fallback).astype(np.int64)
+
+    def has_point(self) -> np.ndarray:
+        return ~(np.isnan(self.jobs['latitude']) | np.isnan(self.jobs['longitude']))
+
+    def fill_coordinates(self, geocode: bool = True) -> int:
+        """
+        Координаты монтажей без них: из клиента, иначе по адресу - пакетным
+        геокодированием (geocode) или только из кэша с постановкой остальных
+        адресов в фоновое геокодирование. Найденные сохраняются одним bulk_update
+        """
+        if not self.clients:
+            return 0
+        addresses = {address for address, latitude, _ in self.clients.values() if address and latitude is None}
+        if geocode:
+            geocoded = geocode_many(addresses)
+        else:
+            geocoded = geocoding.cached_many(addresses)
+            if len(geocoded) < len(addresses):
+                request_background_geocoding()
+
+        updated = []
+        for schedule_id, (address, latitude, longitude) in list(self.clients.items()):
+            coordinates = (latitude, longitude) if latitude is not None else geocoded.get(address)
+            if not coordinates or coordinates[1] is None:
+                continue
+            row = self.row(schedule_id)
+            self.jobs['latitude'][row], self.jobs['longitude'][row] = coordinates
+            del self.clients[schedule_id]
+            updated.append(InstallationSchedule(id=schedule_id, latitude=coordinates[0], longitude=coordinates[1]))
+        if updated:
+            InstallationSchedule.objects.bulk_update(updated, ['latitude', 'longitude'])
+        return len(updated)
+
+    def to_jobs(self) -> List[Job]:
+        """Монтажи с координатами для дневного решателя (calendar_app.vrp)"""
+        rows = np.flatnonzero(self.has_point())
+        jobs = self.jobs[rows]
+        durations = self.durations()[rows]
+        earliest = jobs['window_start'].astype(np.int64)
+        latest = np.maximum(earliest, jobs['window_end'] - durations)
+        return [
+            Job(
+                id=schedule_id, point=(latitude, longitude), earliest=start, latest=end,
+                duration=duration, priority=priority, crews=self.crews(row),
+            )
+            for row, schedule_id, latitude, longitude, start, end, duration, priority in zip(
+                rows.tolist(), jobs['schedule_id'].tolist(), jobs['latitude'].tolist(), jobs['longitude'].tolist(),
+                earliest.tolist(), latest.tolist(), durations.tolist(), jobs['priority'].tolist(),
+            )
+        ]
+
+    def to_route_tasks(self, depot: Optional[Tuple[float, float]] = None, time_budget: float = 1.0,
+                       seed: int = 0) -> List[RouteTask]:
+        """Задачи (день, монтажник) для compute_route() по порядку дня и имени монтажника"""
+        if not self.names:
+            self.load_names()
+        has_point = self.has_point().tolist()
+        grouped = {}
+        for row, (schedule_id, day, latitude, longitude, priority, duration) in enumerate(zip(
+            self.jobs['schedule_id'].tolist(), self.jobs['day'].tolist(),
+            self.jobs['latitude'].tolist(), self.jobs['longitude'].tolist(),
+            self.jobs['priority'].tolist(), self.durations(DEFAULT_DURATION_MINUTES).tolist(),
+        )):
+            stop = TaskStop(
+                schedule_id, latitude if has_point[row] else None, longitude if has_point[row] else None,
+                PRIORITY_NAMES.get(priority, 'normal'), duration,
+            )
+            for installer_id in self.crews(row):
+                grouped.setdefault((day, installer_id), []).append(stop)
+
+        return [
+            RouteTask(
+                installer_id=installer_id,
+                installer_name=self.names.get(installer_id, f'#{installer_id}'),
+                date=day,
+                stops=tuple(stops),
+                depot=depot,
+                time_budget=time_budget,
+                seed=seed,
+            )
+            for (day, installer_id), stops in sorted(
+                grouped.items(), key=lambda item: (item[0][0], self.names.get(item[0][1], ''))
+            )
+        ]
@@ -0,0 +1,105 @@
+# calendar_app/geocoder_stub.py
+"""
+Локальная заглушка геокодера в формате ответа Яндекс.Карт.
+
+Координаты детерминированно выводятся из хэша адреса (в пределах Москвы),
+адреса со словом "нет"/"unknown" не находятся. Используется в разработке
+и проверках вместо настоящего API: GEOCODER['URL'] = 'http://127.0.0.1:<port>/'.
+Для проверки повторов заглушка может отвечать 503 на каждый fail_every-й
+запрос и 429 при превышении max_qps запросов в секунду.
+"""
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+MOSCOW_CENTER = (55.7558, 37.6176)
+SPREAD = 0.15
+NOT_FOUND_MARKERS = ('нет', 'unknown')
+
+
+def stub_coordinates(address: str):
+    """Координаты заглушки для адреса или None"""
+    lowered = address.lower()
+    if not lowered.strip() or any(marker in lowered for marker in NOT_FOUND_MARKERS):
+        return None
+    digest = hashlib.sha1(lowered.encode('utf-8')).digest()
+    latitude = MOSCOW_CENTER[0] + (digest[0] / 255 - 0.5) * 2 * SPREAD
+    longitude = MOSCOW_CENTER[1] + (digest[1] / 255 - 0.5) * 2 * SPREAD
+    return round(latitude, 6), round(longitude, 6)
+
+
+class StubGeocoderHandler(BaseHTTPRequestHandler):
+    """GET /?geocode=<адрес>&format=json - ответ в формате Яндекс.Карт"""
+
+    def do_GET(self):
+        address = parse_qs(urlparse(self.path).query).get('geocode', [''])[0]
+        failure = self.server.register_request()
+        if failure:
+            self.send_error(failure)
+            return
+        coordinates = stub_coordinates(address)
+
+        members = []
+        if coordinates:
+            members.append({'GeoObject': {
+                'name': address,
+                'Point': {'pos': f'{coordinates[1]} {coordinates[0]}'},
+            }})
+        body = json.dumps({'response': {'GeoObjectCollection': {'featureMember': members}}}).encode('utf-8')
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class StubGeocoderServer(ThreadingHTTPServer):
+    """Сервер заглушки со счетчиком запросов и имитацией отказов"""
+    daemon_threads = True
+
+    def __init__(self, address, verbose: bool = False, fail_every: int = 0, max_qps: float = 0):
+        super().__init__(address, StubGeocoderHandler)
+        self.verbose = verbose
+        self.fail_every = fail_every
+        self.max_qps = max_qps
+        self.requests_count = 0
+        self.rejected_count = 0
+        self._recent = []
+        self._lock = threading.Lock()
+
+    def register_request(self) -> int:
+        """Учитывает запрос; возвращает код ошибки (429/503) или 0"""
+        with self._lock:
+            self.requests_count += 1
+            now = time.monotonic()
+            self._recent = [moment for moment in self._recent if now - moment < 1.0]
+            self._recent.append(now)
+            failure = 0
+            if self.max_qps and len(self._recent) > self.max_qps:
+                failure = 429
+            elif self.fail_every and self.requests_count % self.fail_every == 0:
+                failure = 503
+            if failure:
+                self.rejected_count += 1
+            return failure
+
+
+def make_stub_server(host: str = '127.0.0.1', port: int = 0, verbose: bool = False,
+                     fail_every: int = 0, max_qps: float = 0) -> StubGeocoderServer:
+    return StubGeocoderServer((host, port), verbose, fail_every, max_qps)
+
+
+def start_stub_geocoder(host: str = '127.0.0.1', port: int = 0, verbose: bool = False,
+                        fail_every: int = 0, max_qps: float = 0):
+    """Запускает заглушку в фоновом потоке; возвращает (server, url). Остановка - server.shutdown()"""
+    server = make_stub_server(host, port, verbose, fail_every, max_qps)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://{host}:{server.server_address[1]}/'
@@ -0,0 +1,290 @@
+# calendar_app/geocoding.py
+"""
+Геокодирование адресов с кэшированием.
+
+Адрес нормализуется (регистр, пробелы, пунктуация, "ул."/"улица" и т.п.)
+и ищется сначала в LRU-кэше процесса, затем в таблице GeocodeCache и только
+потом запрашивается у провайдера. Отрицательный ответ ("адрес не найден")
+тоже кэшируется, но на меньший срок. Сетевые ошибки не кэшируются.
+
+Без ключа API к Яндекс.Картам провайдер не вызывается: случайные
+координаты портят маршруты, поэтому адрес просто остается без координат.
+Для разработки URL провайдера можно направить на локальную заглушку
+(calendar_app.geocoder_stub), ключ для нее не нужен.
+"""
+import logging
+import re
+import threading
+from collections import OrderedDict
+from datetime import timedelta
+from typing import Optional, Tuple
+from urllib.parse import urlparse
+
+import requests
+from django.conf import settings
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+YANDEX_GEOCODER_URL = 'https://geocode-maps.yandex.ru/1.x/'
+MAX_KEY_LENGTH = 255
+
+# Сокращения, которые пишут по-разному
+ABBREVIATIONS = (
+    (r'\bулица\b', 'ул'),
+    (r'\bпроспект\b', 'пр-т'),
+    (r'\bпереулок\b', 'пер'),
+    (r'\bшоссе\b', 'ш'),
+    (r'\bбульвар\b', 'б-р'),
+    (r'\bплощадь\b', 'пл'),
+    (r'\bдом\b', 'д'),
+    (r'\bкорпус\b', 'к'),
+    (r'\bкорп\b', 'к'),
+    (r'\bстроение\b', 'стр'),
+    (r'\bквартира\b', 'кв'),
+    (r'\bгород\b', 'г'),
+)
+
+_NOT_FOUND = object()
+
+
+class GeocodingError(Exception):
+    """
+    Провайдер недоступен или вернул ошибку - результат не кэшируется.
+    retryable - временная ошибка (сеть, 429, 5xx), запрос можно повторить
+    """
+
+    def __init__(self, message: str, retryable: bool = True):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+def get_geocoder_settings() -> dict:
+    """Настройки GEOCODER со значениями по умолчанию"""
+    defaults = {
+        'URL': YANDEX_GEOCODER_URL,
+        'TIMEOUT': 5,
+        'CACHE_TTL_DAYS': 180,
+        'NEGATIVE_TTL_DAYS': 7,
+        'MEMORY_CACHE_SIZE': 2048,
+        'BATCH_WORKERS': 4,
+        'BATCH_QPS': 10,
+        'MAX_RETRIES': 4,
+        'BACKOFF_SECONDS': 0.5,
+        'BACKGROUND': True,
+    }
+    defaults.update(getattr(settings, 'GEOCODER', {}))
+    return defaults
+
+
+def normalize_address(address: str) -> str:
+    """Ключ кэша: нижний регистр, ё→е, единые сокращения, без лишней пунктуации"""
+    value = (address or '').lower().replace('ё', 'е')
+    value = re.sub(r'[.,;:"«»()]', ' ', value)
+    for pattern, replacement in ABBREVIATIONS:
+        value = re.sub(pattern, replacement, value)
+    return ' '.join(value.split())[:MAX_KEY_LENGTH]
+
+
+class LRUCache:
+    """Потокобезопасный LRU со сроком жизни записей"""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Значение или _NOT_FOUND (None - закэшированный отрицательный ответ)"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return _NOT_FOUND
+            value, expires_at = entry
+            if expires_at <= timezone.now():
+                del self._data[key]
+                return _NOT_FOUND
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, expires_at):
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+memory_cache = LRUCache(get_geocoder_settings()['MEMORY_CACHE_SIZE'])
+
+
+class YandexGeocoder:
+    """HTTP-геокодер в формате Яндекс.Карт (тот же формат отдает заглушка)"""
+
+    def __init__(self, url: str, api_key: str = '', timeout: float = 5, session=None):
+        self.url = url
+        self.api_key = api_key
+        self.timeout = timeout
+        self.session = session or requests
+        # Провайдер в кэше: 'yandex' или адрес стороннего/локального сервера
+        self.name = 'yandex' if url == YANDEX_GEOCODER_URL else urlparse(url).netloc[:30]
+
+    @property
+    def available(self) -> bool:
+        """Настоящему API Яндекса нужен ключ, локальной заглушке - нет"""
+        return bool(self.api_key) or self.url != YANDEX_GEOCODER_URL
+
+    def geocode(self, address: str) -> Optional[Tuple[float, float]]:
+        """(широта, долгота); None - адрес не найден; GeocodingError - сбой запроса"""
+        params = {'geocode': address, 'format': 'json', 'results': 1}
+        if self.api_key:
+            params['apikey'] = self.api_key
+        try:
+            response = self.session.get(self.url, params=params, timeout=self.timeout)
+        except requests.RequestException as e:
+            raise GeocodingError(str(e)) from e
+
+        if response.status_code >= 400:
+            retryable = response.status_code == 429 or response.status_code >= 500
+            raise GeocodingError(f'HTTP {response.status_code}', retryable=retryable)
+        try:
+            feature_member = response.json()['response']['GeoObjectCollection']['featureMember']
+        except (ValueError, KeyError, TypeError) as e:
+            raise GeocodingError(f'Неожиданный ответ геокодера: {e}', retryable=False) from e
+
+        if not feature_member:
+            return None
+        try:
+            longitude, latitude = (float(value) for value in feature_member[0]['GeoObject']['Point']['pos'].split())
+        except (KeyError, ValueError, TypeError) as e:
+            raise GeocodingError(f'Неожиданный ответ геокодера: {e}', retryable=False) from e
+        return latitude, longitude
+
+
+def get_geocoder() -> YandexGeocoder:
+    config = get_geocoder_settings()
+    return YandexGeocoder(config['URL'], getattr(settings, 'YANDEX_MAPS_API_KEY', ''), config['TIMEOUT'])
+
+
+def _expires_at(found: bool):
+    config = get_geocoder_settings()
+    days = config['CACHE_TTL_DAYS'] if found else config['NEGATIVE_TTL_DAYS']
+    return timezone.now() + timedelta(days=days)
+
+
+def cached_coordinates(address: str):
+    """
+    Координаты из кэшей без обращения к провайдеру:
+    (широта, долгота), None - адрес известен как ненайденный, _NOT_FOUND - нет в кэше
+    """
+    from .models import GeocodeCache
+
+    key = normalize_address(address)
+    value = memory_cache.get(key)
+    if value is not _NOT_FOUND:
+        return value
+
+    entry = GeocodeCache.objects.filter(address_key=key, expires_at__gt=timezone.now()).first()
+    if entry is None:
+        return _NOT_FOUND
+    value = entry.coordinates
+    memory_cache.set(key, value, entry.expires_at)
+    return value
+
+
+def cached_many(addresses) -> dict:
+    """Найденные в кэшах адреса одним запросом к GeocodeCache: {адрес: координаты или None}"""
+    from .models import GeocodeCache
+
+    result, missing = {}, {}
+    for address in addresses:
+        key = normalize_address(address)
+        value = memory_cache.get(key)
+        if value is _NOT_FOUND:
+            missing.setdefault(key, []).append(address)
+        else:
+            result[address] = value
+
+    if missing:
+        for entry in GeocodeCache.objects.filter(address_key__in=list(missing), expires_at__gt=timezone.now()):
+            memory_cache.set(entry.address_key, entry.coordinates, entry.expires_at)
+            for address in missing[entry.address_key]:
+                result[address] = entry.coordinates
+    return result
+
+
+def store_many(results: dict, provider: str):
+    """Пакетное сохранение ответов провайдера {адрес: координаты или None} одним upsert"""
+    from .models import GeocodeCache
+
+    entries = {}
+    for address, coordinates in results.items():
+        key = normalize_address(address)
+        expires_at = _expires_at(coordinates is not None)
+        entries[key] = GeocodeCache(
+            address_key=key,
+            address=address[:MAX_KEY_LENGTH],
+            latitude=coordinates[0] if coordinates else None,
+            longitude=coordinates[1] if coordinates else None,
+            found=coordinates is not None,
+            provider=provider,
+            expires_at=expires_at,
+        )
+        memory_cache.set(key, coordinates, expires_at)
+
+    GeocodeCache.objects.bulk_create(
+        list(entries.values()),
+        update_conflicts=True,
+        unique_fields=['address_key'],
+        update_fields=['address', 'latitude', 'longitude', 'found', 'provider', 'expires_at', 'updated_at'],
+    )
+
+
+def store(address: str, coordinates: Optional[Tuple[float, float]], provider: str):
+    """Сохраняет ответ провайдера в таблицу и в LRU"""
+    from .models import GeocodeCache
+
+    key = normalize_address(address)
+    expires_at = _expires_at(coordinates is not None)
+    GeocodeCache.objects.update_or_create(
+        address_key=key,
+        defaults={
+            'address': address[:MAX_KEY_LENGTH],
+            'latitude': coordinates[0] if coordinates else None,
+            'longitude': coordinates[1] if coordinates else None,
+            'found': coordinates is not None,
+            'provider': provider,
+            'expires_at': expires_at,
+        }
+    )
+    memory_cache.set(key, coordinates, expires_at)
+
+
+def geocode(address: str, geocoder: Optional[YandexGeocoder] = None) -> Optional[Tuple[float, float]]:
+    """Координаты адреса: LRU → GeocodeCache → провайдер"""
+    if not address or not normalize_address(address):
+        return None
+
+    value = cached_coordinates(address)
+    if value is not _NOT_FOUND:
+        return value
+
+    geocoder = geocoder or get_geocoder()
+    if not geocoder.available:
+        return None
+
+    try:
+        coordinates = geocoder.geocode(address)
+    except GeocodingError as e:
+        logger.warning("Ошибка геокодирования для адреса '%s': %s", address, e)
+        return None
+
+    store(address, coordinates, geocoder.name)
+    return coordinates
@@ -0,0 +1,71 @@
+# calendar_app/holds.py
+"""
+Временные брони окон монтажников (SlotHold).
+
+Менеджер, пока говорит с клиентом, придерживает найденное окно: бронь
+занимает его на SLOT_HOLD_MINUTES минут для всех проверок доступности
+(AvailabilityIndex, OccupancyIndex) и поиска слотов. Брони загружаются
+вместе с занятостью одним запросом на период, без запросов по монтажникам.
+Бронь своего токена (hold_token) занятостью не считается - по нему
+CalendarService.create_schedule превращает бронь в расписание.
+
+Истекшие брони не учитываются фильтром expires_at и удаляются лениво -
+при создании новых броней (purge_expired).
+"""
+import secrets
+from datetime import timedelta
+from typing import Iterable, Optional
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import SlotHold
+
+DEFAULT_HOLD_MINUTES = 10
+MAX_HOLD_MINUTES = 60
+
+
+def hold_minutes(minutes: Optional[int] = None) -> int:
+    """Срок брони: запрошенный (не больше MAX_HOLD_MINUTES) или SLOT_HOLD_MINUTES из настроек"""
+    if minutes is None:
+        minutes = getattr(settings, 'CALENDAR_SETTINGS', {}).get('SLOT_HOLD_MINUTES', DEFAULT_HOLD_MINUTES)
+    return max(1, min(int(minutes), MAX_HOLD_MINUTES))
+
+
+def new_token() -> str:
+    return secrets.token_urlsafe(24)
+
+
+def active_holds(date_from, date_to=None, installer_ids: Optional[Iterable[int]] = None,
+                 exclude_token: Optional[str] = None):
+    """
+    Неистекшие брони за период: строки (id, монтажник, день, начало, конец).
+    exclude_token - брони вызывающего, не мешающие ему самому
+    """
+    holds = SlotHold.objects.filter(
+        date__range=(date_from, date_to or date_from),
+        expires_at__gt=timezone.now(),
+    )
+    if installer_ids is not None:
+        holds = holds.filter(installer_id__in=[int(installer_id) for installer_id in installer_ids])
+    if exclude_token:
+        holds = holds.exclude(token=exclude_token)
+    return holds.values_list('id', 'installer_id', 'date', 'start_time', 'end_time')
+
+
+def purge_expired() -> int:
+    """Удаляет истекшие брони"""
+    deleted, _ = SlotHold.objects.filter(expires_at__lte=timezone.now()).delete()
+    return deleted
+
+
+def release(token: str) -> int:
+    """Снимает брони токена, возвращает их количество"""
+    if not token:
+        return 0
+    deleted, _ = SlotHold.objects.filter(token=token).delete()
+    return deleted
+
+
+def expiry(minutes: Optional[int] = None):
+    return timezone.now() + timedelta(minutes=hold_minutes(minutes))
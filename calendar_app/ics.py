@@ -0,0 +1,149 @@
+# calendar_app/ics.py
+"""
+Подписка монтажника на свои монтажи в формате iCalendar (RFC 5545).
+
+Лента строится из CalendarService.get_installer_schedule за период
+ICS_PAST_DAYS назад - ICS_FUTURE_DAYS вперед и кэшируется целиком
+(текст и ETag) под ключом монтажника вместе с версией: последним
+updated_at, числом и суммой id расписаний периода и именем монтажника.
+Версия проверяется одним агрегирующим запросом при каждом опросе, поэтому
+кэш в памяти процесса не отдает устаревшую ленту после правки в другом
+воркере. Правки клиента, заказа и пользователей меняют updated_at
+расписаний (calendar_app.signals). При общем кэше (Redis) сигналы еще и
+сбрасывают ленты сразу. Календарные приложения, опрашивающие ленту раз в
+15 минут, получают готовый ответ или 304 без построения ленты. ETag
+выводится из версии и периода, DTSTAMP и Last-Modified - последний
+updated_at, поэтому ответы разных воркеров совпадают.
+"""
+import hashlib
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Max, Sum
+from django.utils import timezone
+
+CACHE_KEY = 'calendar:ics:{installer_id}'
+CACHE_TIMEOUT = 24 * 60 * 60
+PRODUCT_ID = '-//CRM AC//Installation calendar//RU'
+
+
+def _feed_settings():
+    calendar_settings = getattr(settings, 'CALENDAR_SETTINGS', {})
+    return calendar_settings.get('ICS_PAST_DAYS', 30), calendar_settings.get('ICS_FUTURE_DAYS', 90)
+
+
+def escape_text(value) -> str:
+    """Экранирование TEXT: обратная косая черта, ';', ',' и переводы строк"""
+    value = str(value or '')
+    return (
+        value.replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+        .replace('\r\n', '\\n').replace('\n', '\\n').replace('\r', '\\n')
+    )
+
+
+def fold_line(line: str) -> str:
+    """Перенос строк длиннее 75 байт (продолжение начинается с пробела)"""
+    encoded = line.encode('utf-8')
+    if len(encoded) <= 75:
+        return line
+    parts, current, size = [], '', 0
+    for char in line:
+        char_size = len(char.encode('utf-8'))
+        limit = 75 if not parts else 74
+        if size + char_size > limit:
+            parts.append(current)
+            current, size = '', 0
+        current += char
+        size += char_size
+    parts.append(current)
+    return '\r\n '.join(parts)
+
+
+def _utc(date, time) -> str:
+    moment = timezone.make_aware(datetime.combine(date, time))
+    return moment.astimezone(dt_timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def render_feed(installer_name: str, schedule: list, stamp=None) -> str:
+    """Текст календаря для записей CalendarService.get_installer_schedule"""
+    stamp = (stamp or timezone.now()).astimezone(dt_timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+    lines = [
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        f'PRODID:{PRODUCT_ID}',
+        'CALSCALE:GREGORIAN',
+        'METHOD:PUBLISH',
+        f'X-WR-CALNAME:{escape_text(f"Монтажи - {installer_name}")}',
+        'X-PUBLISHED-TTL:PT15M',
+    ]
+    for item in schedule:
+        description = [f'Заказ №{item["order_id"]}', f'Телефон: {item["client_phone"]}']
+        if item['notes']:
+            description.append(item['notes'])
+        summary = f'Монтаж: {item["client_name"]}'
+        lines += [
+            'BEGIN:VEVENT',
+            f'UID:schedule-{item["id"]}@crm-ac',
+            f'DTSTAMP:{stamp}',
+            f'DTSTART:{_utc(item["date"], item["start_time"])}',
+            f'DTEND:{_utc(item["date"], item["end_time"])}',
+            f'SUMMARY:{escape_text(summary)}',
+            f'LOCATION:{escape_text(item["client_address"])}',
+            f'DESCRIPTION:{escape_text(chr(10).join(description))}',
+            'STATUS:CANCELLED' if item['status'] == 'cancelled' else 'STATUS:CONFIRMED',
+            'END:VEVENT',
+        ]
+    lines.append('END:VCALENDAR')
+    return '\r\n'.join(fold_line(line) for line in lines) + '\r\n'
+
+
+def feed_version(installer, window) -> tuple:
+    """Версия ленты из базы: меняется при любой правке, удалении или переназначении расписаний"""
+    from .models import InstallationSchedule
+
+    summary = InstallationSchedule.objects.filter(
+        installers=installer, scheduled_date__range=window,
+    ).aggregate(last_updated=Max('updated_at'), total=Count('id'), ids=Sum('id'))
+    return summary['last_updated'], summary['total'], summary['ids'], installer.get_full_name() or installer.username
+
+
+def get_feed(installer) -> dict:
+    """
+    Готовая лента {'body', 'etag', 'last_modified', 'window'} из кэша.
+    При промахе или смене дня (сдвиг периода) лента строится заново
+    """
+    from .services import CalendarService
+
+    past_days, future_days = _feed_settings()
+    today = timezone.localdate()
+    window = (today - timedelta(days=past_days), today + timedelta(days=future_days))
+
+    key = CACHE_KEY.format(installer_id=installer.id)
+    version = feed_version(installer, window)
+    feed = cache.get(key)
+    if feed is not None and feed['window'] == window and feed.get('version') == version:
+        return feed
+
+    # Ответ зависит только от версии и периода: воркеры, построившие ленту
+    # в разное время, отдают одинаковые текст, ETag и Last-Modified
+    last_updated = version[0] or timezone.now()
+    schedule = CalendarService.get_installer_schedule(installer.id, *window)
+    body = render_feed(installer.get_full_name() or installer.username, schedule, stamp=last_updated)
+    feed = {
+        'body': body,
+        'etag': f'"{hashlib.md5(repr((version, window)).encode()).hexdigest()}"',
+        'last_modified': last_updated,
+        'window': window,
+        'version': version,
+    }
+    cache.set(key, feed, CACHE_TIMEOUT)
+    return feed
+
+
+def invalidate_feeds(installer_ids):
+    """Сброс лент монтажников после коммита транзакции"""
+    keys = [CACHE_KEY.format(installer_id=installer_id) for installer_id in set(installer_ids) if installer_id]
+    if keys:
+        transaction.on_commit(lambda: cache.delete_many(keys))
@@ -0,0 +1,277 @@
+# calendar_app/insertion.py
+"""
+Вставка нового монтажа в уже построенные маршруты (cheapest insertion).
+
+Все точки маршрутов за период загружаются одним запросом и раскладываются
+в плоские массивы позиций вставки: для каждой позиции - соседние точки,
+время отъезда от предыдущей и прибытия к следующей. Добавочный пробег
+d(пред, новая) + d(новая, след) - d(пред, след) и время в пути считаются
+в одной метрике - у провайдера расстояний (calendar_app.travel): участки
+до новой точки и от нее - двумя запросами матриц на все позиции сразу,
+заменяемые участки между соседними точками - из кэша матриц маршрутов,
+которые заполняет оптимизация.
+
+Окна соблюдаются так: новая точка не раньше начала своего окна и
+заканчивается до его конца, а сдвиг последующих точек не больше их запаса
+- до конца окна монтажа (scheduled_time_end) или рабочего дня. Запас
+считается обратным накопленным минимумом по маршруту. Время нового монтажа
+проверяется по AvailabilityIndex, поэтому учитываются монтажи вне
+маршрута и временные брони.
+"""
+import time as time_module
+from math import ceil
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+from django.conf import settings
+
+from .availability import AvailabilityIndex, from_minutes, get_work_hours, to_minutes
+from .models import RoutePoint
+from .routing import EARTH_RADIUS_KM
+from .travel import ANY_TIME, HaversineProvider, TravelProviderError, get_provider, time_bucket, travel_matrices
+
+DEFAULT_LIMIT = 10
+
+
+def pair_distances(first: np.ndarray, second: np.ndarray) -> np.ndarray:
+    """Гаверсинус (км) между first[i] и second[i]; NaN-координаты дают 0"""
+    first, second = np.radians(first), np.radians(second)
+    delta = second - first
+    a = (np.sin(delta[:, 0] / 2) ** 2
+         + np.cos(first[:, 0]) * np.cos(second[:, 0]) * np.sin(delta[:, 1] / 2) ** 2)
+    distances = 2 * EARTH_RADIUS_KM * np.arctan2(np.sqrt(a), np.sqrt(np.clip(1 - a, 0, None)))
+    return np.nan_to_num(distances)
+
+
+def point_legs(location: Tuple[float, float], points: np.ndarray, start_minutes: Optional[int] = None,
+               provider=None) -> Tuple[np.ndarray, ...]:
+    """
+    Участки между каждой из points и location у провайдера расстояний -
+    двумя запросами матриц по уникальным точкам: (км до location, минуты до
+    location, км от location, минуты от location). NaN-точки дают 0
+    """
+    provider = provider or get_provider()
+    bucket = time_bucket(start_minutes) if provider.time_dependent else ANY_TIME
+    legs = tuple(np.zeros(len(points)) for _ in range(4))
+    valid = ~np.isnan(points).any(axis=1)
+    if not valid.any():
+        return legs
+
+    unique, inverse = np.unique(points[valid], axis=0, return_inverse=True)
+    unique = [tuple(point) for point in unique.tolist()]
+    try:
+        to_km, to_time = provider.matrix(unique, [location], bucket)
+        from_km, from_time = provider.matrix([location], unique, bucket)
+    except TravelProviderError:
+        # Как в travel_matrices: без провайдера - прямые расстояния
+        to_km, to_time = HaversineProvider().matrix(unique, [location])
+        from_km, from_time = HaversineProvider().matrix([location], unique)
+    inverse = inverse.reshape(-1)
+    for leg, values in zip(legs, (to_km[:, 0], to_time[:, 0], from_km[0], from_time[0])):
+        leg[valid] = np.asarray(values, dtype=np.float64)[inverse]
+    return legs
+
+
+def _route_legs(routes, depot, start_minutes: Optional[int], provider) -> Dict[int, Tuple[np.ndarray, np.ndarray]]:
+    """
+    Матрицы (км, минуты) точек каждого маршрута (первой - склад, если задан)
+    у провайдера расстояний; пары, посчитанные при оптимизации, берутся из кэша
+    """
+    route_ids, groups = [], []
+    for route_id, (_, _, stops) in routes.items():
+        points = [(stop[6], stop[7]) for stop in stops]
+        if all(latitude is not None and longitude is not None for latitude, longitude in points):
+            route_ids.append(route_id)
+            groups.append(([tuple(depot)] if depot else []) + points)
+    return dict(zip(route_ids, travel_matrices(groups, start_minutes, provider))) if groups else {}
+
+
+def _load_routes(date_from, date_to, installer_ids=None):
+    """Точки маршрутов за период по порядку: {route_id: (монтажник, день, [точки])}"""
+    points = RoutePoint.objects.filter(route__date__range=(date_from, date_to))
+    if installer_ids is not None:
+        points = points.filter(route__installer_id__in=list(installer_ids))
+
+    routes = {}
+    for row in points.order_by('route_id', 'sequence_number').values_list(
+        'route_id', 'route__installer_id', 'route__date', 'schedule_id',
+        'arrival_time', 'departure_time',
+        'schedule__scheduled_time_start', 'schedule__scheduled_time_end', 'schedule__estimated_duration',
+        'schedule__latitude', 'schedule__longitude',
+    ):
+        route_id, installer_id, day = row[:3]
+        routes.setdefault(route_id, (installer_id, day, []))[2].append(row[3:])
+    return routes
+
+
+def _arrays(routes, work_start: int, work_end: int, max_per_day: Optional[int], route_legs=None,
+            depot: bool = False):
+    """
+    Плоские массивы позиций вставки по всем маршрутам. route_legs - матрицы
+    _route_legs() для заменяемых участков (без матриц маршрута участок - 0)
+    """
+    route_legs = route_legs or {}
+    route_ids, positions = [], []
+    previous_points, next_points = [], []
+    previous_departure, next_arrival, next_slack, replaced, replaced_minutes = [], [], [], [], []
+    has_previous, has_next = [], []
+    schedule_ids = {}
+
+    for route_id, (_, _, stops) in routes.items():
+        if max_per_day and len(stops) >= max_per_day:
+            continue
+
+        arrivals, departures, latest, points = [], [], [], []
+        for schedule_id, arrival, departure, window_start, window_end, duration, latitude, longitude in stops:
+            start = to_minutes(arrival) if arrival else to_minutes(window_start)
+            minutes = int(duration.total_seconds() // 60) if duration else to_minutes(window_end) - to_minutes(window_start)
+            end = to_minutes(departure) if departure else start + minutes
+            arrivals.append(start)
+            departures.append(end)
+            # Точку можно сдвинуть до конца окна, но не раньше уже запланированного прибытия
+            latest.append(max(to_minutes(window_end) - (end - start), start))
+            points.append((latitude if latitude is not None else np.nan,
+                           longitude if longitude is not None else np.nan))
+        schedule_ids[route_id] = [stop[0] for stop in stops]
+
+        # Запас сдвига: минимум по этой и всем следующим точкам, последняя ограничена рабочим днем
+        slack = np.asarray(latest) - np.asarray(arrivals)
+        slack[-1] = min(slack[-1], max(0, work_end - departures[-1]))
+        slack = np.minimum.accumulate(slack[::-1])[::-1]
+
+        for position in range(len(stops) + 1):
+            route_ids.append(route_id)
+            positions.append(position)
+            has_previous.append(position > 0)
+            has_next.append(position < len(stops))
+            previous_points.append(points[position - 1] if position > 0 else (np.nan, np.nan))
+            next_points.append(points[position] if position < len(stops) else (np.nan, np.nan))
+            previous_departure.append(departures[position - 1] if position > 0 else work_start)
+            next_arrival.append(arrivals[position] if position < len(stops) else work_end)
+            next_slack.append(int(slack[position]) if position < len(stops) else 0)
+            # Заменяемый участок: между соседними точками или от склада до первой
+            distance = minutes = 0.0
+            if route_id in route_legs and position < len(stops) and (position > 0 or depot):
+                offset = 1 if depot else 0
+                distances, durations = route_legs[route_id]
+                source, target = position - 1 + offset, position + offset
+                distance, minutes = float(distances[source, target]), float(durations[source, target])
+            replaced.append(distance)
+            replaced_minutes.append(minutes)
+
+    return {
+        'route_id': np.asarray(route_ids, dtype=np.int64),
+        'position': np.asarray(positions, dtype=np.int64),
+        'has_previous': np.asarray(has_previous, dtype=bool),
+        'has_next': np.asarray(has_next, dtype=bool),
+        'previous_point': np.asarray(previous_points, dtype=np.float64).reshape(-1, 2),
+        'next_point': np.asarray(next_points, dtype=np.float64).reshape(-1, 2),
+        'previous_departure': np.asarray(previous_departure, dtype=np.int64),
+        'next_arrival': np.asarray(next_arrival, dtype=np.int64),
+        'next_slack': np.asarray(next_slack, dtype=np.int64),
+        'replaced': np.asarray(replaced, dtype=np.float64),
+        'replaced_minutes': np.asarray(replaced_minutes, dtype=np.float64),
+    }, schedule_ids
+
+
+def cheapest_insertions(location: Tuple[float, float], duration: int, date_from, date_to,
+                        window: Optional[Tuple[int, int]] = None, limit: int = DEFAULT_LIMIT,
+                        installer_ids=None, work_hours: Optional[Tuple[int, int]] = None) -> Dict:
+    """
+    Лучшая позиция вставки монтажа (duration минут, точка location) в каждый
+    маршрут за период; варианты ранжированы по добавочному пробегу.
+    window - окно клиента в минутах от полуночи (по умолчанию рабочий день)
+    """
+    began = time_module.perf_counter()
+    work_start, work_end = work_hours or get_work_hours()
+    window_start, window_end = window or (work_start, work_end)
+    depot = getattr(settings, 'CALENDAR_SETTINGS', {}).get('WAREHOUSE_COORDINATES')
+    max_per_day = getattr(settings, 'CALENDAR_SETTINGS', {}).get('MAX_INSTALLATIONS_PER_DAY')
+
+    routes = _load_routes(date_from, date_to, installer_ids)
+    result = {'routes': len(routes), 'positions': 0, 'options': [], 'elapsed': 0.0}
+    if not routes:
+        result['elapsed'] = round(time_module.perf_counter() - began, 3)
+        return result
+    provider = get_provider()
+    arrays, schedule_ids = _arrays(
+        routes, work_start, work_end, max_per_day,
+        route_legs=_route_legs(routes, depot, work_start, provider), depot=bool(depot),
+    )
+    size = len(arrays['position'])
+    result['positions'] = size
+    if not size:
+        result['elapsed'] = round(time_module.perf_counter() - began, 3)
+        return result
+
+    previous_point = arrays['previous_point'].copy()
+    if depot:
+        # Первая точка маршрута - переезд со склада
+        previous_point[~arrays['has_previous']] = depot
+    # Все участки - в метрике провайдера расстояний, как и заменяемые:
+    # к новой точке от предыдущих, от нее - к следующим
+    to_km, to_time, from_km, from_time = point_legs(
+        location, np.concatenate((previous_point, arrays['next_point'])), work_start, provider
+    )
+    distance_in, minutes_in = to_km[:size], to_time[:size]
+    distance_out, minutes_out = from_km[size:], from_time[size:]
+    has_in = arrays['has_previous'] | bool(depot)
+    distance_in, minutes_in = np.where(has_in, distance_in, 0.0), np.where(has_in, minutes_in, 0.0)
+    distance_out = np.where(arrays['has_next'], distance_out, 0.0)
+    minutes_out = np.where(arrays['has_next'], minutes_out, 0.0)
+    added = np.maximum(distance_in + distance_out - arrays['replaced'], 0.0)
+    added_minutes = np.maximum(minutes_in + minutes_out - arrays['replaced_minutes'], 0.0)
+
+    # Время: прибытие к новой точке, ее окончание и сдвиг следующей точки
+    travel_in = np.ceil(minutes_in).astype(np.int64)
+    arrival = np.maximum(arrays['previous_departure'] + travel_in, max(window_start, work_start))
+    departure = arrival + duration
+    shift = departure + np.ceil(minutes_out).astype(np.int64) - arrays['next_arrival']
+    feasible = (departure <= min(window_end, work_end)) & np.where(
+        arrays['has_next'], shift <= arrays['next_slack'], True
+    )
+
+    candidates = np.flatnonzero(feasible)
+    candidates = candidates[np.lexsort((arrival[candidates], added[candidates]))]
+
+    # Время нового монтажа не должно пересекаться с монтажами вне маршрута и бронями
+    index = AvailabilityIndex.load(
+        date_from, date_to, installer_ids={installer_id for installer_id, _, _ in routes.values()}
+    )
+    seen = set()
+    for candidate in candidates:
+        route_id = int(arrays['route_id'][candidate])
+        if route_id in seen:
+            continue
+        installer_id, day, _ = routes[route_id]
+        start, end = int(arrival[candidate]), int(departure[candidate])
+        route_schedules = set(schedule_ids[route_id])
+        busy = [
+            interval for interval in index.day_intervals(installer_id, day)
+            if interval.start < end and interval.end > start and interval.schedule_id not in route_schedules
+        ]
+        if busy:
+            continue
+        seen.add(route_id)
+
+        position = int(arrays['position'][candidate])
+        stops = schedule_ids[route_id]
+        result['options'].append({
+            'route_id': route_id,
+            'installer_id': installer_id,
+            'installer': index.installers.get(installer_id, f'#{installer_id}'),
+            'date': day,
+            'position': position + 1,
+            'after_schedule_id': stops[position - 1] if position > 0 else None,
+            'before_schedule_id': stops[position] if position < len(stops) else None,
+            'arrival_time': from_minutes(start),
+            'departure_time': from_minutes(end),
+            'added_distance_km': round(float(added[candidate]), 2),
+            'added_travel_minutes': ceil(float(added_minutes[candidate])),
+            'downstream_shift_minutes': max(0, int(shift[candidate])) if position < len(stops) else 0,
+        })
+        if len(result['options']) >= limit:
+            break
+
+    result['elapsed'] = round(time_module.perf_counter() - began, 3)
+    return result
@@ -0,0 +1,182 @@
+# calendar_app/management/commands/benchmark_day_model.py
+import gc
+import time
+import tracemalloc
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db.models import Count, Prefetch
+
+from calendar_app.availability import to_minutes
+from calendar_app.daymodel import DayModel
+from calendar_app.models import InstallationSchedule
+from calendar_app.route_benchmark import _first_free_monday, _materialize, _rolled_back, _schedule_jobs
+from calendar_app.route_tasks import DEFAULT_DURATION_MINUTES, PRIORITY_RANK, RouteTask, TaskStop
+from calendar_app.synthetic import generate_day
+from calendar_app.vrp import Job
+from orders.models import Order
+from user_accounts.models import User
+
+
+def orm_jobs(dates):
+    """Прежняя загрузка дня для дневного решателя: экземпляры моделей и связи"""
+    schedules = list(InstallationSchedule.objects.filter(
+        scheduled_date__in=dates, status='scheduled'
+    ).select_related('order__client').prefetch_related('installers'))
+    jobs = []
+    for schedule in schedules:
+        if not schedule.latitude or not schedule.longitude:
+            continue
+        earliest = to_minutes(schedule.scheduled_time_start)
+        slot = max(to_minutes(schedule.scheduled_time_end) - earliest, 0)
+        duration = int(schedule.estimated_duration.total_seconds() // 60) if schedule.estimated_duration else slot
+        jobs.append(Job(
+            id=schedule.id,
+            point=(schedule.latitude, schedule.longitude),
+            earliest=earliest,
+            latest=max(earliest, earliest + slot - duration),
+            duration=duration,
+            priority=PRIORITY_RANK.get(schedule.priority, 2),
+            crews=tuple(installer.id for installer in schedule.installers.all()),
+        ))
+    return schedules, jobs
+
+
+def compact_jobs(dates):
+    model = DayModel.load(dates)
+    return model, model.to_jobs()
+
+
+def orm_tasks(dates):
+    """Прежняя сборка задач маршрутов (без геокодирования и матриц)"""
+    schedules = list(
+        InstallationSchedule.objects.filter(scheduled_date__in=dates, status='scheduled')
+        .select_related('order__client')
+        .prefetch_related(Prefetch(
+            'installers', queryset=User.objects.filter(role='installer'), to_attr='route_installers'
+        ))
+        .order_by('scheduled_date', 'scheduled_time_start', 'id')
+    )
+    grouped = {}
+    for schedule in schedules:
+        duration = (
+            int(schedule.estimated_duration.total_seconds() // 60)
+            if schedule.estimated_duration else DEFAULT_DURATION_MINUTES
+        )
+        stop = TaskStop(schedule.id, schedule.latitude, schedule.longitude, schedule.priority, duration)
+        for installer in schedule.route_installers:
+            key = (schedule.scheduled_date, installer.id)
+            grouped.setdefault(key, (installer.get_full_name() or installer.username, []))[1].append(stop)
+    tasks = [
+        RouteTask(installer_id=installer_id, installer_name=name, date=day, stops=tuple(stops))
+        for (day, installer_id), (name, stops) in sorted(grouped.items(), key=lambda item: (item[0][0], item[1][0]))
+    ]
+    return schedules, tasks
+
+
+def compact_tasks(dates):
+    model = DayModel.load(dates, installers_only=True)
+    return model, model.to_route_tasks()
+
+
+def orm_pending_orders():
+    """Прежние входы create_schedules: заказы с клиентами и монтажники"""
+    orders = list(Order.objects.filter(
+        status__in=['new', 'in_progress'], schedule__isnull=True
+    ).select_related('client').annotate(services_count=Count('items')).order_by('created_at', 'id'))
+    return orders, list(User.objects.filter(role='installer', is_active=True))
+
+
+def compact_pending_orders():
+    orders = list(Order.objects.filter(
+        status__in=['new', 'in_progress'], schedule__isnull=True
+    ).annotate(services_count=Count('items')).order_by('created_at', 'id').values_list(
+        'id', 'created_at', 'services_count',
+        'client__name', 'client__address', 'client__latitude', 'client__longitude',
+        named=True,
+    ))
+    installers = list(User.objects.filter(role='installer', is_active=True).values_list(
+        'id', 'first_name', 'last_name'
+    ))
+    return orders, {installer_id: f'{first_name} {last_name}'.strip() for installer_id, first_name, last_name in installers}
+
+
+class Command(BaseCommand):
+    help = (
+        'Микробенчмарк загрузки дней на синтетических данных (calendar_app.synthetic): экземпляры '
+        'моделей ORM против компактной модели (calendar_app.daymodel) - время и пиковая память. '
+        'Данные пишутся в транзакции, которая откатывается, - база не изменяется'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--crews', type=int, default=20, help='Количество бригад')
+        parser.add_argument('--jobs', type=int, default=150, help='Количество монтажей в день')
+        parser.add_argument('--days', type=int, default=1, help='Количество синтетических дней')
+        parser.add_argument('--seed', type=int, default=0, help='Seed генерации')
+        parser.add_argument('--clusters', type=int, default=8, help='Районов с монтажами (0 - равномерно)')
+        parser.add_argument('--repeat', type=int, default=5, help='Повторов замера времени (берется лучший)')
+
+    def handle(self, *args, **options):
+        _rolled_back(lambda: self._run(options))
+        self.stdout.write(self.style.SUCCESS('\nГотово'))
+
+    def _run(self, options):
+        first = _first_free_monday()
+        dates = [first + timedelta(days=offset) for offset in range(max(1, options['days']))]
+        for number, day in enumerate(dates):
+            jobs, crews, _ = generate_day(
+                options['crews'], options['jobs'], seed=options['seed'] + number, clusters=options['clusters']
+            )
+            installer_of_crew, order_of_job = _materialize(jobs, crews, tag=f'_day{number}')
+            _schedule_jobs(jobs, day, installer_of_crew, order_of_job)
+        # Заказы без расписания для create_schedules - еще один синтетический день
+        jobs, crews, _ = generate_day(
+            options['crews'], options['jobs'], seed=options['seed'] + len(dates), clusters=options['clusters']
+        )
+        _materialize(jobs, crews, tag='_pending')
+
+        total = InstallationSchedule.objects.filter(scheduled_date__in=dates, status='scheduled').count()
+        self.stdout.write(
+            f'Синтетические дни {dates[0]} - {dates[-1]}: бригад {options["crews"]}, монтажей {total}, '
+            f'районов {options["clusters"]}, seed {options["seed"]}, повторов: {options["repeat"]}\n'
+        )
+        self.stdout.write(
+            f'{"сценарий":<22} {"ORM, мс":>9} {"компактно, мс":>14} {"ускорение":>10} '
+            f'{"ORM, КБ":>9} {"компактно, КБ":>14} {"экономия":>9}'
+        )
+
+        for title, orm, compact in (
+            ('дневной решатель', lambda: orm_jobs(dates), lambda: compact_jobs(dates)),
+            ('маршруты монтажников', lambda: orm_tasks(dates), lambda: compact_tasks(dates)),
+            ('create_schedules', orm_pending_orders, compact_pending_orders),
+        ):
+            orm_time, compact_time = self._best_time(orm, options['repeat']), self._best_time(compact, options['repeat'])
+            orm_memory, compact_memory = self._peak_memory(orm), self._peak_memory(compact)
+            self.stdout.write(
+                f'{title:<22} {orm_time * 1000:>9.1f} {compact_time * 1000:>14.1f} '
+                f'{orm_time / max(compact_time, 1e-9):>9.1f}x '
+                f'{orm_memory / 1024:>9.0f} {compact_memory / 1024:>14.0f} '
+                f'{orm_memory / max(compact_memory, 1):>8.1f}x'
+            )
+
+    @staticmethod
+    def _best_time(function, repeat: int) -> float:
+        best = None
+        for _ in range(max(1, repeat)):
+            gc.collect()
+            began = time.perf_counter()
+            function()
+            elapsed = time.perf_counter() - began
+            best = elapsed if best is None else min(best, elapsed)
+        return best
+
+    @staticmethod
+    def _peak_memory(function) -> int:
+        """Пиковая память Python-объектов за вызов (tracemalloc)"""
+        gc.collect()
+        tracemalloc.start()
+        try:
+            function()
+            return tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
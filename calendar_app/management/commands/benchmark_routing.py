@@ -0,0 +1,120 @@
+# calendar_app/management/commands/benchmark_routing.py
+import json
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.serializers.json import DjangoJSONEncoder
+
+from calendar_app.route_benchmark import BASELINE_PATH, DEFAULT_TOLERANCES, MODES, compare_with_baseline, run_benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        'Бенчмарк маршрутизации и планирования на синтетических днях: время, пиковая память, '
+        'пробег и нарушения окон в JSON и сравнение с базовым результатом. База не изменяется'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--crews', type=int, default=20, help='Количество бригад')
+        parser.add_argument('--jobs', type=int, default=150, help='Количество монтажей в день')
+        parser.add_argument('--days', type=int, default=3, help='Количество синтетических дней')
+        parser.add_argument('--seed', type=int, default=0, help='Seed генерации и поиска')
+        parser.add_argument('--clusters', type=int, default=8, help='Районов с монтажами (0 - равномерно)')
+        parser.add_argument('--time-budget', type=float, default=2.0, help='Бюджет дневного решателя на день (с)')
+        parser.add_argument('--route-time-budget', type=float, default=0.2, help='Бюджет маршрута монтажника (с)')
+        parser.add_argument(
+            '--modes',
+            type=str,
+            default=','.join(MODES),
+            help=f'Режимы через запятую: {", ".join(MODES)}'
+        )
+        parser.add_argument('--output', type=str, default='routing_benchmark.json', help='Файл результатов JSON')
+        parser.add_argument(
+            '--baseline',
+            type=str,
+            default=str(BASELINE_PATH),
+            help='Базовый результат для сравнения'
+        )
+        parser.add_argument('--save-baseline', action='store_true', help='Сохранить результаты как базовые')
+        parser.add_argument(
+            '--fail-on-regression',
+            action='store_true',
+            help='Завершиться ошибкой при регрессии относительно базового результата'
+        )
+        for metric, tolerance in DEFAULT_TOLERANCES.items():
+            parser.add_argument(
+                f'--{metric.replace("_", "-")}-tolerance',
+                type=float,
+                default=tolerance,
+                help=f'Допустимый рост {metric} (доля), по умолчанию {tolerance}'
+            )
+
+    def handle(self, *args, **options):
+        modes = [mode.strip() for mode in options['modes'].split(',') if mode.strip()]
+        unknown = [mode for mode in modes if mode not in MODES]
+        if unknown or not modes:
+            raise CommandError(f'Неизвестные режимы: {", ".join(unknown)}. Доступны: {", ".join(MODES)}')
+
+        self.stdout.write(
+            f'{options["days"]} дн. × {options["crews"]} бригад × {options["jobs"]} монтажей, '
+            f'районов {options["clusters"]}, seed {options["seed"]}'
+        )
+        self.stdout.write(
+            f'{"день":>4} {"режим":<10} {"время, с":>9} {"память, КБ":>11} {"пробег, км":>11} '
+            f'{"нарушений":>9} {"не заплан.":>10}'
+        )
+        results = run_benchmark(
+            crews=options['crews'], jobs=options['jobs'], days=options['days'], seed=options['seed'],
+            clusters=options['clusters'], time_budget=options['time_budget'],
+            route_time_budget=options['route_time_budget'], modes=modes, progress=self._progress,
+        )
+        for mode, total in results['totals'].items():
+            self._progress('Σ', mode, total)
+
+        baseline_path = Path(options['baseline'])
+        if baseline_path.exists():
+            baseline = json.loads(baseline_path.read_text(encoding='utf-8'))
+            tolerances = {metric: options[f'{metric}_tolerance'] for metric in DEFAULT_TOLERANCES}
+            results['comparison'] = compare_with_baseline(results, baseline, tolerances)
+            self._report(results['comparison'], baseline_path)
+        else:
+            self.stdout.write(self.style.WARNING(f'\nБазовый результат {baseline_path} не найден'))
+
+        Path(options['output']).write_text(
+            json.dumps(results, cls=DjangoJSONEncoder, ensure_ascii=False, indent=2), encoding='utf-8'
+        )
+        self.stdout.write(self.style.SUCCESS(f'\nРезультаты сохранены в {options["output"]}'))
+
+        if options['save_baseline']:
+            baseline_path.parent.mkdir(parents=True, exist_ok=True)
+            results.pop('comparison', None)
+            baseline_path.write_text(
+                json.dumps(results, cls=DjangoJSONEncoder, ensure_ascii=False, indent=2) + '\n', encoding='utf-8'
+            )
+            self.stdout.write(self.style.SUCCESS(f'Базовый результат сохранен в {baseline_path}'))
+
+        comparison = results.get('comparison')
+        if options['fail_on_regression'] and comparison and comparison['regressions']:
+            raise CommandError(f'Регрессий относительно базового результата: {len(comparison["regressions"])}')
+
+    def _progress(self, day, mode, metrics):
+        self.stdout.write(
+            f'{day:>4} {mode:<10} {metrics["wall_time"]:>9.2f} {metrics["peak_memory_kb"]:>11} '
+            f'{metrics["distance_km"]:>11.1f} {metrics.get("window_violations", "-"):>9} '
+            f'{metrics.get("unscheduled", "-"):>10}'
+        )
+
+    def _report(self, comparison, baseline_path):
+        self.stdout.write(f'\nСравнение с {baseline_path}:')
+        if not comparison['params_match']:
+            self.stdout.write(self.style.WARNING(
+                f'  Параметры отличаются ({", ".join(comparison["mismatched_params"])}) - сравнение ориентировочное'
+            ))
+        for row in comparison['rows']:
+            change = f'{row["change"]:+.1%}' if row['change'] is not None else '-'
+            line = f'  {row["mode"]:<10} {row["metric"]:<18} {row["baseline"]:>10} → {row["current"]:<10} {change}'
+            self.stdout.write(self.style.ERROR(line + '  регрессия') if row['regression'] else line)
+        if comparison['regressions']:
+            self.stdout.write(self.style.ERROR(f'Регрессий: {len(comparison["regressions"])}'))
+        else:
+            self.stdout.write(self.style.SUCCESS('Регрессий нет'))
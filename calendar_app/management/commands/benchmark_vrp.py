@@ -0,0 +1,70 @@
+# calendar_app/management/commands/benchmark_vrp.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from calendar_app.routing import solve_route
+from calendar_app.synthetic import generate_day
+from calendar_app.vrp import DaySolver
+
+
+class Command(BaseCommand):
+    help = 'Замер дневной маршрутизации на синтетических днях (бригады × монтажи)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--crews', type=int, default=20, help='Количество бригад')
+        parser.add_argument('--jobs', type=int, default=150, help='Количество монтажей в день')
+        parser.add_argument('--days', type=int, default=3, help='Количество синтетических дней')
+        parser.add_argument('--seed', type=int, default=0, help='Seed генерации и поиска')
+        parser.add_argument('--time-budget', type=float, default=5.0, help='Бюджет времени на день (с)')
+        parser.add_argument('--crew-cost', type=float, default=30.0, help='Условная стоимость выезда бригады (км)')
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f'{"день":>4} {"текущий, км":>12} {"нарушений":>9} {"по монтажн., км":>16} {"нарушений":>9} '
+            f'{"дневной, км":>12} {"нарушений":>9} {"переназн.":>9} {"время, с":>9}'
+        )
+        totals = [0.0, 0, 0.0, 0, 0.0, 0]
+
+        for day in range(options['days']):
+            jobs, crews, depot = generate_day(options['crews'], options['jobs'], seed=options['seed'] + day)
+            checker = DaySolver(jobs, crews, depot, allow_reassign=False)
+
+            # Текущее распределение по времени окна
+            current_distance, current_violations = 0.0, 0
+            # Прежний режим: маршрут каждой бригады отдельно, без учета окон
+            installer_distance, installer_violations = 0.0, 0
+            for crew in crews:
+                own = sorted((job for job in jobs if crew.id in job.crews), key=lambda job: (job.earliest, job.id))
+                if not own:
+                    continue
+                distance, violations = checker.check_sequence(crew.id, [job.id for job in own])
+                current_distance += distance
+                current_violations += violations
+
+                route = solve_route([depot] + [job.point for job in own], start=0,
+                                    time_budget=0.2, seed=options['seed'])
+                ordered = [own[index - 1].id for index in route.tour[1:]]
+                distance, violations = checker.check_sequence(crew.id, ordered)
+                installer_distance += distance
+                installer_violations += violations
+
+            began = time.perf_counter()
+            solution = DaySolver(jobs, crews, depot, crew_cost=options['crew_cost']).solve(options['time_budget'], options['seed'])
+            elapsed = time.perf_counter() - began
+
+            self.stdout.write(
+                f'{day + 1:>4} {current_distance:>12.1f} {current_violations:>9} '
+                f'{installer_distance:>16.1f} {installer_violations:>9} '
+                f'{solution.distance:>12.1f} {len(solution.unassigned):>9} '
+                f'{len(solution.reassigned):>9} {elapsed:>9.2f}'
+            )
+            for index, value in enumerate((current_distance, current_violations, installer_distance,
+                                           installer_violations, solution.distance, len(solution.unassigned))):
+                totals[index] += value
+
+        self.stdout.write(self.style.SUCCESS(
+            f'\nИтого: текущее {totals[0]:.1f} км ({totals[1]} нарушений), '
+            f'по монтажникам {totals[2]:.1f} км ({totals[3]} нарушений), '
+            f'дневной решатель {totals[4]:.1f} км ({totals[5]} нарушений)'
+        ))
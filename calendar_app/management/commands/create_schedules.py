@@ -1,10 +1,15 @@
 # calendar_app/management/commands/create_schedules.py
 from django.core.management.base import BaseCommand
+from django.db.models import Count
 from django.utils import timezone
 from datetime import datetime, timedelta, time
 from django.conf import settings
-from calendar_app.services import CalendarService
+from calendar_app import ics
+from calendar_app.availability import AvailabilityIndex, to_minutes, from_minutes
+from calendar_app.batch_geocoding import geocode_many
+from calendar_app.booking import booking_section, sync_assignments
 from calendar_app.models import InstallationSchedule
+from calendar_app.occupancy import refresh_days
 from orders.models import Order
 from user_accounts.models import User
 
@@ -51,11 +56,18 @@ class Command(BaseCommand):
         work_start_time = datetime.strptime(work_start, '%H:%M').time()
         work_end_time = datetime.strptime(work_end, '%H:%M').time()
 
-        # Находим заказы без расписания
-        orders_without_schedule = Order.objects.filter(
+        # Находим заказы без расписания: сначала самые старые.
+        # Планирование идет по строкам values_list, экземпляры моделей не создаются
+        orders_without_schedule = list(Order.objects.filter(
             status__in=['new', 'in_progress'],
             schedule__isnull=True
-        ).select_related('client', 'manager').prefetch_related('installers')
+        ).annotate(
+            services_count=Count('items')
+        ).order_by('created_at', 'id').values_list(
+            'id', 'created_at', 'services_count',
+            'client__name', 'client__address', 'client__latitude', 'client__longitude',
+            named=True,
+        ))
 
         if not orders_without_schedule:
             self.stdout.write(
@@ -64,11 +76,16 @@ class Command(BaseCommand):
             return
 
         self.stdout.write(
-            f'Найдено {orders_without_schedule.count()} заказов без расписания'
+            f'Найдено {len(orders_without_schedule)} заказов без расписания'
         )
 
         # Получаем доступных монтажников
-        available_installers = User.objects.filter(role='installer', is_active=True)
+        installers = list(User.objects.filter(role='installer', is_active=True).values_list(
+            'id', 'first_name', 'last_name'
+        ))
+        available_installers = [installer_id for installer_id, _, _ in installers]
+        # Как User.get_full_name(): у монтажника без имени - пустая строка
+        names = {installer_id: f'{first_name} {last_name}'.strip() for installer_id, first_name, last_name in installers}
         
         if not available_installers:
             self.stdout.write(
@@ -76,15 +93,24 @@ class Command(BaseCommand):
             )
             return
 
-        # Планируем расписания
+        # Вся занятость на горизонт планирования загружается один раз,
+        # дальше календарь ведется в памяти и обновляется после каждого назначения
+        max_search_days = 14  # Максимум 2 недели вперед
         current_date = start_date
-        schedules_created = 0
-        
+        index = AvailabilityIndex.load(
+            current_date, current_date + timedelta(days=max_search_days - 1),
+            installer_ids=available_installers
+        )
+        work_start_minutes = to_minutes(work_start_time)
+        work_end_minutes = to_minutes(work_end_time)
+        today = timezone.now().date()
+
+        planned = []
         for order in orders_without_schedule:
-            self.stdout.write(f'\nПланирование заказа #{order.id} - {order.client.name}')
+            self.stdout.write(f'\nПланирование заказа #{order.id} - {order.client__name}')
             
             # Определяем приоритет на основе даты создания заказа
-            days_old = (timezone.now().date() - order.created_at.date()).days
+            days_old = (today - order.created_at.date()).days
             if days_old > 7:
                 priority = 'high'
             elif days_old > 3:
@@ -93,7 +119,7 @@ class Command(BaseCommand):
                 priority = 'low'
 
             # Определяем продолжительность на основе количества услуг
-            services_count = order.items.count()
+            services_count = order.services_count
             if services_count <= 1:
                 duration_hours = 1
             elif services_count <= 3:
@@ -101,121 +127,145 @@ class Command(BaseCommand):
             else:
                 duration_hours = 3
 
-            # Ищем подходящее время
-            scheduled = False
-            search_date = current_date
-            max_search_days = 14  # Максимум 2 недели вперед
-
-            for day_offset in range(max_search_days):
-                search_date = current_date + timedelta(days=day_offset)
-                
-                # Проверяем выходные (можно настроить)
-                if search_date.weekday() >= 5:  # Суббота и воскресенье
-                    continue
+            slot = self._find_slot(
+                index, available_installers, current_date, max_search_days,
+                duration_hours * 60, work_start_minutes, work_end_minutes, max_per_day
+            )
 
-                # Ищем доступных монтажников на этот день
-                for installer in available_installers:
-                    # Проверяем загруженность монтажника
-                    daily_schedules = InstallationSchedule.objects.filter(
-                        installers=installer,
-                        scheduled_date=search_date,
-                        status__in=['scheduled', 'in_progress']
-                    ).count()
-
-                    if daily_schedules >= max_per_day:
-                        continue
-
-                    # Ищем свободное время
-                    existing_schedules = InstallationSchedule.objects.filter(
-                        installers=installer,
-                        scheduled_date=search_date,
-                        status__in=['scheduled', 'in_progress']
-                    ).order_by('scheduled_time_start')
-
-                    # Простой алгоритм поиска свободного слота
-                    current_time = work_start_time
-                    slot_found = False
-
-                    for existing_schedule in existing_schedules:
-                        # Проверяем, помещается ли наше время до следующего расписания
-                        end_time = datetime.combine(search_date, current_time)
-                        end_time += timedelta(hours=duration_hours)
-                        
-                        if end_time.time() <= existing_schedule.scheduled_time_start:
-                            slot_found = True
-                            break
-                        
-                        # Сдвигаем время после этого расписания
-                        current_time = existing_schedule.scheduled_time_end
-
-                    # Если не нашли слот между расписаниями, проверяем после последнего
-                    if not slot_found:
-                        end_time = datetime.combine(search_date, current_time)
-                        end_time += timedelta(hours=duration_hours)
-                        
-                        if end_time.time() <= work_end_time:
-                            slot_found = True
-
-                    if slot_found:
-                        # Создаем расписание
-                        end_time = datetime.combine(search_date, current_time)
-                        end_time += timedelta(hours=duration_hours)
-
-                        schedule_data = {
-                            'scheduled_date': search_date,
-                            'start_time': current_time,
-                            'end_time': end_time.time(),
-                            'installers_ids': [installer.id],
-                            'priority': priority,
-                            'estimated_duration': timedelta(hours=duration_hours),
-                            'notes': f'Автоматически запланировано ({services_count} услуг)'
-                        }
-
-                        if options['dry_run']:
-                            self.stdout.write(
-                                f'  План: {search_date} {current_time}-{end_time.time()} '
-                                f'({installer.get_full_name()}, приоритет: {priority})'
-                            )
-                        else:
-                            try:
-                                CalendarService.create_schedule(
-                                    order=order,
-                                    **schedule_data
-                                )
-                                schedules_created += 1
-                                self.stdout.write(
-                                    self.style.SUCCESS(
-                                        f'  ✓ Запланировано: {search_date} {current_time}-{end_time.time()} '
-                                        f'({installer.get_full_name()})'
-                                    )
-                                )
-                            except Exception as e:
-                                self.stdout.write(
-                                    self.style.ERROR(f'  Ошибка создания расписания: {str(e)}')
-                                )
-
-                        scheduled = True
-                        break
-
-                if scheduled:
-                    break
-
-            if not scheduled:
+            if not slot:
                 self.stdout.write(
                     self.style.WARNING(f'  Не удалось запланировать заказ #{order.id} в ближайшие {max_search_days} дней')
                 )
+                continue
+
+            search_date, installer_id, start_minutes = slot
+            end_minutes = start_minutes + duration_hours * 60
+            start_slot_time, end_slot_time = from_minutes(start_minutes), from_minutes(end_minutes)
+            index.add(installer_id, search_date, start_minutes, end_minutes)
+
+            planned.append((order, installer_id, InstallationSchedule(
+                order_id=order.id,
+                scheduled_date=search_date,
+                scheduled_time_start=start_slot_time,
+                scheduled_time_end=end_slot_time,
+                priority=priority,
+                estimated_duration=timedelta(hours=duration_hours),
+                notes=f'Автоматически запланировано ({services_count} услуг)'
+            )))
+
+            if options['dry_run']:
+                self.stdout.write(
+                    f'  План: {search_date} {start_slot_time}-{end_slot_time} '
+                    f'({names[installer_id]}, приоритет: {priority})'
+                )
+            else:
+                self.stdout.write(
+                    self.style.SUCCESS(
+                        f'  ✓ Запланировано: {search_date} {start_slot_time}-{end_slot_time} '
+                        f'({names[installer_id]})'
+                    )
+                )
 
         # Итоговая статистика
         if options['dry_run']:
             self.stdout.write(
-                self.style.SUCCESS(f'\nПлан создания {schedules_created} расписаний готов')
+                self.style.SUCCESS(f'\nПлан создания {len(planned)} расписаний готов')
             )
-        else:
+            return
+
+        # Адреса без координат геокодируются пакетно до открытия транзакции
+        geocoded = geocode_many({
+            order.client__address for order, _, _ in planned if order.client__latitude is None
+        })
+
+        try:
+            schedules_created, taken = self._save_schedules(planned, geocoded)
+        except Exception as e:
             self.stdout.write(
-                self.style.SUCCESS(f'\nСоздано {schedules_created} расписаний')
+                self.style.ERROR(f'  Ошибка создания расписаний: {str(e)}')
             )
+            schedules_created, taken = 0, []
 
-            # Предлагаем оптимизировать маршруты
-            if schedules_created > 0:
-                self.stdout.write('\nРекомендуется запустить оптимизацию маршрутов:')
-                self.stdout.write('python manage.py optimize_routes --days-ahead 7')
\ No newline at end of file
+        for order in taken:
+            self.stdout.write(
+                self.style.WARNING(f'  Окно заказа #{order.id} заняли во время планирования - заказ не запланирован')
+            )
+
+        self.stdout.write(
+            self.style.SUCCESS(f'\nСоздано {schedules_created} расписаний')
+        )
+
+        # Предлагаем оптимизировать маршруты
+        if schedules_created > 0:
+            self.stdout.write('\nРекомендуется запустить оптимизацию маршрутов:')
+            self.stdout.write('python manage.py optimize_routes --days-ahead 7')
+
+    @staticmethod
+    def _find_slot(index, installer_ids, current_date, max_search_days, duration,
+                   work_start, work_end, max_per_day):
+        """Первый подходящий слот: (дата, id монтажника, начало в минутах) или None"""
+        for day_offset in range(max_search_days):
+            search_date = current_date + timedelta(days=day_offset)
+            
+            # Проверяем выходные (можно настроить)
+            if search_date.weekday() >= 5:  # Суббота и воскресенье
+                continue
+
+            for installer_id in installer_ids:
+                # Проверяем загруженность монтажника
+                if len(index.day_intervals(installer_id, search_date)) >= max_per_day:
+                    continue
+
+                # Первое окно, куда помещается монтаж
+                windows = index.free_windows(installer_id, search_date, work_start, work_end, duration)
+                if windows:
+                    return search_date, installer_id, windows[0][0]
+        return None
+
+    @staticmethod
+    def _save_schedules(planned, geocoded=None):
+        """
+        Все расписания и назначения монтажников - двумя bulk_create в booking_section.
+        Занятость перечитывается под блокировкой: окна, которые после планирования
+        занял параллельный запрос, не записываются. Возвращает (создано, заказы занятых окон)
+        """
+        if not planned:
+            return 0, []
+
+        geocoded = geocoded or {}
+        for order, _, schedule in planned:
+            schedule.clean()
+            if order.client__latitude is not None:
+                schedule.latitude, schedule.longitude = order.client__latitude, order.client__longitude
+            elif geocoded.get(order.client__address):
+                schedule.latitude, schedule.longitude = geocoded[order.client__address]
+
+        installer_ids = {installer_id for _, installer_id, _ in planned}
+        days = [schedule.scheduled_date for _, _, schedule in planned]
+        with booking_section(installer_ids):
+            index = AvailabilityIndex.load(min(days), max(days), installer_ids=installer_ids)
+            accepted, taken = [], []
+            for order, installer_id, schedule in planned:
+                start, end = to_minutes(schedule.scheduled_time_start), to_minutes(schedule.scheduled_time_end)
+                if not index.is_free(installer_id, schedule.scheduled_date, start, end):
+                    taken.append(order)
+                    continue
+                index.add(installer_id, schedule.scheduled_date, start, end)
+                accepted.append((order, installer_id, schedule))
+            if not accepted:
+                return 0, taken
+
+            schedules = InstallationSchedule.objects.bulk_create([schedule for _, _, schedule in accepted])
+
+            Through = InstallationSchedule.installers.through
+            Through.objects.bulk_create([
+                Through(installationschedule_id=schedule.id, user_id=installer_id)
+                for schedule, (_, installer_id, _) in zip(schedules, accepted)
+            ])
+            # bulk_create не вызывает сигналы - карты занятости, назначения и ленты ICS обновляются явно
+            refresh_days(
+                (installer_id, schedule.scheduled_date) for schedule, (_, installer_id, _) in zip(schedules, accepted)
+            )
+            sync_assignments(schedule.id for schedule in schedules)
+            ics.invalidate_feeds(installer_id for _, installer_id, _ in accepted)
+        return len(schedules), taken
@@ -0,0 +1,45 @@
+# calendar_app/management/commands/geocode_addresses.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from calendar_app.batch_geocoding import geocode_pending
+from calendar_app.geocoding import get_geocoder
+
+
+class Command(BaseCommand):
+    help = 'Пакетное геокодирование адресов клиентов и расписаний без координат'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, help='Не больше N клиентов за проход')
+        parser.add_argument('--workers', type=int, help='Потоков запросов (по умолчанию GEOCODER["BATCH_WORKERS"])')
+        parser.add_argument('--qps', type=float, help='Лимит запросов в секунду (по умолчанию GEOCODER["BATCH_QPS"])')
+        parser.add_argument('--max-retries', type=int, help='Повторов при временных ошибках')
+        parser.add_argument(
+            '--loop', type=int, metavar='SECONDS',
+            help='Работать постоянно, повторяя проход каждые SECONDS секунд (фоновый режим)'
+        )
+
+    def handle(self, *args, **options):
+        if not get_geocoder().available:
+            self.stdout.write(self.style.WARNING(
+                'Геокодер не настроен: укажите YANDEX_MAPS_API_KEY или GEOCODER_URL. '
+                'Будут использованы только закэшированные координаты'
+            ))
+
+        batch_options = {
+            'workers': options['workers'],
+            'qps': options['qps'],
+            'max_retries': options['max_retries'],
+        }
+        while True:
+            stats = geocode_pending(options['limit'], **batch_options)
+            self.stdout.write(self.style.SUCCESS(
+                f'Адресов: {stats.addresses} (из кэша {stats.cached}), запросов: {stats.requested} '
+                f'(найдено {stats.found}, не найдено {stats.not_found}, ошибок {stats.failed}, '
+                f'повторов {stats.retries}), обновлено клиентов: {stats.clients_updated}, '
+                f'расписаний: {stats.schedules_updated}, {stats.elapsed:.2f} с'
+            ))
+            if not options['loop']:
+                break
+            time.sleep(options['loop'])
@@ -0,0 +1,29 @@
+# calendar_app/management/commands/geocoder_stub.py
+from django.core.management.base import BaseCommand
+
+from calendar_app.geocoder_stub import make_stub_server
+
+
+class Command(BaseCommand):
+    help = 'Локальная заглушка геокодера в формате Яндекс.Карт (для разработки и проверок)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1', help='Адрес для прослушивания')
+        parser.add_argument('--port', type=int, default=8765, help='Порт (по умолчанию 8765)')
+        parser.add_argument('--fail-every', type=int, default=0, help='Отвечать 503 на каждый N-й запрос')
+        parser.add_argument('--max-qps', type=float, default=0, help='Отвечать 429 при превышении N запросов/с')
+
+    def handle(self, *args, **options):
+        server = make_stub_server(
+            options['host'], options['port'], verbose=True,
+            fail_every=options['fail_every'], max_qps=options['max_qps'],
+        )
+        url = f'http://{options["host"]}:{server.server_address[1]}/'
+        self.stdout.write(self.style.SUCCESS(f'Заглушка геокодера запущена: {url}'))
+        self.stdout.write(f'Укажите GEOCODER_URL={url} и перезапустите приложение. Остановка - Ctrl+C')
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            self.stdout.write('Заглушка остановлена')
+        finally:
+            server.server_close()
@@ -1,9 +1,12 @@
 # calendar_app/management/commands/optimize_routes.py
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from django.core.management.base import BaseCommand
+from django.db import connections
 from django.utils import timezone
 from datetime import datetime, timedelta
+from calendar_app.route_tasks import compute_route
 from calendar_app.services import RouteOptimizationService
-from calendar_app.models import InstallationSchedule
 from user_accounts.models import User
 
 class Command(BaseCommand):
@@ -26,6 +29,24 @@ class Command(BaseCommand):
             default=1,
             help='Количество дней вперед для оптимизации (по умолчанию 1)'
         )
+        parser.add_argument(
+            '--mode',
+            choices=['installer', 'day'],
+            default='installer',
+            help='installer - маршрут каждого монтажника отдельно, '
+                 'day - все бригады дня сразу с учетом окон монтажей'
+        )
+        parser.add_argument(
+            '--no-reassign',
+            action='store_true',
+            help='В режиме day не переназначать монтажи между бригадами'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Число процессов для расчета маршрутов в режиме installer (по умолчанию 1)'
+        )
 
     def handle(self, *args, **options):
         # Определяем дату для оптимизации
@@ -40,100 +61,107 @@ class Command(BaseCommand):
         else:
             target_date = timezone.now().date() + timedelta(days=1)  # Завтра
 
+        if options['mode'] == 'day':
+            self._optimize_days(target_date, options['days_ahead'], not options['no_reassign'])
+            return
+
         # Определяем монтажников
+        installer_ids = None
         if options['installer']:
-            try:
-                installers = [User.objects.get(id=options['installer'], role='installer')]
-            except User.DoesNotExist:
+            if not User.objects.filter(id=options['installer'], role='installer').exists():
                 self.stdout.write(
                     self.style.ERROR(f'Монтажник с ID {options["installer"]} не найден')
                 )
                 return
-        else:
-            # Получаем всех монтажников, у которых есть расписания
-            installers = User.objects.filter(
-                role='installer',
-                installation_orders__schedule__scheduled_date=target_date,
-                installation_orders__schedule__status='scheduled'
-            ).distinct()
+            installer_ids = [options['installer']]
+
+        dates = [target_date + timedelta(days=offset) for offset in range(max(options['days_ahead'], 1))]
+        self._optimize_installers(dates, installer_ids, max(options['workers'], 1))
 
-        if not installers:
+    def _optimize_installers(self, dates, installer_ids, workers):
+        """
+        Маршруты (монтажник, дата): задачи без ORM считаются в пуле процессов,
+        результаты сохраняются в основном процессе одной транзакцией
+        """
+        started = time.perf_counter()
+        tasks = RouteOptimizationService.build_route_tasks(dates, installer_ids)
+        if not tasks:
             self.stdout.write(
-                self.style.WARNING(f'Нет монтажников с расписаниями на {target_date}')
+                self.style.WARNING(f'Нет монтажников с расписаниями на {", ".join(str(day) for day in dates)}')
             )
             return
 
-        # Оптимизируем маршруты
-        optimized_count = 0
-        for installer in installers:
-            self.stdout.write(f'Оптимизация маршрута для {installer.get_full_name()}...')
-            
-            try:
-                # Проверяем, есть ли расписания на эту дату
-                schedules_count = InstallationSchedule.objects.filter(
-                    installers=installer,
-                    scheduled_date=target_date,
-                    status='scheduled'
-                ).count()
+        prepared = time.perf_counter()
+        self.stdout.write(f'Задач: {len(tasks)}, процессов: {min(workers, len(tasks))}')
 
-                if schedules_count == 0:
-                    self.stdout.write(
-                        self.style.WARNING(f'  Нет расписаний для {installer.get_full_name()} на {target_date}')
-                    )
-                    continue
-
-                # Выполняем оптимизацию
-                route = RouteOptimizationService.optimize_daily_route(installer.id, target_date)
-                
-                if route:
-                    optimized_count += 1
-                    self.stdout.write(
-                        self.style.SUCCESS(
-                            f'  ✓ Маршрут оптимизирован: {schedules_count} монтажей, '
-                            f'общее расстояние: {route.total_distance:.1f} км'
-                        )
-                    )
-                else:
-                    self.stdout.write(
-                        self.style.WARNING(f'  Не удалось оптимизировать маршрут для {installer.get_full_name()}')
-                    )
-                    
-            except Exception as e:
+        results = []
+        for result in self._run_tasks(tasks, workers):
+            results.append(result)
+            if result.error:
                 self.stdout.write(
-                    self.style.ERROR(f'  Ошибка при оптимизации для {installer.get_full_name()}: {str(e)}')
+                    self.style.ERROR(f'  Ошибка при оптимизации для {result.installer_name} на {result.date}: {result.error}')
+                )
+                continue
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f'  ✓ {result.date} {result.installer_name}: {len(result.stops)} монтажей, '
+                    f'общее расстояние: {result.total_distance:.1f} км, '
+                    f'экономия: {result.distance_saved:.1f} км, {result.elapsed:.2f} с'
                 )
+            )
+
+        computed = time.perf_counter()
+        routes = RouteOptimizationService.save_route_results(results)
+        finished = time.perf_counter()
 
         # Итоговая статистика
         self.stdout.write(
-            self.style.SUCCESS(f'\nОптимизация завершена: {optimized_count} маршрутов оптимизировано')
+            self.style.SUCCESS(
+                f'\nОптимизация завершена: {len(routes)} маршрутов оптимизировано за {finished - started:.2f} с '
+                f'(подготовка {prepared - started:.2f} с, расчет {computed - prepared:.2f} с '
+                f'при сумме задач {sum(result.elapsed for result in results):.2f} с, '
+                f'сохранение {finished - computed:.2f} с)'
+            )
         )
 
-        # Если указано несколько дней вперед
-        if options['days_ahead'] > 1:
-            self.stdout.write(f'\nОптимизация на {options["days_ahead"]} дней вперед...')
-            
-            for day_offset in range(1, options['days_ahead']):
-                future_date = target_date + timedelta(days=day_offset)
-                self.stdout.write(f'\nОптимизация на {future_date}:')
-                
-                future_installers = User.objects.filter(
-                    role='installer',
-                    installation_orders__schedule__scheduled_date=future_date,
-                    installation_orders__schedule__status='scheduled'
-                ).distinct()
-                
-                for installer in future_installers:
-                    try:
-                        route = RouteOptimizationService.optimize_daily_route(installer.id, future_date)
-                        if route:
-                            schedules_count = route.schedules.count()
-                            self.stdout.write(
-                                self.style.SUCCESS(
-                                    f'  ✓ {installer.get_full_name()}: {schedules_count} монтажей, '
-                                    f'{route.total_distance:.1f} км'
-                                )
-                            )
-                    except Exception as e:
-                        self.stdout.write(
-                            self.style.ERROR(f'  Ошибка для {installer.get_full_name()}: {str(e)}')
-                        )
\ No newline at end of file
+    def _run_tasks(self, tasks, workers):
+        """Результаты compute_route() по мере готовности"""
+        if workers <= 1 or len(tasks) < 2:
+            for task in tasks:
+                yield compute_route(task)
+            return
+
+        # Дочерним процессам соединения с базой не нужны
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as executor:
+            futures = [executor.submit(compute_route, task) for task in tasks]
+            for future in as_completed(futures):
+                yield future.result()
+
+    def _optimize_days(self, target_date, days_ahead, allow_reassign):
+        """Дневная маршрутизация всех бригад с учетом окон"""
+        for day_offset in range(max(days_ahead, 1)):
+            day = target_date + timedelta(days=day_offset)
+            self.stdout.write(f'\nОптимизация маршрутов на {day}:')
+            try:
+                result = RouteOptimizationService.optimize_day(day, allow_reassign=allow_reassign)
+            except Exception as e:
+                self.stdout.write(self.style.ERROR(f'  Ошибка оптимизации: {str(e)}'))
+                continue
+
+            if not result:
+                self.stdout.write(self.style.WARNING(f'  Нет расписаний на {day}'))
+            elif result['mode'] == 'installer':
+                self.stdout.write(self.style.WARNING(
+                    f'  Дневная оптимизация не применена ({result["fallback_reason"]}), '
+                    f'маршруты построены по монтажникам: {result["routes"]}, '
+                    f'{result["total_distance"]:.1f} км'
+                ))
+            else:
+                self.stdout.write(self.style.SUCCESS(
+                    f'  ✓ {result["routes"]} маршрутов, {result["total_distance"]:.1f} км '
+                    f'(было {result["baseline_distance"]:.1f} км), '
+                    f'переназначено монтажей: {len(result["reassigned"])}, '
+                    f'нарушений окон: {len(result["window_violations"])}, '
+                    f'{result["elapsed"]:.2f} с'
+                ))
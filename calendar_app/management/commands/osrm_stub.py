@@ -0,0 +1,26 @@
+# calendar_app/management/commands/osrm_stub.py
+from django.core.management.base import BaseCommand
+
+from calendar_app.osrm_stub import make_osrm_stub
+
+
+class Command(BaseCommand):
+    help = 'Локальная заглушка сервиса таблиц OSRM (для разработки и проверок)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1', help='Адрес для прослушивания')
+        parser.add_argument('--port', type=int, default=5000, help='Порт (по умолчанию 5000)')
+
+    def handle(self, *args, **options):
+        server = make_osrm_stub(options['host'], options['port'], verbose=True)
+        url = f'http://{options["host"]}:{server.server_address[1]}'
+        self.stdout.write(self.style.SUCCESS(f'Заглушка OSRM запущена: {url}'))
+        self.stdout.write(
+            f"Укажите CALENDAR_SETTINGS['TRAVEL_PROVIDER'] = 'osrm' и TRAVEL_OSRM_URL = '{url}'. Остановка - Ctrl+C"
+        )
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            self.stdout.write('Заглушка остановлена')
+        finally:
+            server.server_close()
@@ -0,0 +1,51 @@
+# calendar_app/management/commands/rebuild_occupancy.py
+import time
+from datetime import datetime
+
+from django.core.management.base import BaseCommand
+
+from calendar_app.occupancy import rebuild
+
+
+class Command(BaseCommand):
+    help = 'Сверка битовых карт занятости монтажников с расписаниями и исправление расхождений'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--date-from',
+            type=str,
+            help='Начало периода (YYYY-MM-DD). По умолчанию - без ограничения'
+        )
+        parser.add_argument(
+            '--date-to',
+            type=str,
+            help='Конец периода (YYYY-MM-DD). По умолчанию - без ограничения'
+        )
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Только проверить: вывести расхождения без записи'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            date_from = datetime.strptime(options['date_from'], '%Y-%m-%d').date() if options['date_from'] else None
+            date_to = datetime.strptime(options['date_to'], '%Y-%m-%d').date() if options['date_to'] else None
+        except ValueError:
+            self.stdout.write(self.style.ERROR('Неверный формат даты. Используйте YYYY-MM-DD'))
+            return
+
+        started = time.perf_counter()
+        stats = rebuild(date_from, date_to, dry_run=options['check'])
+        elapsed = time.perf_counter() - started
+
+        summary = (
+            f'Дней с монтажами: {stats.checked}, отсутствует: {stats.created}, '
+            f'устарело: {stats.updated}, лишних: {stats.deleted}, {elapsed:.2f} с'
+        )
+        if not stats.mismatched:
+            self.stdout.write(self.style.SUCCESS(f'Расхождений нет. {summary}'))
+        elif options['check']:
+            self.stdout.write(self.style.WARNING(f'Найдены расхождения. {summary}'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Карты занятости исправлены. {summary}'))
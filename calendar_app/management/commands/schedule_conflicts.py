@@ -0,0 +1,98 @@
+# calendar_app/management/commands/schedule_conflicts.py
+import json
+from dataclasses import asdict
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from calendar_app.conflicts import DEFAULT_MIN_GAP_MINUTES, find_conflicts
+
+
+class Command(BaseCommand):
+    help = 'Отчет о пересечениях, перегрузках и простоях в расписании монтажников'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--date-from',
+            type=str,
+            help='Начало периода (YYYY-MM-DD). По умолчанию - сегодня'
+        )
+        parser.add_argument(
+            '--date-to',
+            type=str,
+            help='Конец периода (YYYY-MM-DD). По умолчанию - 30 дней от начала'
+        )
+        parser.add_argument(
+            '--installer',
+            type=int,
+            action='append',
+            help='ID монтажника (можно указать несколько раз)'
+        )
+        parser.add_argument(
+            '--min-gap',
+            type=int,
+            default=DEFAULT_MIN_GAP_MINUTES,
+            help=f'Минимальный простой в минутах для отчета (по умолчанию {DEFAULT_MIN_GAP_MINUTES})'
+        )
+        parser.add_argument(
+            '--json',
+            action='store_true',
+            help='Вывести полный отчет в JSON'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            date_from = (datetime.strptime(options['date_from'], '%Y-%m-%d').date() if options['date_from']
+                         else timezone.localdate())
+            date_to = (datetime.strptime(options['date_to'], '%Y-%m-%d').date() if options['date_to']
+                       else date_from + timedelta(days=30))
+        except ValueError:
+            self.stdout.write(self.style.ERROR('Неверный формат даты. Используйте YYYY-MM-DD'))
+            return
+
+        report = find_conflicts(date_from, date_to, options['installer'], min_gap=options['min_gap'])
+
+        if options['json']:
+            data = asdict(report)
+            data['summary'] = report.summary()
+            self.stdout.write(json.dumps(data, ensure_ascii=False, default=str, indent=2))
+            return
+
+        name = lambda installer_id: report.installers.get(installer_id, f'#{installer_id}')
+        self.stdout.write(f'Проверка расписания {date_from} - {date_to}: {report.bookings} назначений')
+
+        for overlap in report.overlaps:
+            first, second = overlap['first'], overlap['second']
+            self.stdout.write(self.style.ERROR(
+                f'  Пересечение {overlap["date"]} {name(overlap["installer_id"])}: '
+                f'#{first["schedule_id"]} {first["start_time"]:%H:%M}-{first["end_time"]:%H:%M} и '
+                f'#{second["schedule_id"]} {second["start_time"]:%H:%M}-{second["end_time"]:%H:%M} '
+                f'({overlap["overlap_minutes"]} мин)'
+            ))
+        for item in report.outside_hours:
+            self.stdout.write(self.style.WARNING(
+                f'  Вне рабочих часов {item["date"]} {name(item["installer_id"])}: '
+                f'#{item["schedule_id"]} {item["start_time"]:%H:%M}-{item["end_time"]:%H:%M}'
+            ))
+        for overload in report.overloads:
+            self.stdout.write(self.style.WARNING(
+                f'  Перегрузка {overload["date"]} {name(overload["installer_id"])}: '
+                f'{overload["installations"]} монтажей при лимите {overload["limit"]}'
+            ))
+        for gap in report.gaps:
+            reason = 'нет времени на дорогу' if gap['kind'] == 'no_travel_time' else 'простой'
+            self.stdout.write(
+                f'  {reason.capitalize()} {gap["date"]} {name(gap["installer_id"])}: '
+                f'{gap["start_time"]:%H:%M}-{gap["end_time"]:%H:%M} между #{gap["after_schedule_id"]} '
+                f'и #{gap["before_schedule_id"]} (дорога {gap["travel_minutes"]} мин, '
+                f'свободно {gap["idle_minutes"]} мин)'
+            )
+
+        summary = report.summary()
+        message = (
+            f'Пересечений: {summary["overlaps"]}, вне рабочих часов: {summary["outside_hours"]}, '
+            f'перегрузок: {summary["overloads"]}, простоев: {summary["gaps"]} '
+            f'({summary["idle_minutes"]} мин), {report.elapsed:.2f} с'
+        )
+        self.stdout.write(self.style.ERROR(message) if report.has_conflicts else self.style.SUCCESS(message))
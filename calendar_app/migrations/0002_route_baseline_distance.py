@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-19 12:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('calendar_app', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='routeoptimization',
+            name='baseline_distance',
+            field=models.FloatField(blank=True, help_text='Длина маршрута по методу ближайшего соседа', null=True, verbose_name='Расстояние до оптимизации (км)'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.1 on 2026-10-19 12:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('calendar_app', '0002_route_baseline_distance'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GeocodeCache',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('address_key', models.CharField(max_length=255, unique=True, verbose_name='Нормализованный адрес')),
+                ('address', models.CharField(max_length=255, verbose_name='Адрес')),
+                ('latitude', models.FloatField(blank=True, null=True, verbose_name='Широта')),
+                ('longitude', models.FloatField(blank=True, null=True, verbose_name='Долгота')),
+                ('found', models.BooleanField(default=True, verbose_name='Адрес найден')),
+                ('provider', models.CharField(max_length=30, verbose_name='Провайдер')),
+                ('expires_at', models.DateTimeField(db_index=True, verbose_name='Действует до')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Кэш геокодирования',
+                'verbose_name_plural': 'Кэш геокодирования',
+            },
+        ),
+    ]
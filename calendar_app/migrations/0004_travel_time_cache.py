@@ -0,0 +1,33 @@
+# Generated by Django 5.2.1 on 2026-10-19 12:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('calendar_app', '0003_geocode_cache'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TravelTimeCache',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('origin', models.CharField(max_length=32, verbose_name='Откуда (ячейка)')),
+                ('destination', models.CharField(max_length=32, verbose_name='Куда (ячейка)')),
+                ('provider', models.CharField(max_length=20, verbose_name='Провайдер')),
+                ('time_bucket', models.CharField(max_length=10, verbose_name='Интервал суток')),
+                ('distance_km', models.FloatField(verbose_name='Расстояние (км)')),
+                ('duration_minutes', models.FloatField(verbose_name='Время в пути (мин)')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('expires_at', models.DateTimeField(db_index=True, verbose_name='Действует до')),
+            ],
+            options={
+                'verbose_name': 'Кэш времени в пути',
+                'verbose_name_plural': 'Кэш времени в пути',
+                'indexes': [models.Index(fields=['provider', 'time_bucket', 'origin'], name='travel_cache_lookup_idx')],
+                'unique_together': {('origin', 'destination', 'provider', 'time_bucket')},
+            },
+        ),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 5.2.1 on 2026-10-19 12:38
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def fill_occupancy(apps, schema_editor):
+    """Начальное заполнение карт занятости (та же логика, что calendar_app.occupancy.rebuild)"""
+    InstallationSchedule = apps.get_model('calendar_app', 'InstallationSchedule')
+    InstallerDayOccupancy = apps.get_model('calendar_app', 'InstallerDayOccupancy')
+
+    days = {}
+    rows = InstallationSchedule.installers.through.objects.filter(
+        installationschedule__status__in=('scheduled', 'in_progress')
+    ).values_list(
+        'user_id',
+        'installationschedule__scheduled_date',
+        'installationschedule__scheduled_time_start',
+        'installationschedule__scheduled_time_end',
+    )
+    for installer_id, day, start, end in rows.iterator(chunk_size=5000):
+        first = (start.hour * 60 + start.minute) // 15
+        last = min(96, -(-(end.hour * 60 + end.minute) // 15))
+        mask, count = days.get((installer_id, day), (0, 0))
+        if last > first:
+            mask |= ((1 << (last - first)) - 1) << first
+        days[(installer_id, day)] = (mask, count + 1)
+
+    InstallerDayOccupancy.objects.bulk_create(
+        [
+            InstallerDayOccupancy(
+                installer_id=installer_id, date=day,
+                slots=mask.to_bytes(12, 'little'), installations_count=count,
+            )
+            for (installer_id, day), (mask, count) in days.items()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('calendar_app', '0005_calendar_feed_token'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InstallerDayOccupancy',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Дата')),
+                ('slots', models.BinaryField(max_length=12, verbose_name='Занятые слоты')),
+                ('installations_count', models.PositiveSmallIntegerField(default=0, verbose_name='Количество монтажей')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('installer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='Монтажник')),
+            ],
+            options={
+                'verbose_name': 'Занятость монтажника',
+                'verbose_name_plural': 'Занятость монтажников',
+                'indexes': [models.Index(fields=['date', 'installer'], name='occupancy_date_idx')],
+                'unique_together': {('installer', 'date')},
+            },
+        ),
+        migrations.RunPython(fill_occupancy, migrations.RunPython.noop),
+    ]
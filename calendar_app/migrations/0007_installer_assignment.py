@@ -0,0 +1,84 @@
+# Generated by Django 5.2.1 on 2026-10-19 12:42
+
+from datetime import datetime
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+NO_OVERLAP_SQL = (
+    'ALTER TABLE calendar_app_installerassignment ADD CONSTRAINT installer_assignment_no_overlap '
+    "EXCLUDE USING gist (installer_id WITH =, tstzrange(starts_at, ends_at, '[)') WITH &&)"
+)
+
+
+def fill_assignments(apps, schema_editor):
+    """
+    Назначения активных монтажей. Уже существующие пересечения (их показывает
+    schedule_conflicts) не переносятся: иначе ограничение не создать
+    """
+    InstallationSchedule = apps.get_model('calendar_app', 'InstallationSchedule')
+    InstallerAssignment = apps.get_model('calendar_app', 'InstallerAssignment')
+
+    rows = InstallationSchedule.installers.through.objects.filter(
+        installationschedule__status__in=('scheduled', 'in_progress')
+    ).values_list(
+        'user_id', 'installationschedule_id', 'installationschedule__scheduled_date',
+        'installationschedule__scheduled_time_start', 'installationschedule__scheduled_time_end',
+    ).order_by('user_id', 'installationschedule__scheduled_date', 'installationschedule__scheduled_time_start')
+
+    assignments = []
+    last_installer, last_end = None, None
+    for installer_id, schedule_id, day, start, end in rows.iterator(chunk_size=5000):
+        starts_at = timezone.make_aware(datetime.combine(day, start))
+        ends_at = timezone.make_aware(datetime.combine(day, end))
+        if installer_id == last_installer and starts_at < last_end:
+            continue
+        last_installer, last_end = installer_id, ends_at
+        assignments.append(InstallerAssignment(
+            schedule_id=schedule_id, installer_id=installer_id, starts_at=starts_at, ends_at=ends_at,
+        ))
+    InstallerAssignment.objects.bulk_create(assignments, batch_size=1000)
+
+
+def add_no_overlap_constraint(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('CREATE EXTENSION IF NOT EXISTS btree_gist')
+        schema_editor.execute(NO_OVERLAP_SQL)
+
+
+def remove_no_overlap_constraint(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(
+            'ALTER TABLE calendar_app_installerassignment DROP CONSTRAINT IF EXISTS installer_assignment_no_overlap'
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('calendar_app', '0006_installer_day_occupancy'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InstallerAssignment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('starts_at', models.DateTimeField(verbose_name='Начало')),
+                ('ends_at', models.DateTimeField(verbose_name='Окончание')),
+                ('installer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='Монтажник')),
+                ('schedule', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='assignments', to='calendar_app.installationschedule')),
+            ],
+            options={
+                'verbose_name': 'Назначение монтажника',
+                'verbose_name_plural': 'Назначения монтажников',
+                'indexes': [models.Index(fields=['installer', 'starts_at'], name='assignment_installer_idx')],
+                'unique_together': {('schedule', 'installer')},
+            },
+        ),
+        migrations.RunPython(fill_assignments, migrations.RunPython.noop),
+        migrations.RunPython(add_no_overlap_constraint, remove_no_overlap_constraint),
+    ]
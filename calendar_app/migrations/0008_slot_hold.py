@@ -0,0 +1,35 @@
+# Generated by Django 5.2.1 on 2026-10-19 12:46
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('calendar_app', '0007_installer_assignment'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SlotHold',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(db_index=True, max_length=64, verbose_name='Токен')),
+                ('date', models.DateField(verbose_name='Дата')),
+                ('start_time', models.TimeField(verbose_name='Начало')),
+                ('end_time', models.TimeField(verbose_name='Окончание')),
+                ('expires_at', models.DateTimeField(verbose_name='Истекает')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='created_slot_holds', to=settings.AUTH_USER_MODEL, verbose_name='Создал')),
+                ('installer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='slot_holds', to=settings.AUTH_USER_MODEL, verbose_name='Монтажник')),
+            ],
+            options={
+                'verbose_name': 'Временная бронь',
+                'verbose_name_plural': 'Временные брони',
+                'indexes': [models.Index(fields=['date', 'installer', 'expires_at'], name='slot_hold_date_idx'), models.Index(fields=['expires_at'], name='slot_hold_expires_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-19 12:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('calendar_app', '0008_slot_hold'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='routepoint',
+            name='is_late',
+            field=models.BooleanField(default=False, help_text='Пересчитанное время окончания позже конца окна монтажа', verbose_name='Не успевает в окно'),
+        ),
+    ]
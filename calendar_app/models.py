@@ -110,9 +110,18 @@ class InstallationSchedule(models.Model):
             if self.actual_start_time >= self.actual_end_time:
                 raise ValidationError('Фактическое время начала должно быть раньше времени окончания')
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Исходная дата: при переносе занятость пересчитывается и для прежнего дня
+        if 'scheduled_date' in field_names:
+            instance._loaded_date = values[field_names.index('scheduled_date')]
+        return instance
+    
     def save(self, *args, **kwargs):
         self.clean()
         super().save(*args, **kwargs)
+        self._loaded_date = self.scheduled_date
     
     @property
     def duration(self):
@@ -124,12 +133,23 @@ class InstallationSchedule(models.Model):
     @property
     def is_overdue(self):
         """Проверка просрочки"""
+        return self.is_overdue_at(timezone.localtime().replace(tzinfo=None))
+    
+    def is_overdue_at(self, local_now):
+        """Просрочка на момент local_now (наивное местное время) - для проверки многих записей разом"""
         if self.status in ['completed', 'cancelled']:
             return False
         
-        from datetime import datetime, time
-        scheduled_datetime = datetime.combine(self.scheduled_date, self.scheduled_time_end)
-        return timezone.now() > timezone.make_aware(scheduled_datetime)
+        from datetime import datetime
+        return local_now > datetime.combine(self.scheduled_date, self.scheduled_time_end)
+    
+    @staticmethod
+    def overdue_q(local_now):
+        """Условие просрочки для запросов (то же, что is_overdue_at)"""
+        return ~models.Q(status__in=['completed', 'cancelled']) & (
+            models.Q(scheduled_date__lt=local_now.date()) |
+            models.Q(scheduled_date=local_now.date(), scheduled_time_end__lt=local_now.time())
+        )
 
 class RouteOptimization(models.Model):
     """Оптимизация маршрутов для монтажников"""
@@ -157,6 +177,12 @@ class RouteOptimization(models.Model):
         verbose_name="Общее время в пути"
     )
     
+    baseline_distance = models.FloatField(
+        null=True, blank=True,
+        verbose_name="Расстояние до оптимизации (км)",
+        help_text="Длина маршрута по методу ближайшего соседа"
+    )
+    
     start_location = models.CharField(
         max_length=200,
         blank=True,
@@ -189,6 +215,11 @@ class RoutePoint(models.Model):
     # Данные для оптимизации
     arrival_time = models.TimeField(null=True, blank=True, verbose_name="Время прибытия")
     departure_time = models.TimeField(null=True, blank=True, verbose_name="Время отъезда")
+    is_late = models.BooleanField(
+        default=False,
+        verbose_name="Не успевает в окно",
+        help_text="Пересчитанное время окончания позже конца окна монтажа"
+    )
     
     class Meta:
         verbose_name = "Точка маршрута"
@@ -197,4 +228,171 @@ class RoutePoint(models.Model):
         unique_together = ('route', 'sequence_number')
         
     def __str__(self):
-        return f"Точка {self.sequence_number} - {self.schedule}"
\ No newline at end of file
+        return f"Точка {self.sequence_number} - {self.schedule}"
+class GeocodeCache(models.Model):
+    """Кэш геокодирования по нормализованному адресу (см. calendar_app.geocoding)"""
+    address_key = models.CharField(max_length=255, unique=True, verbose_name="Нормализованный адрес")
+    address = models.CharField(max_length=255, verbose_name="Адрес")
+    
+    latitude = models.FloatField(null=True, blank=True, verbose_name="Широта")
+    longitude = models.FloatField(null=True, blank=True, verbose_name="Долгота")
+    found = models.BooleanField(default=True, verbose_name="Адрес найден")
+    
+    provider = models.CharField(max_length=30, verbose_name="Провайдер")
+    expires_at = models.DateTimeField(db_index=True, verbose_name="Действует до")
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = "Кэш геокодирования"
+        verbose_name_plural = "Кэш геокодирования"
+    
+    def __str__(self):
+        return f"{self.address} → {self.coordinates or 'не найден'}"
+    
+    @property
+    def coordinates(self):
+        """(широта, долгота) или None для ненайденного адреса"""
+        if not self.found or self.latitude is None or self.longitude is None:
+            return None
+        return self.latitude, self.longitude
+
+class TravelTimeCache(models.Model):
+    """Расстояние и время в пути между ячейками координат (см. calendar_app.travel)"""
+    origin = models.CharField(max_length=32, verbose_name="Откуда (ячейка)")
+    destination = models.CharField(max_length=32, verbose_name="Куда (ячейка)")
+    provider = models.CharField(max_length=20, verbose_name="Провайдер")
+    time_bucket = models.CharField(max_length=10, verbose_name="Интервал суток")
+    
+    distance_km = models.FloatField(verbose_name="Расстояние (км)")
+    duration_minutes = models.FloatField(verbose_name="Время в пути (мин)")
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True, verbose_name="Действует до")
+    
+    class Meta:
+        verbose_name = "Кэш времени в пути"
+        verbose_name_plural = "Кэш времени в пути"
+        unique_together = ('origin', 'destination', 'provider', 'time_bucket')
+        indexes = [
+            models.Index(fields=['provider', 'time_bucket', 'origin'], name='travel_cache_lookup_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.origin} → {self.destination} ({self.provider}, {self.time_bucket})"
+
+class CalendarFeedToken(models.Model):
+    """Секретный токен подписки монтажника на календарь в формате ICS (см. calendar_app.ics)"""
+    installer = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name='calendar_feed_token',
+        verbose_name="Монтажник"
+    )
+    token = models.CharField(max_length=64, unique=True, verbose_name="Токен")
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        verbose_name = "Токен календаря"
+        verbose_name_plural = "Токены календаря"
+    
+    def __str__(self):
+        return f"Календарь {self.installer.get_full_name()}"
+    
+    @classmethod
+    def for_installer(cls, installer, regenerate=False):
+        """Токен монтажника; regenerate - выпустить новый, старая ссылка перестает работать"""
+        import secrets
+        
+        token = secrets.token_urlsafe(32)
+        if regenerate:
+            feed_token, _ = cls.objects.update_or_create(installer=installer, defaults={'token': token})
+        else:
+            feed_token, _ = cls.objects.get_or_create(installer=installer, defaults={'token': token})
+        return feed_token
+
+class InstallerDayOccupancy(models.Model):
+    """
+    Занятость монтажника за день: 96 слотов по 15 минут, бит занят, если
+    в слот попадает хоть одна минута активного монтажа (см. calendar_app.occupancy)
+    """
+    installer = models.ForeignKey(User, on_delete=models.CASCADE, verbose_name="Монтажник")
+    date = models.DateField(verbose_name="Дата")
+    slots = models.BinaryField(max_length=12, verbose_name="Занятые слоты")
+    installations_count = models.PositiveSmallIntegerField(default=0, verbose_name="Количество монтажей")
+    
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = "Занятость монтажника"
+        verbose_name_plural = "Занятость монтажников"
+        unique_together = ('installer', 'date')
+        indexes = [
+            models.Index(fields=['date', 'installer'], name='occupancy_date_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.installer_id} - {self.date}: {self.installations_count}"
+    
+    @property
+    def mask(self) -> int:
+        """Битовая маска слотов: бит i - интервал [15·i, 15·i + 15) минут"""
+        return int.from_bytes(bytes(self.slots), 'little')
+
+class InstallerAssignment(models.Model):
+    """
+    Назначение монтажника на активный монтаж с абсолютным интервалом времени.
+    На PostgreSQL ограничение исключения installer_assignment_no_overlap
+    запрещает пересечение интервалов одного монтажника (см. calendar_app.booking)
+    """
+    schedule = models.ForeignKey(InstallationSchedule, on_delete=models.CASCADE, related_name='assignments')
+    installer = models.ForeignKey(User, on_delete=models.CASCADE, verbose_name="Монтажник")
+    starts_at = models.DateTimeField(verbose_name="Начало")
+    ends_at = models.DateTimeField(verbose_name="Окончание")
+    
+    class Meta:
+        verbose_name = "Назначение монтажника"
+        verbose_name_plural = "Назначения монтажников"
+        unique_together = ('schedule', 'installer')
+        indexes = [
+            models.Index(fields=['installer', 'starts_at'], name='assignment_installer_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.installer_id}: {self.starts_at} - {self.ends_at}"
+
+class SlotHold(models.Model):
+    """
+    Временная бронь окна монтажника на время разговора с клиентом.
+    Пока не истекла, окно занято для проверок доступности и поиска слотов;
+    брони одного запроса объединены токеном (см. calendar_app.holds)
+    """
+    token = models.CharField(max_length=64, db_index=True, verbose_name="Токен")
+    installer = models.ForeignKey(User, on_delete=models.CASCADE, related_name='slot_holds', verbose_name="Монтажник")
+    date = models.DateField(verbose_name="Дата")
+    start_time = models.TimeField(verbose_name="Начало")
+    end_time = models.TimeField(verbose_name="Окончание")
+    expires_at = models.DateTimeField(verbose_name="Истекает")
+    created_by = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='created_slot_holds',
+        verbose_name="Создал"
+    )
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        verbose_name = "Временная бронь"
+        verbose_name_plural = "Временные брони"
+        indexes = [
+            models.Index(fields=['date', 'installer', 'expires_at'], name='slot_hold_date_idx'),
+            models.Index(fields=['expires_at'], name='slot_hold_expires_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.installer_id} - {self.date} {self.start_time}-{self.end_time} до {self.expires_at}"
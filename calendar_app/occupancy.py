@@ -0,0 +1,296 @@
+# calendar_app/occupancy.py
+"""
+Битовые карты занятости монтажников.
+
+Для каждой пары (монтажник, день) в InstallerDayOccupancy хранится
+96-битная маска: бит i занят, если хотя бы одна минута интервала
+[15·i, 15·i + 15) занята активным монтажом. Проверка окна сводится к
+mask & window_mask, общие свободные окна бригады - к ~(m1 | m2 | ...),
+без запросов пересечения интервалов через промежуточную таблицу.
+
+Маска консервативна: пересечение битов при монтажах не по границе
+15 минут может оказаться ложным, поэтому занятость по битам
+подтверждается точной проверкой по интервалам (AvailabilityIndex), а
+свободное по битам окно свободно гарантированно.
+
+Маски пересчитываются сигналами при создании, изменении, отмене и переносе
+расписаний, а также при смене монтажников; rebuild() и команда
+rebuild_occupancy сверяют таблицу с расписаниями и исправляют расхождения.
+Временные брони (calendar_app.holds) в таблице не хранятся: OccupancyIndex
+добавляет их к маскам при загрузке одним дополнительным запросом.
+"""
+from collections import defaultdict
+from dataclasses import dataclass
+from functools import reduce
+from operator import or_
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.db import transaction
+from django.db.models import Q
+
+from .availability import ACTIVE_STATUSES, get_work_hours, to_minutes
+from .holds import active_holds
+from .models import InstallationSchedule, InstallerDayOccupancy
+
+SLOT_MINUTES = 15
+SLOTS_PER_DAY = 96
+MASK_BYTES = SLOTS_PER_DAY // 8
+FULL_DAY = (1 << SLOTS_PER_DAY) - 1
+
+
+def interval_mask(start: int, end: int) -> int:
+    """Слоты, задетые интервалом [start, end) в минутах"""
+    first = max(0, start // SLOT_MINUTES)
+    last = min(SLOTS_PER_DAY, -(-end // SLOT_MINUTES))
+    if last <= first:
+        return 0
+    return ((1 << (last - first)) - 1) << first
+
+
+def inner_mask(start: int, end: int) -> int:
+    """Слоты, целиком лежащие внутри [start, end)"""
+    first = max(0, -(-start // SLOT_MINUTES))
+    last = min(SLOTS_PER_DAY, end // SLOT_MINUTES)
+    if last <= first:
+        return 0
+    return ((1 << (last - first)) - 1) << first
+
+
+def mask_runs(mask: int) -> List[Tuple[int, int]]:
+    """Непрерывные группы установленных битов как интервалы в минутах"""
+    runs = []
+    slot = 0
+    while mask:
+        # Пропускаем нули, затем отмеряем группу единиц
+        zeros = (mask & -mask).bit_length() - 1
+        mask >>= zeros
+        slot += zeros
+        ones = (~mask & (mask + 1)).bit_length() - 1
+        runs.append((slot * SLOT_MINUTES, (slot + ones) * SLOT_MINUTES))
+        mask >>= ones
+        slot += ones
+    return runs
+
+
+def run_starts(mask: int, length: int) -> int:
+    """Биты, с которых начинается группа из length установленных битов подряд"""
+    if length <= 0:
+        return mask
+    result = mask
+    shift = 1
+    # Удвоение: после шага группа из shift битов сворачивается в начальный бит
+    while shift * 2 <= length:
+        result &= result >> shift
+        shift *= 2
+    if shift < length:
+        result &= result >> (length - shift)
+    return result
+
+
+def to_bytes(mask: int) -> bytes:
+    return mask.to_bytes(MASK_BYTES, 'little')
+
+
+@dataclass
+class DayOccupancy:
+    """Маска занятости и число монтажей за день"""
+    mask: int = 0
+    installations_count: int = 0
+
+
+def compute_days(rows) -> Dict[Tuple[int, object], DayOccupancy]:
+    """Маски по строкам (монтажник, день, начало, конец)"""
+    days = defaultdict(DayOccupancy)
+    for installer_id, day, start, end in rows:
+        occupancy = days[(installer_id, day)]
+        occupancy.mask |= interval_mask(to_minutes(start), to_minutes(end))
+        occupancy.installations_count += 1
+    return dict(days)
+
+
+def _schedule_rows(query):
+    return query.filter(installationschedule__status__in=ACTIVE_STATUSES).values_list(
+        'user_id',
+        'installationschedule__scheduled_date',
+        'installationschedule__scheduled_time_start',
+        'installationschedule__scheduled_time_end',
+    )
+
+
+def _pairs_q(pairs) -> Q:
+    by_day = defaultdict(set)
+    for installer_id, day in pairs:
+        by_day[day].add(installer_id)
+    return reduce(or_, (Q(date=day, installer_id__in=installer_ids) for day, installer_ids in by_day.items()))
+
+
+def _write(days: Dict[Tuple[int, object], DayOccupancy]):
+    InstallerDayOccupancy.objects.bulk_create(
+        [
+            InstallerDayOccupancy(
+                installer_id=installer_id, date=day,
+                slots=to_bytes(occupancy.mask), installations_count=occupancy.installations_count,
+            )
+            for (installer_id, day), occupancy in days.items()
+        ],
+        batch_size=1000,
+        update_conflicts=True,
+        unique_fields=['installer', 'date'],
+        update_fields=['slots', 'installations_count', 'updated_at'],
+    )
+
+
+def refresh_days(pairs: Iterable[Tuple[int, object]]):
+    """Пересчет масок указанных пар (монтажник, день) по расписаниям - два-три запроса"""
+    pairs = {(int(installer_id), day) for installer_id, day in pairs if installer_id and day}
+    if not pairs:
+        return
+
+    through = InstallationSchedule.installers.through.objects.filter(
+        user_id__in={installer_id for installer_id, _ in pairs},
+        installationschedule__scheduled_date__in={day for _, day in pairs},
+    )
+    days = {key: value for key, value in compute_days(_schedule_rows(through)).items() if key in pairs}
+
+    with transaction.atomic():
+        empty = pairs - days.keys()
+        if empty:
+            InstallerDayOccupancy.objects.filter(_pairs_q(empty)).delete()
+        if days:
+            _write(days)
+
+
+@dataclass
+class RebuildStats:
+    """Итоги сверки таблицы занятости с расписаниями"""
+    checked: int = 0
+    created: int = 0
+    updated: int = 0
+    deleted: int = 0
+
+    @property
+    def mismatched(self) -> int:
+        return self.created + self.updated + self.deleted
+
+
+def rebuild(date_from=None, date_to=None, dry_run: bool = False) -> RebuildStats:
+    """
+    Полная сверка масок за период (None - без ограничения) с расписаниями.
+    dry_run - только подсчитать расхождения
+    """
+    through = InstallationSchedule.installers.through.objects.all()
+    stored = InstallerDayOccupancy.objects.all()
+    if date_from:
+        through = through.filter(installationschedule__scheduled_date__gte=date_from)
+        stored = stored.filter(date__gte=date_from)
+    if date_to:
+        through = through.filter(installationschedule__scheduled_date__lte=date_to)
+        stored = stored.filter(date__lte=date_to)
+
+    expected = compute_days(_schedule_rows(through).iterator(chunk_size=5000))
+    stats = RebuildStats(checked=len(expected))
+
+    changed = {}
+    stale = []
+    seen = set()
+    for row_id, installer_id, day, slots, count in stored.values_list(
+        'id', 'installer_id', 'date', 'slots', 'installations_count'
+    ).iterator(chunk_size=5000):
+        key = (installer_id, day)
+        seen.add(key)
+        occupancy = expected.get(key)
+        if occupancy is None:
+            stale.append(row_id)
+        elif int.from_bytes(bytes(slots), 'little') != occupancy.mask or count != occupancy.installations_count:
+            changed[key] = occupancy
+    missing = {key: value for key, value in expected.items() if key not in seen}
+
+    stats.updated, stats.created, stats.deleted = len(changed), len(missing), len(stale)
+    if dry_run:
+        return stats
+
+    with transaction.atomic():
+        for chunk_start in range(0, len(stale), 1000):
+            InstallerDayOccupancy.objects.filter(id__in=stale[chunk_start:chunk_start + 1000]).delete()
+        if changed or missing:
+            _write({**changed, **missing})
+    return stats
+
+
+class OccupancyIndex:
+    """
+    Маски занятости за период, загруженные одним запросом.
+    Все проверки - побитовые операции без обращения к базе
+    """
+
+    def __init__(self, days: Dict[Tuple[int, object], DayOccupancy]):
+        self.days = days
+
+    @classmethod
+    def load(cls, date_from, date_to=None, installer_ids: Optional[Iterable[int]] = None,
+             hold_token: Optional[str] = None):
+        """Маски за период вместе с чужими неистекшими бронями (hold_token - свои брони)"""
+        if installer_ids is not None:
+            installer_ids = [int(installer_id) for installer_id in installer_ids]
+        query = InstallerDayOccupancy.objects.filter(date__range=(date_from, date_to or date_from))
+        if installer_ids is not None:
+            query = query.filter(installer_id__in=installer_ids)
+        days = {
+            (installer_id, day): DayOccupancy(int.from_bytes(bytes(slots), 'little'), count)
+            for installer_id, day, slots, count in query.values_list(
+                'installer_id', 'date', 'slots', 'installations_count'
+            )
+        }
+        # Бронь занимает слоты, но монтажом не считается
+        for _, installer_id, day, start, end in active_holds(date_from, date_to, installer_ids, hold_token):
+            days.setdefault((installer_id, day), DayOccupancy()).mask |= interval_mask(
+                to_minutes(start), to_minutes(end)
+            )
+        return cls(days)
+
+    def mask(self, installer_id: int, day) -> int:
+        occupancy = self.days.get((installer_id, day))
+        return occupancy.mask if occupancy else 0
+
+    def installations_count(self, installer_id: int, day) -> int:
+        occupancy = self.days.get((installer_id, day))
+        return occupancy.installations_count if occupancy else 0
+
+    def may_be_busy(self, installer_id: int, day, start: int, end: int) -> bool:
+        """Биты окна пересекаются с занятыми (нужна точная проверка); False - точно свободен"""
+        return bool(self.mask(installer_id, day) & interval_mask(start, end))
+
+    def free_installers(self, installer_ids: Iterable[int], day, start: int, end: int) -> List[int]:
+        """Монтажники, гарантированно свободные в окне [start, end)"""
+        window = interval_mask(start, end)
+        return [installer_id for installer_id in installer_ids if not self.mask(installer_id, day) & window]
+
+    def common_busy(self, installer_ids: Iterable[int], day) -> int:
+        """Слоты, в которые занят хотя бы один из монтажников"""
+        return reduce(or_, (self.mask(installer_id, day) for installer_id in installer_ids), 0)
+
+    def free_slots(self, installer_ids: Iterable[int], day, work_start: Optional[int] = None,
+                   work_end: Optional[int] = None) -> int:
+        """Целые слоты рабочего дня, свободные у всех монтажников"""
+        if work_start is None or work_end is None:
+            work_start, work_end = get_work_hours()
+        return ~self.common_busy(installer_ids, day) & inner_mask(work_start, work_end) & FULL_DAY
+
+    def common_free_windows(self, installer_ids: Iterable[int], day, work_start: Optional[int] = None,
+                            work_end: Optional[int] = None, min_duration: int = 0) -> List[Tuple[int, int]]:
+        """Общие свободные окна с точностью до слота"""
+        return [
+            window for window in mask_runs(self.free_slots(installer_ids, day, work_start, work_end))
+            if window[1] - window[0] >= max(min_duration, 1)
+        ]
+
+    def has_room(self, installer_id: int, day, duration: int, work_start: int, work_end: int) -> bool:
+        """
+        Может ли в рабочий день поместиться окно duration минут.
+        Свободный интервал не по границе слотов содержит не меньше
+        duration // 15 - 1 целых свободных слотов - проверка без ложных отказов
+        """
+        length = duration // SLOT_MINUTES - 1
+        if length <= 0:
+            return True
+        return bool(run_starts(self.free_slots([installer_id], day, work_start, work_end), length))
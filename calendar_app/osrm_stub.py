@@ -0,0 +1,86 @@
+# calendar_app/osrm_stub.py
+"""
+Локальная заглушка сервиса таблиц OSRM (GET /table/v1/driving/{lon,lat;...}).
+
+Расстояние - гаверсинус с коэффициентом извилистости, время - при
+постоянной скорости. Используется вместо настоящего OSRM в разработке и
+проверках: CALENDAR_SETTINGS['TRAVEL_PROVIDER'] = 'osrm',
+CALENDAR_SETTINGS['TRAVEL_OSRM_URL'] = 'http://127.0.0.1:<port>'.
+"""
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from .routing import distance_matrix
+
+DETOUR_FACTOR = 1.35
+SPEED_KMH = 27
+
+
+class StubOSRMHandler(BaseHTTPRequestHandler):
+    """Ответ в формате OSRM table: distances (м) и durations (с)"""
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        prefix = '/table/v1/driving/'
+        if not url.path.startswith(prefix):
+            self._reply(400, {'code': 'InvalidUrl', 'message': 'Поддерживается только /table/v1/driving'})
+            return
+        try:
+            points = [
+                (float(latitude), float(longitude))
+                for longitude, latitude in (pair.split(',') for pair in url.path[len(prefix):].split(';'))
+            ]
+            query = parse_qs(url.query)
+            sources = self._indexes(query, 'sources', len(points))
+            destinations = self._indexes(query, 'destinations', len(points))
+        except (ValueError, IndexError):
+            self._reply(400, {'code': 'InvalidQuery', 'message': 'Неверные координаты или индексы'})
+            return
+
+        with self.server.lock:
+            self.server.requests_count += 1
+        kilometres = distance_matrix(points)[sources][:, destinations] * DETOUR_FACTOR
+        self._reply(200, {
+            'code': 'Ok',
+            'distances': (kilometres * 1000).round(1).tolist(),
+            'durations': (kilometres / SPEED_KMH * 3600).round(1).tolist(),
+        })
+
+    @staticmethod
+    def _indexes(query, name, size):
+        if name not in query or query[name][0] == 'all':
+            return list(range(size))
+        indexes = [int(value) for value in query[name][0].split(';')]
+        if any(index < 0 or index >= size for index in indexes):
+            raise IndexError(name)
+        return indexes
+
+    def _reply(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+def make_osrm_stub(host: str = '127.0.0.1', port: int = 0, verbose: bool = False) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer((host, port), StubOSRMHandler)
+    server.daemon_threads = True
+    server.verbose = verbose
+    server.requests_count = 0
+    server.lock = threading.Lock()
+    return server
+
+
+def start_osrm_stub(host: str = '127.0.0.1', port: int = 0, verbose: bool = False):
+    """Запускает заглушку в фоновом потоке; возвращает (server, url). Остановка - server.shutdown()"""
+    server = make_osrm_stub(host, port, verbose)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://{host}:{server.server_address[1]}'
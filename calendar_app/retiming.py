@@ -0,0 +1,112 @@
+# calendar_app/retiming.py
+"""
+Пересчет времени маршрута после начала и завершения монтажа.
+
+Когда монтаж начинается или заканчивается не по плану, у следующих точек
+маршрута устаревают arrival_time/departure_time. Вместо повторной
+оптимизации пересчитываются только точки после события: прибытие =
+отъезд с предыдущей точки + сохраненный при оптимизации переезд
+(travel_time_to), длительность работ на точке сохраняется. Раньше своего
+окна или прежнего плана точка не сдвигается; как только время точки не
+изменилось, остальные точки тоже не меняются и пересчет останавливается.
+
+Точки, которые теперь заканчиваются позже конца окна монтажа, отмечаются
+is_late. Начатые и завершенные точки дальше по маршруту имеют свое
+фактическое время и не пересчитываются.
+"""
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import List
+
+from django.db import transaction
+from django.utils import timezone
+
+from .availability import MINUTES_PER_DAY, from_minutes, to_minutes
+from .models import RoutePoint
+
+SETTLED_STATUSES = ('in_progress', 'completed', 'cancelled')
+
+
+@dataclass
+class RetimeResult:
+    """Итог пересчета: изменено точек и опаздывающие монтажи"""
+    routes: int = 0
+    updated: int = 0
+    late_schedule_ids: List[int] = field(default_factory=list)
+
+
+def _local_minutes(moment: datetime) -> int:
+    return to_minutes(timezone.localtime(moment).time())
+
+
+def _minutes(value, default: int) -> int:
+    return to_minutes(value) if value is not None else default
+
+
+def retime_downstream(schedule) -> RetimeResult:
+    """
+    Сдвигает точки после schedule во всех его маршрутах на день по
+    фактическому началу (actual_start_time) или окончанию (actual_end_time).
+    Один запрос точек и один bulk_update
+    """
+    result = RetimeResult()
+    points = list(
+        RoutePoint.objects.filter(
+            route__routepoint__schedule_id=schedule.id,
+            route__date=schedule.scheduled_date,
+        ).select_related('schedule').order_by('route_id', 'sequence_number')
+    )
+
+    changed = []
+    routes = {}
+    for point in points:
+        routes.setdefault(point.route_id, []).append(point)
+    result.routes = len(routes)
+
+    for route_points in routes.values():
+        position = next(index for index, point in enumerate(route_points) if point.schedule_id == schedule.id)
+        anchor = route_points[position]
+        arrival = _minutes(anchor.arrival_time, to_minutes(schedule.scheduled_time_start))
+        service = max(0, _minutes(anchor.departure_time, arrival) - arrival)
+
+        # Фактическое время события задает новое время точки
+        if schedule.actual_start_time:
+            arrival = _local_minutes(schedule.actual_start_time)
+        departure = arrival + service
+        if schedule.actual_end_time:
+            departure = _local_minutes(schedule.actual_end_time)
+        if (anchor.arrival_time, anchor.departure_time) != (from_minutes(arrival), from_minutes(departure)):
+            anchor.arrival_time, anchor.departure_time = from_minutes(arrival), from_minutes(departure)
+            changed.append(anchor)
+
+        previous_departure = departure
+        for point in route_points[position + 1:]:
+            stop = point.schedule
+            if stop.status in SETTLED_STATUSES:
+                break
+
+            old_arrival = _minutes(point.arrival_time, to_minutes(stop.scheduled_time_start))
+            duration = int(stop.estimated_duration.total_seconds() // 60) if stop.estimated_duration else 0
+            old_departure = _minutes(point.departure_time, old_arrival + duration)
+            travel = int(stop.travel_time_to.total_seconds() // 60) if stop.travel_time_to else 0
+            # Не раньше начала окна, а если план был раньше окна - не раньше плана
+            earliest = min(to_minutes(stop.scheduled_time_start), old_arrival)
+            new_arrival = min(max(previous_departure + travel, earliest), MINUTES_PER_DAY - 1)
+            new_departure = new_arrival + (old_departure - old_arrival)
+            is_late = new_departure > to_minutes(stop.scheduled_time_end)
+
+            if (new_arrival, new_departure, is_late) == (old_arrival, old_departure, point.is_late):
+                break
+            point.arrival_time = from_minutes(new_arrival)
+            point.departure_time = from_minutes(new_departure)
+            point.is_late = is_late
+            changed.append(point)
+            if is_late:
+                result.late_schedule_ids.append(stop.id)
+            previous_departure = new_departure
+
+    if changed:
+        with transaction.atomic():
+            RoutePoint.objects.bulk_update(changed, ['arrival_time', 'departure_time', 'is_late'])
+    result.updated = len(changed)
+    return result
@@ -0,0 +1,324 @@
+# calendar_app/route_benchmark.py
+"""
+Бенчмарк маршрутизации и планирования на синтетических днях.
+
+Каждый день calendar_app.synthetic.generate_day (бригады, монтажи в
+районах Москвы, окна и приоритеты) записывается в базу внутри транзакции,
+которая в конце откатывается, - база не меняется. В этой песочнице
+реальные монтажники отключаются, а ожидающие заказы закрываются, чтобы
+сервисы видели только синтетический день. Режимы:
+- day - RouteOptimizationService.optimize_day (все бригады с окнами);
+- installer - маршрут каждого монтажника отдельно, как optimize_routes
+  (build_route_tasks, compute_route, save_route_results);
+- scheduler - create_schedules для тех же монтажей как заказов без расписания.
+
+Режим выполняется дважды в своей точке сохранения: замер времени и отдельно
+пиковой памяти (tracemalloc замедляет выполнение). Пробег и нарушения окон
+маршрутов считаются по сохраненным точкам одной функцией
+(DaySolver.check_sequence), поэтому режимы и запуски сравнимы между собой.
+
+Результат - словарь для JSON; compare_with_baseline сравнивает итоги с
+сохраненным базовым результатом.
+"""
+import gc
+import io
+import time as time_module
+import tracemalloc
+from collections import defaultdict
+from datetime import timedelta
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+from django.conf import settings
+from django.core.management import call_command
+from django.db import transaction
+from django.db.models import Max
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from customer_clients.models import Client
+from orders.models import Order
+from user_accounts.models import User
+from .availability import from_minutes
+from .daymodel import PRIORITY_NAMES
+from .insertion import pair_distances
+from .models import InstallationSchedule, RoutePoint
+from .route_tasks import compute_route
+from .services import RouteOptimizationService
+from .synthetic import generate_day
+from .vrp import DaySolver
+
+MODES = ('day', 'installer', 'scheduler')
+BASELINE_PATH = Path(__file__).resolve().parent / 'benchmarks' / 'routing_baseline.json'
+SYNTHETIC_PREFIX = 'routing_bench'
+# Допустимый рост метрики относительно базового результата (доля)
+DEFAULT_TOLERANCES = {'wall_time': 0.25, 'peak_memory_kb': 0.25, 'distance_km': 0.02}
+# Рост времени меньше этого (с) - шум замера, а не регрессия
+MIN_WALL_TIME_DELTA = 0.25
+# Счетчики, которые не должны расти вовсе
+COUNT_METRICS = ('window_violations', 'unscheduled')
+
+
+class _Rollback(Exception):
+    """Откат точки сохранения после замера"""
+
+
+def _rolled_back(function: Callable):
+    """Выполняет function в точке сохранения и откатывает ее изменения"""
+    result = None
+    try:
+        with transaction.atomic():
+            result = function()
+            raise _Rollback
+    except _Rollback:
+        pass
+    return result
+
+
+def _first_free_monday():
+    """Понедельник после всех расписаний базы: планировщику свободны две недели вперед"""
+    latest = InstallationSchedule.objects.aggregate(latest=Max('scheduled_date'))['latest']
+    day = max(latest or timezone.localdate(), timezone.localdate()) + timedelta(days=1)
+    return day + timedelta(days=(7 - day.weekday()) % 7)
+
+
+def _materialize(jobs, crews, tag: str = ''):
+    """
+    Бригады, клиенты и заказы синтетического дня: {бригада: монтажник}, {монтаж: заказ}.
+    tag различает логины пользователей нескольких дней в одной транзакции
+    """
+    # Только синтетический день: реальные монтажники и ожидающие заказы скрыты до отката
+    User.objects.filter(role='installer', is_active=True).update(is_active=False)
+    Order.objects.filter(status__in=('new', 'in_progress'), schedule__isnull=True).update(status='completed')
+
+    manager = User.objects.create(username=f'{SYNTHETIC_PREFIX}{tag}_manager', role='manager')
+    installers = User.objects.bulk_create([
+        User(username=f'{SYNTHETIC_PREFIX}{tag}_{crew.id}', first_name='Бригада', last_name=str(crew.id), role='installer')
+        for crew in crews
+    ])
+    clients = Client.objects.bulk_create([
+        Client(
+            name=f'Синтетический клиент {job.id}', address=f'Синтетический адрес {job.id}', phone='-',
+            source='other', latitude=job.point[0], longitude=job.point[1],
+        )
+        for job in jobs
+    ])
+    orders = Order.objects.bulk_create([Order(client=client, manager=manager) for client in clients])
+    return (
+        {crew.id: installer.id for crew, installer in zip(crews, installers)},
+        {job.id: order.id for job, order in zip(jobs, orders)},
+    )
+
+
+def _schedule_jobs(jobs, day, installer_of_crew, order_of_job) -> Dict[int, int]:
+    """Расписания монтажей по синтетическим окнам: {расписание: монтаж}"""
+    schedules = InstallationSchedule.objects.bulk_create([
+        InstallationSchedule(
+            order_id=order_of_job[job.id],
+            scheduled_date=day,
+            scheduled_time_start=from_minutes(job.earliest),
+            scheduled_time_end=from_minutes(job.latest + job.duration),
+            estimated_duration=timedelta(minutes=job.duration),
+            priority=PRIORITY_NAMES.get(job.priority, 'normal'),
+            latitude=job.point[0],
+            longitude=job.point[1],
+        )
+        for job in jobs
+    ])
+    Through = InstallationSchedule.installers.through
+    Through.objects.bulk_create([
+        Through(installationschedule_id=schedule.id, user_id=installer_of_crew[crew_id])
+        for schedule, job in zip(schedules, jobs) for crew_id in job.crews
+    ])
+    return {schedule.id: job.id for schedule, job in zip(schedules, jobs)}
+
+
+def _measure(action: Callable, evaluate: Callable[[], Dict]) -> Dict:
+    """Метрики режима: время и результат первого прогона, пиковая память второго"""
+    def timed():
+        began = time_module.perf_counter()
+        action()
+        elapsed = time_module.perf_counter() - began
+        return dict(evaluate(), wall_time=round(elapsed, 3))
+
+    def traced():
+        gc.collect()
+        tracemalloc.start()
+        try:
+            action()
+            return tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    metrics = _rolled_back(timed)
+    metrics['peak_memory_kb'] = round(_rolled_back(traced) / 1024)
+    return metrics
+
+
+def _route_metrics(day, checker: DaySolver, crew_of_installer: Dict[int, int], job_of_schedule: Dict[int, int]) -> Dict:
+    """Пробег и нарушения окон сохраненных маршрутов дня"""
+    sequences = defaultdict(list)
+    for installer_id, schedule_id in RoutePoint.objects.filter(route__date=day).order_by(
+        'route_id', 'sequence_number'
+    ).values_list('route__installer_id', 'schedule_id'):
+        sequences[installer_id].append(job_of_schedule[schedule_id])
+
+    distance, violations = 0.0, 0
+    for installer_id, job_ids in sequences.items():
+        route_distance, route_violations = checker.check_sequence(crew_of_installer[installer_id], job_ids)
+        distance += route_distance
+        violations += route_violations
+    return {
+        'routes': len(sequences),
+        'distance_km': round(distance, 2),
+        'window_violations': violations,
+    }
+
+
+def _scheduler_metrics(first_day, depot, order_count: int) -> Dict:
+    """Запланировано монтажей, дней и пробег по порядку начала у каждого монтажника"""
+    visits = defaultdict(list)
+    for installer_id, day, latitude, longitude in InstallationSchedule.installers.through.objects.filter(
+        installationschedule__scheduled_date__gte=first_day,
+    ).order_by(
+        'installationschedule__scheduled_date', 'installationschedule__scheduled_time_start',
+    ).values_list(
+        'user_id', 'installationschedule__scheduled_date',
+        'installationschedule__latitude', 'installationschedule__longitude',
+    ):
+        visits[(installer_id, day)].append((latitude, longitude))
+
+    distance = 0.0
+    for points in visits.values():
+        chain = np.asarray([depot] + points, dtype=np.float64)
+        distance += float(pair_distances(chain[:-1], chain[1:]).sum())
+    scheduled = sum(len(points) for points in visits.values())
+    return {
+        'scheduled': scheduled,
+        'unscheduled': order_count - scheduled,
+        'days_used': len({day for _, day in visits}),
+        'distance_km': round(distance, 2),
+    }
+
+
+def _run_day(jobs, crews, depot, day, modes: Sequence[str], time_budget: float, seed: int) -> Dict[str, Dict]:
+    """Все режимы на одном синтетическом дне"""
+    installer_of_crew, order_of_job = _materialize(jobs, crews)
+    crew_of_installer = {installer_id: crew_id for crew_id, installer_id in installer_of_crew.items()}
+    checker = DaySolver(jobs, crews, depot, allow_reassign=False)
+    metrics = {}
+
+    if 'scheduler' in modes:
+        metrics['scheduler'] = _measure(
+            lambda: call_command('create_schedules', start_date=day.isoformat(), stdout=io.StringIO()),
+            lambda: _scheduler_metrics(day, depot, len(order_of_job)),
+        )
+
+    job_of_schedule = _schedule_jobs(jobs, day, installer_of_crew, order_of_job)
+    evaluate = lambda: _route_metrics(day, checker, crew_of_installer, job_of_schedule)
+    if 'day' in modes:
+        metrics['day'] = _measure(
+            lambda: RouteOptimizationService.optimize_day(day, time_budget=time_budget, seed=seed), evaluate,
+        )
+    if 'installer' in modes:
+        metrics['installer'] = _measure(
+            lambda: RouteOptimizationService.save_route_results([
+                compute_route(task) for task in RouteOptimizationService.build_route_tasks([day], geocode=False)
+            ]),
+            evaluate,
+        )
+    return metrics
+
+
+def run_benchmark(crews: int = 20, jobs: int = 150, days: int = 3, seed: int = 0, clusters: int = 8,
+                  time_budget: float = 2.0, route_time_budget: float = 0.2, modes: Sequence[str] = MODES,
+                  progress: Optional[Callable[[int, str, Dict], None]] = None) -> Dict:
+    """
+    Замеры режимов modes на days синтетических днях (seed, seed + 1, ...).
+    time_budget - бюджет дневного решателя, route_time_budget - маршрута монтажника.
+    progress(день, режим, метрики) вызывается после каждого замера
+    """
+    params = {
+        'crews': crews, 'jobs': jobs, 'days': days, 'seed': seed, 'clusters': clusters,
+        'time_budget': time_budget, 'route_time_budget': route_time_budget, 'modes': list(modes),
+    }
+    calendar_settings = dict(getattr(settings, 'CALENDAR_SETTINGS', {}))
+    params['travel_provider'] = calendar_settings.get('TRAVEL_PROVIDER', 'haversine')
+    day = _first_free_monday()
+    runs = []
+
+    for number in range(days):
+        day_jobs, day_crews, depot = generate_day(crews, jobs, seed=seed + number, clusters=clusters)
+        overrides = dict(
+            calendar_settings, WAREHOUSE_COORDINATES=depot, ROUTE_TIME_BUDGET=route_time_budget, ROUTE_SEED=seed,
+        )
+        with override_settings(CALENDAR_SETTINGS=overrides):
+            metrics = _rolled_back(lambda: _run_day(day_jobs, day_crews, depot, day, modes, time_budget, seed + number))
+        for mode in modes:
+            runs.append(dict(metrics[mode], day=number + 1, seed=seed + number, mode=mode))
+            if progress:
+                progress(number + 1, mode, metrics[mode])
+
+    return {
+        'created_at': timezone.now().isoformat(timespec='seconds'),
+        'params': params,
+        'runs': runs,
+        'totals': _totals(runs),
+    }
+
+
+def _totals(runs: List[Dict]) -> Dict[str, Dict]:
+    """Итоги по режимам: суммы времени, пробега и счетчиков, максимум памяти"""
+    totals = {}
+    for run in runs:
+        total = totals.setdefault(run['mode'], {})
+        for key, value in run.items():
+            if key in ('day', 'seed', 'mode'):
+                continue
+            if key == 'peak_memory_kb':
+                total[key] = max(total.get(key, 0), value)
+            else:
+                total[key] = round(total.get(key, 0) + value, 3)
+    return totals
+
+
+def compare_with_baseline(results: Dict, baseline: Dict, tolerances: Optional[Dict[str, float]] = None) -> Dict:
+    """
+    Сравнение итогов с базовым результатом по режимам. Регрессия - рост
+    времени, памяти или пробега больше допуска (доля; для времени - и больше
+    MIN_WALL_TIME_DELTA) либо любой рост нарушений окон и незапланированных
+    """
+    tolerances = dict(DEFAULT_TOLERANCES, **(tolerances or {}))
+    compared_params = [key for key in results['params'] if key != 'modes']
+    mismatched = [
+        key for key in compared_params if baseline.get('params', {}).get(key) != results['params'][key]
+    ]
+    rows = []
+    for mode, total in results['totals'].items():
+        base = baseline.get('totals', {}).get(mode)
+        if not base:
+            continue
+        for metric in (*DEFAULT_TOLERANCES, *COUNT_METRICS):
+            if metric not in total or metric not in base:
+                continue
+            current, previous = total[metric], base[metric]
+            if metric in COUNT_METRICS:
+                regression = current > previous
+            else:
+                noise = MIN_WALL_TIME_DELTA if metric == 'wall_time' else 0.0
+                regression = current > previous * (1 + tolerances[metric]) and current - previous > noise
+            rows.append({
+                'mode': mode,
+                'metric': metric,
+                'baseline': previous,
+                'current': current,
+                'change': round((current - previous) / previous, 4) if previous else None,
+                'regression': regression,
+            })
+    return {
+        'params_match': not mismatched,
+        'mismatched_params': mismatched,
+        'rows': rows,
+        'regressions': [row for row in rows if row['regression']],
+    }
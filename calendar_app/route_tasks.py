@@ -0,0 +1,153 @@
+# calendar_app/route_tasks.py
+"""
+Задачи оптимизации маршрутов для пула процессов.
+
+RouteTask - компактное описание дневного маршрута одного монтажника
+(только id, координаты и длительности), RouteTaskResult - порядок обхода
+и расчетное время по точкам. Модуль не обращается к ORM и настройкам
+Django, поэтому compute_route() можно выполнять в дочернем процессе:
+задачи собираются и результаты сохраняются в основном процессе
+(RouteOptimizationService.build_route_tasks / save_route_results).
+"""
+import time as time_module
+from dataclasses import dataclass, field
+from datetime import date as date_type
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from .routing import distance_matrix, solve_route
+
+DAY_START_MINUTES = 8 * 60
+DEFAULT_DURATION_MINUTES = 120
+AVERAGE_SPEED_KMH = 30
+TRAFFIC_FACTOR = 1.2
+MINUTES_PER_DAY = 24 * 60
+PRIORITY_RANK = {'urgent': 0, 'high': 1, 'normal': 2, 'low': 3}
+
+
+@dataclass(frozen=True)
+class TaskStop:
+    """Монтаж в задаче: id расписания, координаты, приоритет и длительность"""
+    schedule_id: int
+    latitude: Optional[float]
+    longitude: Optional[float]
+    priority: str = 'normal'
+    duration: int = DEFAULT_DURATION_MINUTES
+
+
+@dataclass(frozen=True)
+class RouteTask:
+    """Маршрут монтажника на день"""
+    installer_id: int
+    installer_name: str
+    date: date_type
+    stops: Tuple[TaskStop, ...]
+    depot: Optional[Tuple[float, float]] = None
+    time_budget: float = 1.0
+    seed: int = 0
+    # Матрицы (км, минуты) для точек task_points(); None - гаверсинус и 30 км/ч
+    distances: Optional[Tuple[Tuple[float, ...], ...]] = None
+    durations: Optional[Tuple[Tuple[float, ...], ...]] = None
+
+
+@dataclass
+class PlannedStop:
+    """Точка маршрута: время в минутах от полуночи, переезд до точки"""
+    schedule_id: int
+    arrival: int
+    departure: int
+    distance: Optional[float] = None
+    travel_seconds: Optional[float] = None
+
+
+@dataclass
+class RouteTaskResult:
+    """Рассчитанный маршрут; error - текст ошибки, если расчет не удался"""
+    installer_id: int
+    installer_name: str
+    date: date_type
+    stops: List[PlannedStop] = field(default_factory=list)
+    total_distance: float = 0.0
+    total_travel_seconds: float = 0.0
+    baseline_distance: float = 0.0
+    elapsed: float = 0.0
+    error: str = ''
+
+    @property
+    def distance_saved(self) -> float:
+        return max(0.0, self.baseline_distance - self.total_distance)
+
+
+def travel_seconds(distance_km: float) -> float:
+    """Время в пути: 30 км/ч и 20% на пробки (как RouteCalculationService)"""
+    return distance_km / AVERAGE_SPEED_KMH * TRAFFIC_FACTOR * 3600
+
+
+def _has_point(stop: TaskStop) -> bool:
+    return bool(stop.latitude and stop.longitude)
+
+
+def task_points(stops: Tuple[TaskStop, ...], depot: Optional[Tuple[float, float]] = None):
+    """Точки маршрута для матриц: [склад] + монтажи с координатами в исходном порядке"""
+    points = [(stop.latitude, stop.longitude) for stop in stops if _has_point(stop)]
+    return [depot] + points if depot else points
+
+
+def _matrices(task: RouteTask):
+    if task.distances is not None:
+        return np.asarray(task.distances, dtype=np.float64), np.asarray(task.durations, dtype=np.float64) * 60
+    distances = distance_matrix(task_points(task.stops, task.depot))
+    return distances, travel_seconds(distances)
+
+
+def _sequence(task: RouteTask, distances):
+    """Порядок обхода (монтажи без координат - в конце, узел None) и RouteSolution"""
+    located = [stop for stop in task.stops if _has_point(stop)]
+    missing = [stop for stop in task.stops if not _has_point(stop)]
+    offset = 1 if task.depot else 0
+    if not located:
+        return [(stop, None) for stop in task.stops], None
+
+    if task.depot:
+        start = 0
+    else:
+        start = min(range(len(located)), key=lambda index: PRIORITY_RANK.get(located[index].priority, 2))
+
+    solution = solve_route(
+        task_points(task.stops, task.depot), start=start, time_budget=task.time_budget,
+        seed=task.seed, matrix=distances,
+    )
+    ordered = [(located[node - offset], node) for node in solution.tour[offset:]]
+    return ordered + [(stop, None) for stop in missing], solution
+
+
+def compute_route(task: RouteTask) -> RouteTaskResult:
+    """Порядок обхода и время прибытия/отъезда по точкам маршрута"""
+    began = time_module.perf_counter()
+    result = RouteTaskResult(task.installer_id, task.installer_name, task.date)
+    try:
+        distances, seconds_matrix = _matrices(task)
+        ordered, solution = _sequence(task, distances)
+
+        previous = 0 if task.depot else None
+        current = DAY_START_MINUTES
+        for stop, node in ordered:
+            planned = PlannedStop(stop.schedule_id, current % MINUTES_PER_DAY, 0)
+            if node is not None and previous is not None:
+                distance = float(distances[previous, node])
+                seconds = float(seconds_matrix[previous, node])
+                planned.distance, planned.travel_seconds = distance, seconds
+                planned.arrival = (current + int(seconds // 60)) % MINUTES_PER_DAY
+                result.total_distance += distance
+                result.total_travel_seconds += seconds
+            planned.departure = (planned.arrival + stop.duration) % MINUTES_PER_DAY
+            current = planned.departure
+            previous = node
+            result.stops.append(planned)
+
+        result.baseline_distance = solution.baseline_distance if solution else result.total_distance
+    except Exception as e:
+        result.error = str(e)
+    result.elapsed = time_module.perf_counter() - began
+    return result
@@ -0,0 +1,227 @@
+# calendar_app/routing.py
+"""
+Построение дневного маршрута монтажника.
+
+Матрица расстояний считается векторно (гаверсинус на NumPy), начальный
+маршрут строится "ближайшим соседом", затем улучшается локальным поиском
+2-opt и Or-opt. Оставшееся время бюджета тратится на итеративный локальный
+поиск с возмущениями double-bridge от генератора с заданным seed.
+
+Маршрут открытый: начинается в фиксированной точке (склад или первый
+монтаж) и не возвращается назад. При одинаковом seed и неисчерпанном
+бюджете времени результат детерминирован.
+"""
+import time as time_module
+from dataclasses import dataclass, field
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0
+EPSILON = 1e-9
+MAX_SEGMENT_LENGTH = 3
+
+
+def distance_matrix(points: Sequence[Tuple[float, float]],
+                    destinations: Optional[Sequence[Tuple[float, float]]] = None) -> np.ndarray:
+    """
+    Матрица расстояний по гаверсинусу (км) для массива (широта, долгота);
+    с destinations - прямоугольная points × destinations
+    """
+    coordinates = np.radians(np.asarray(points, dtype=np.float64).reshape(-1, 2))
+    targets = coordinates if destinations is None else np.radians(
+        np.asarray(destinations, dtype=np.float64).reshape(-1, 2)
+    )
+    latitudes = coordinates[:, 0][:, None]
+    longitudes = coordinates[:, 1][:, None]
+    target_latitudes = targets[:, 0][None, :]
+    target_longitudes = targets[:, 1][None, :]
+
+    delta_lat = target_latitudes - latitudes
+    delta_lon = target_longitudes - longitudes
+    a = np.sin(delta_lat / 2) ** 2 + np.cos(latitudes) * np.cos(target_latitudes) * np.sin(delta_lon / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arctan2(np.sqrt(a), np.sqrt(np.clip(1 - a, 0, None)))
+
+
+def tour_length(matrix: np.ndarray, tour: Sequence[int]) -> float:
+    """Длина открытого маршрута"""
+    tour = np.asarray(tour)
+    if len(tour) < 2:
+        return 0.0
+    return float(matrix[tour[:-1], tour[1:]].sum())
+
+
+def nearest_neighbour(matrix: np.ndarray, start: int = 0) -> List[int]:
+    """Маршрут "ближайшего соседа" из точки start (при равенстве - меньший индекс)"""
+    size = len(matrix)
+    visited = np.zeros(size, dtype=bool)
+    tour = [start]
+    visited[start] = True
+    for _ in range(size - 1):
+        distances = np.where(visited, np.inf, matrix[tour[-1]])
+        nearest = int(np.argmin(distances))
+        tour.append(nearest)
+        visited[nearest] = True
+    return tour
+
+
+def two_opt(matrix: np.ndarray, tour: List[int], deadline: float) -> bool:
+    """
+    Разворот отрезков tour[i..j] (первая точка фиксирована).
+    Для каждого i выгода по всем j считается одним векторным выражением.
+    """
+    size = len(tour)
+    improved_any = False
+    improved = True
+    while improved and time_module.perf_counter() < deadline:
+        improved = False
+        nodes = np.asarray(tour)
+        for i in range(1, size - 1):
+            previous, first = nodes[i - 1], nodes[i]
+            last = nodes[i + 1:]
+            following = np.append(nodes[i + 2:], -1)
+            has_next = following >= 0
+            safe_next = np.where(has_next, following, 0)
+
+            delta = matrix[previous, last] - matrix[previous, first] + np.where(
+                has_next, matrix[first, safe_next] - matrix[last, safe_next], 0.0
+            )
+            best = int(np.argmin(delta))
+            if delta[best] < -EPSILON:
+                j = i + 1 + best
+                tour[i:j + 1] = tour[i:j + 1][::-1]
+                nodes = np.asarray(tour)
+                improved = improved_any = True
+    return improved_any
+
+
+def or_opt(matrix: np.ndarray, tour: List[int], deadline: float) -> bool:
+    """
+    Перенос отрезков из 1-3 точек (в том числе развернутых) на лучшее место.
+    Стоимость вставки во все позиции считается векторно.
+    """
+    size = len(tour)
+    improved_any = False
+    improved = True
+    while improved and time_module.perf_counter() < deadline:
+        improved = False
+        for length in range(1, min(MAX_SEGMENT_LENGTH, size - 2) + 1):
+            i = 1
+            while i + length <= size:
+                segment = tour[i:i + length]
+                rest = tour[:i] + tour[i + length:]
+                previous = tour[i - 1]
+                following = tour[i + length] if i + length < size else None
+
+                removal = -matrix[previous, segment[0]]
+                if following is not None:
+                    removal += matrix[previous, following] - matrix[segment[-1], following]
+
+                nodes = np.asarray(rest)
+                left = nodes
+                right = np.append(nodes[1:], -1)
+                has_right = right >= 0
+                safe_right = np.where(has_right, right, 0)
+                base = np.where(has_right, matrix[left, safe_right], 0.0)
+
+                forward = matrix[left, segment[0]] + np.where(has_right, matrix[segment[-1], safe_right], 0.0) - base
+                backward = matrix[left, segment[-1]] + np.where(has_right, matrix[segment[0], safe_right], 0.0) - base
+
+                # Возврат на исходное место не считается улучшением
+                forward[i - 1] = np.inf
+                if length == 1:
+                    backward[:] = np.inf
+                else:
+                    backward[i - 1] = np.inf
+
+                position_forward = int(np.argmin(forward))
+                position_backward = int(np.argmin(backward))
+                if forward[position_forward] <= backward[position_backward]:
+                    position, insertion, inserted = position_forward, forward[position_forward], segment
+                else:
+                    position, insertion, inserted = position_backward, backward[position_backward], segment[::-1]
+
+                if removal + insertion < -EPSILON:
+                    tour[:] = rest[:position + 1] + inserted + rest[position + 1:]
+                    improved = improved_any = True
+                i += 1
+            if time_module.perf_counter() >= deadline:
+                break
+    return improved_any
+
+
+def local_search(matrix: np.ndarray, tour: List[int], deadline: float) -> List[int]:
+    """Чередует 2-opt и Or-opt до локального минимума или конца бюджета"""
+    tour = list(tour)
+    while time_module.perf_counter() < deadline:
+        changed = two_opt(matrix, tour, deadline)
+        changed = or_opt(matrix, tour, deadline) or changed
+        if not changed:
+            break
+    return tour
+
+
+def double_bridge(tour: List[int], rng: np.random.Generator) -> List[int]:
+    """Возмущение double-bridge с сохранением первой точки"""
+    cuts = np.sort(rng.choice(np.arange(1, len(tour)), size=3, replace=False))
+    a, b, c = (int(cut) for cut in cuts)
+    return tour[:a] + tour[b:c] + tour[a:b] + tour[c:]
+
+
+@dataclass
+class RouteSolution:
+    """Результат оптимизации: порядок точек и статистика"""
+    tour: List[int]
+    distance: float
+    baseline_distance: float
+    iterations: int = 0
+    elapsed: float = 0.0
+    baseline_tour: List[int] = field(default_factory=list)
+
+    @property
+    def distance_saved(self) -> float:
+        return max(0.0, self.baseline_distance - self.distance)
+
+
+def solve_route(points: Sequence[Tuple[float, float]], start: int = 0, time_budget: float = 1.0,
+                seed: int = 0, perturbations: int = 30,
+                matrix: Optional[np.ndarray] = None) -> RouteSolution:
+    """
+    Оптимальный порядок обхода точек из фиксированной точки start.
+    perturbations - число шагов итеративного локального поиска.
+    """
+    began = time_module.perf_counter()
+    deadline = began + max(time_budget, 0.0)
+    matrix = distance_matrix(points) if matrix is None else matrix
+    size = len(matrix)
+
+    if size <= 2:
+        tour = list(range(size)) if start == 0 else [start] + [i for i in range(size) if i != start]
+        distance = tour_length(matrix, tour)
+        return RouteSolution(tour, distance, distance, 0, time_module.perf_counter() - began, list(tour))
+
+    baseline = nearest_neighbour(matrix, start)
+    baseline_distance = tour_length(matrix, baseline)
+
+    best = local_search(matrix, baseline, deadline)
+    best_distance = tour_length(matrix, best)
+
+    iterations = 0
+    if size >= 5:
+        rng = np.random.default_rng(seed)
+        current, current_distance = best, best_distance
+        for _ in range(perturbations):
+            if time_module.perf_counter() >= deadline:
+                break
+            iterations += 1
+            candidate = local_search(matrix, double_bridge(current, rng), deadline)
+            candidate_distance = tour_length(matrix, candidate)
+            if candidate_distance < current_distance - EPSILON:
+                current, current_distance = candidate, candidate_distance
+                if current_distance < best_distance - EPSILON:
+                    best, best_distance = current, current_distance
+
+    return RouteSolution(
+        best, best_distance, baseline_distance, iterations,
+        time_module.perf_counter() - began, baseline
+    )
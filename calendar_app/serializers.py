@@ -55,7 +55,7 @@ class RoutePointSerializer(serializers.ModelSerializer):
     class Meta:
         model = RoutePoint
         fields = [
-            'id', 'sequence_number', 'arrival_time', 'departure_time',
+            'id', 'sequence_number', 'arrival_time', 'departure_time', 'is_late',
             'schedule', 'schedule_details', 'client_name', 'client_address', 'order_id'
         ]
 
@@ -68,7 +68,7 @@ class RouteOptimizationSerializer(serializers.ModelSerializer):
         model = RouteOptimization
         fields = [
             'id', 'date', 'installer', 'installer_name', 'total_distance',
-            'total_travel_time', 'start_location', 'is_optimized',
+            'total_travel_time', 'baseline_distance', 'start_location', 'is_optimized',
             'created_at', 'updated_at', 'points', 'schedules_count'
         ]
         read_only_fields = ['created_at', 'updated_at']
@@ -1,13 +1,23 @@
 # calendar_app/services.py
-import requests
-from datetime import datetime, timedelta, time
+from dataclasses import replace
+from datetime import datetime, timedelta
 from django.conf import settings
 from django.utils import timezone
-from django.db.models import Q
+from django.db import transaction
 from typing import List, Dict, Tuple, Optional
 import math
 
-from .models import InstallationSchedule, RouteOptimization, RoutePoint
+from . import geocoding, holds, ics
+from .booking import booking_section, sync_assignments
+from .batch_geocoding import request_background_geocoding
+from .models import InstallationSchedule, RouteOptimization, RoutePoint, SlotHold
+from .availability import AvailabilityIndex, get_work_hours, to_minutes, from_minutes
+from .occupancy import OccupancyIndex, refresh_days
+from .vrp import Crew, solve_day
+from .travel import travel_matrices, travel_matrix
+from .route_tasks import RouteTask, compute_route, task_points
+from .daymodel import DayModel
+from customer_clients.models import Client
 from user_accounts.models import User
 
 class GeocodeService:
@@ -17,46 +27,30 @@ class GeocodeService:
     def geocode_address(address: str) -> Optional[Tuple[float, float]]:
         """
         Получает координаты по адресу через Яндекс.Карты API
+        с кэшем по нормализованному адресу (calendar_app.geocoding).
         Возвращает (latitude, longitude) или None
         """
-        if not address:
-            return None
-            
-        # Можете заменить на ваш API ключ
-        api_key = getattr(settings, 'YANDEX_MAPS_API_KEY', '')
-        
-        if not api_key:
-            # Заглушка для тестирования - случайные координаты Москвы
-            import random
-            return (
-                55.7558 + random.uniform(-0.1, 0.1),  # Широта Москвы +- погрешность
-                37.6176 + random.uniform(-0.1, 0.1)   # Долгота Москвы +- погрешность
-            )
-        
-        url = "https://geocode-maps.yandex.ru/1.x/"
-        params = {
-            'apikey': api_key,
-            'geocode': address,
-            'format': 'json',
-            'results': 1
-        }
+        return geocoding.geocode(address)
+    
+    @staticmethod
+    def known_coordinates(client, save: bool = False) -> Optional[Tuple[float, float]]:
+        """
+        Координаты клиента без обращения к геокодеру: из записи клиента или кэша.
+        Если их нет, адрес ставится в фоновое геокодирование (batch_geocoding)
+        """
+        if client.latitude is not None and client.longitude is not None:
+            return client.latitude, client.longitude
         
-        try:
-            response = requests.get(url, params=params, timeout=5)
-            response.raise_for_status()
-            data = response.json()
-            
-            feature_member = data['response']['GeoObjectCollection']['featureMember']
-            if not feature_member:
-                return None
-                
-            coords = feature_member[0]['GeoObject']['Point']['pos'].split()
-            longitude, latitude = float(coords[0]), float(coords[1])
-            return (latitude, longitude)
-            
-        except Exception as e:
-            print(f"Ошибка геокодирования для адреса '{address}': {e}")
+        coordinates = geocoding.cached_coordinates(client.address) if client.address else None
+        if coordinates is geocoding._NOT_FOUND:
+            request_background_geocoding()
             return None
+        if coordinates and save:
+            client.latitude, client.longitude = coordinates
+            Client.objects.filter(pk=client.pk, address=client.address).update(
+                latitude=coordinates[0], longitude=coordinates[1]
+            )
+        return coordinates
 
 class RouteCalculationService:
     """Сервис для расчета расстояний и времени между точками"""
@@ -101,59 +95,156 @@ class CalendarService:
     """Основной сервис для работы с календарем монтажей"""
     
     @staticmethod
-    def create_schedule(order, scheduled_date, start_time, end_time, installers_ids: List[int], **kwargs):
-        """Создает расписание монтажа"""
-        
-        # Проверяем доступность монтажников
-        conflicts = CalendarService.check_installer_availability(
-            installers_ids, scheduled_date, start_time, end_time
-        )
-        
-        if conflicts:
-            raise ValueError(f"Конфликт расписания для монтажников: {conflicts}")
-        
-        # Получаем координаты адреса клиента
-        coordinates = GeocodeService.geocode_address(order.client.address)
-        
-        # Создаем расписание
-        schedule = InstallationSchedule.objects.create(
-            order=order,
-            scheduled_date=scheduled_date,
-            scheduled_time_start=start_time,
-            scheduled_time_end=end_time,
-            latitude=coordinates[0] if coordinates else None,
-            longitude=coordinates[1] if coordinates else None,
-            **kwargs
-        )
+    def create_schedule(order, scheduled_date, start_time, end_time, installers_ids: List[int],
+                        hold_token: Optional[str] = None, **kwargs):
+        """
+        Создает расписание монтажа. Проверка доступности и запись выполняются
+        в booking_section, поэтому параллельные запросы не займут одного
+        монтажника дважды: проигравший получает BookingConflict (ValueError).
+        hold_token - временная бронь этого окна: она не мешает проверке
+        и снимается после создания расписания
+        """
+        # Координаты адреса клиента (без ожидания геокодера)
+        coordinates = GeocodeService.known_coordinates(order.client, save=True)
         
-        # Добавляем монтажников
-        schedule.installers.set(installers_ids)
+        with booking_section(installers_ids):
+            # Проверяем доступность монтажников
+            conflicts = CalendarService.check_installer_availability(
+                installers_ids, scheduled_date, start_time, end_time, hold_token=hold_token
+            )
+            
+            if conflicts:
+                raise ValueError(f"Конфликт расписания для монтажников: {conflicts}")
+            
+            # Создаем расписание
+            schedule = InstallationSchedule.objects.create(
+                order=order,
+                scheduled_date=scheduled_date,
+                scheduled_time_start=start_time,
+                scheduled_time_end=end_time,
+                latitude=coordinates[0] if coordinates else None,
+                longitude=coordinates[1] if coordinates else None,
+                **kwargs
+            )
+            
+            # Добавляем монтажников; сигнал m2m_changed записывает назначения
+            # InstallerAssignment, пересечение откатывает всю секцию
+            schedule.installers.set(installers_ids)
+            holds.release(hold_token)
         
         return schedule
     
     @staticmethod
-    def check_installer_availability(installer_ids: List[int], date, start_time, end_time) -> List[str]:
-        """Проверяет доступность монтажников на указанное время"""
-        conflicts = []
-        
-        for installer_id in installer_ids:
-            installer = User.objects.get(id=installer_id)
-            
-            # Ищем пересекающиеся расписания
-            overlapping = InstallationSchedule.objects.filter(
-                installers=installer,
-                scheduled_date=date,
-                status__in=['scheduled', 'in_progress']
-            ).filter(
-                Q(scheduled_time_start__lt=end_time) & 
-                Q(scheduled_time_end__gt=start_time)
+    def hold_slot(installer_ids: List[int], date, start_time, end_time, created_by=None,
+                  minutes: Optional[int] = None, token: Optional[str] = None) -> Dict:
+        """
+        Временно бронирует окно за монтажниками, пока менеджер согласует его
+        с клиентом. Повторный вызов с тем же token переносит или продлевает
+        бронь. Занятое окно - ValueError
+        """
+        installer_ids = sorted({int(installer_id) for installer_id in installer_ids})
+        if not installer_ids:
+            raise ValueError("Не указаны монтажники")
+        if start_time >= end_time:
+            raise ValueError("Время окончания должно быть больше времени начала")
+        
+        holds.purge_expired()
+        with booking_section(installer_ids):
+            conflicts = CalendarService.check_installer_availability(
+                installer_ids, date, start_time, end_time, hold_token=token
             )
+            if conflicts:
+                raise ValueError(f"Конфликт расписания для монтажников: {conflicts}")
             
-            if overlapping.exists():
-                conflicts.append(f"{installer.get_full_name()}")
+            holds.release(token)
+            token = token or holds.new_token()
+            expires_at = holds.expiry(minutes)
+            SlotHold.objects.bulk_create([
+                SlotHold(
+                    token=token, installer_id=installer_id, date=date, start_time=start_time,
+                    end_time=end_time, expires_at=expires_at, created_by=created_by,
+                )
+                for installer_id in installer_ids
+            ])
+        
+        return {
+            'token': token,
+            'installer_ids': installer_ids,
+            'date': date,
+            'start_time': start_time,
+            'end_time': end_time,
+            'expires_at': expires_at,
+        }
+    
+    @staticmethod
+    def check_installer_availability(installer_ids: List[int], date, start_time, end_time,
+                                     hold_token: Optional[str] = None) -> List[str]:
+        """
+        Проверяет доступность монтажников на указанное время.
+        Возвращает имена занятых монтажников и сообщения о неизвестных id.
+        Свободные определяются по битовым картам занятости, точная проверка
+        по интервалам нужна только тем, у кого пересекаются слоты окна.
+        Чужие временные брони занимают окно, брони hold_token - нет
+        """
+        installer_ids = [int(installer_id) for installer_id in installer_ids]
+        occupancy = OccupancyIndex.load(date, installer_ids=installer_ids, hold_token=hold_token)
+        start, end = to_minutes(start_time), to_minutes(end_time)
+        suspects = [
+            installer_id for installer_id in installer_ids
+            if occupancy.may_be_busy(installer_id, date, start, end)
+        ]
         
+        conflicts = []
+        if suspects:
+            availability = CalendarService.get_availability(
+                suspects, date, start_time, end_time, hold_token=hold_token
+            )
+            conflicts = [conflict['name'] for conflict in availability['conflicts']]
+        known = set(User.objects.filter(id__in=installer_ids).values_list('id', flat=True))
+        conflicts.extend(
+            f"Монтажник #{installer_id} не найден" for installer_id in sorted(set(installer_ids) - known)
+        )
         return conflicts
     
+    @staticmethod
+    def get_availability(installer_ids: List[int], date, start_time, end_time,
+                         index: Optional[AvailabilityIndex] = None, hold_token: Optional[str] = None) -> Dict:
+        """
+        Доступность монтажников и их свободные окна на день.
+        Все интервалы и временные брони загружаются в AvailabilityIndex
+        """
+        installer_ids = [int(installer_id) for installer_id in installer_ids]
+        index = index or AvailabilityIndex.load(date, installer_ids=installer_ids, hold_token=hold_token)
+        start, end = to_minutes(start_time), to_minutes(end_time)
+        
+        conflicts = []
+        free_windows = {}
+        for installer_id in installer_ids:
+            if installer_id not in index.installers:
+                continue
+            if not index.is_free(installer_id, date, start, end):
+                conflicts.append({
+                    'installer_id': installer_id,
+                    'name': index.installers[installer_id],
+                    'schedule_ids': index.conflicting_schedules(installer_id, date, start, end),
+                    'hold_ids': index.conflicting_holds(installer_id, date, start, end),
+                })
+            free_windows[installer_id] = [
+                {'start': from_minutes(window_start), 'end': from_minutes(window_end)}
+                for window_start, window_end in index.free_windows(installer_id, date)
+            ]
+        
+        return {
+            'available': not conflicts and not index.unknown,
+            'conflicts': conflicts,
+            'unknown_installers': index.unknown,
+            'free_windows': free_windows,
+            'common_free_windows': [
+                {'start': from_minutes(window_start), 'end': from_minutes(window_end)}
+                for window_start, window_end in index.common_free_windows(free_windows.keys(), date)
+            ],
+        }
+    
     @staticmethod
     def get_installer_schedule(installer_id: int, start_date, end_date) -> List[Dict]:
         """Получает расписание монтажника на период"""
@@ -186,166 +277,266 @@ class RouteOptimizationService:
     
     @staticmethod
     def optimize_daily_route(installer_id: int, date) -> RouteOptimization:
-        """Оптимизирует маршрут монтажника на день"""
-        
-        installer = User.objects.get(id=installer_id)
+        """
+        Оптимизирует маршрут монтажника на день.
+        Расчет (compute_route) идет в памяти, сохранение - одной транзакцией
+        пакетными запросами (save_route_results), число запросов не зависит
+        от количества монтажей.
+        """
+        tasks = RouteOptimizationService.build_route_tasks([date], [installer_id], geocode=False)
+        if not tasks:
+            return None
         
-        # Получаем все запланированные монтажи на день
-        schedules = InstallationSchedule.objects.filter(
-            installers=installer,
-            scheduled_date=date,
-            status='scheduled'
-        ).select_related('order', 'order__client')
+        result = compute_route(tasks[0])
+        if result.error:
+            raise ValueError(result.error)
         
-        if not schedules:
+        routes = RouteOptimizationService.save_route_results([result])
+        return routes[0] if routes else None
+    
+    @staticmethod
+    def optimize_day(date, allow_reassign: bool = True, time_budget: Optional[float] = None,
+                     seed: Optional[int] = None) -> Dict:
+        """
+        Маршруты всех монтажников на день с учетом окон монтажей (calendar_app.vrp).
+        Монтажи с одним монтажником могут переходить к другим бригадам (allow_reassign).
+        Если дневное решение нарушает окна чаще текущего распределения,
+        выполняется прежняя оптимизация по каждому монтажнику отдельно.
+        """
+        calendar_settings = getattr(settings, 'CALENDAR_SETTINGS', {})
+        time_budget = calendar_settings.get('DAY_ROUTE_TIME_BUDGET', 5.0) if time_budget is None else time_budget
+        seed = calendar_settings.get('ROUTE_SEED', 0) if seed is None else seed
+        
+        # Монтажи дня - компактной моделью (calendar_app.daymodel); недостающие
+        # координаты - из клиента или кэша геокодера, остальные геокодируются в фоне
+        model = DayModel.load([date])
+        if not len(model):
             return None
+        model.fill_coordinates(geocode=False)
         
-        # Создаем или получаем объект маршрута
-        route, created = RouteOptimization.objects.get_or_create(
-            installer=installer,
-            date=date,
-            defaults={
-                'start_location': 'Склад компании',  # Можно сделать настраиваемым
-                'is_optimized': False
-            }
+        installers = sorted(
+            set(User.objects.filter(role='installer', is_active=True).values_list('id', flat=True))
+            | model.installer_ids()
+        )
+        work_start, _ = get_work_hours()
+        jobs = model.to_jobs()
+        
+        if not jobs:
+            return RouteOptimizationService._optimize_day_per_installer(date, model, 'нет координат монтажей')
+        
+        solution = solve_day(
+            jobs, [Crew(id=installer_id, start=work_start) for installer_id in installers],
+            depot=RouteOptimizationService._get_depot(), allow_reassign=allow_reassign,
+            time_budget=time_budget, seed=seed,
+            crew_cost=calendar_settings.get('DAY_ROUTE_CREW_COST_KM', 30.0),
+            travel=lambda points: travel_matrix(points, work_start),
         )
         
-        # Очищаем существующие точки маршрута
-        RoutePoint.objects.filter(route=route).delete()
-        
-        # Добавляем координаты для адресов, если их нет
-        for schedule in schedules:
-            if not schedule.latitude or not schedule.longitude:
-                coordinates = GeocodeService.geocode_address(schedule.order.client.address)
-                if coordinates:
-                    schedule.latitude = coordinates[0]
-                    schedule.longitude = coordinates[1]
-                    schedule.save()
-        
-        # Применяем алгоритм оптимизации (упрощенный)
-        optimized_schedules = RouteOptimizationService._simple_optimization(list(schedules))
-        
-        # Создаем точки маршрута
-        total_distance = 0
-        total_travel_time = timedelta()
-        current_time = time(8, 0)  # Начало рабочего дня
-        
-        for i, schedule in enumerate(optimized_schedules, 1):
-            # Рассчитываем время прибытия и отъезда
-            if i == 1:
-                arrival_time = current_time
-            else:
-                # Время прибытия = время отъезда с предыдущей точки + время в пути
-                prev_schedule = optimized_schedules[i-2]
-                if schedule.latitude and schedule.longitude and prev_schedule.latitude and prev_schedule.longitude:
-                    distance = RouteCalculationService.calculate_distance(
-                        prev_schedule.latitude, prev_schedule.longitude,
-                        schedule.latitude, schedule.longitude
-                    )
-                    travel_time = RouteCalculationService.estimate_travel_time(distance)
-                    
-                    total_distance += distance
-                    total_travel_time += travel_time
-                    
-                    # Обновляем данные в расписании
-                    schedule.travel_distance_to = distance
-                    schedule.travel_time_to = travel_time
-                    schedule.save()
-                    
-                    current_time_delta = timedelta(
-                        hours=current_time.hour,
-                        minutes=current_time.minute
-                    ) + travel_time
-                    
-                    hours = int(current_time_delta.total_seconds() // 3600)
-                    minutes = int((current_time_delta.total_seconds() % 3600) // 60)
-                    arrival_time = time(hours % 24, minutes)
-                else:
-                    arrival_time = current_time
-            
-            # Время отъезда = время прибытия + продолжительность работ
-            if schedule.estimated_duration:
-                departure_delta = timedelta(
-                    hours=arrival_time.hour,
-                    minutes=arrival_time.minute
-                ) + schedule.estimated_duration
-                
-                hours = int(departure_delta.total_seconds() // 3600)
-                minutes = int((departure_delta.total_seconds() % 3600) // 60)
-                departure_time = time(hours % 24, minutes)
-                current_time = departure_time
-            else:
-                # По умолчанию 2 часа на монтаж
-                departure_delta = timedelta(
-                    hours=arrival_time.hour,
-                    minutes=arrival_time.minute
-                ) + timedelta(hours=2)  # Исправлено: убрано дублирование hours
-                
-                hours = int(departure_delta.total_seconds() // 3600)
-                minutes = int((departure_delta.total_seconds() % 3600) // 60)
-                departure_time = time(hours % 24, minutes)
-                current_time = departure_time
-            
-            # Создаем точку маршрута
-            RoutePoint.objects.create(
-                route=route,
-                schedule=schedule,
-                sequence_number=i,
-                arrival_time=arrival_time,
-                departure_time=departure_time
+        if len(solution.unassigned) > solution.baseline_violations:
+            return RouteOptimizationService._optimize_day_per_installer(
+                date, model, f'окна нарушены у {len(solution.unassigned)} монтажей'
             )
         
-        # Обновляем общие данные маршрута
-        route.total_distance = total_distance
-        route.total_travel_time = total_travel_time
-        route.is_optimized = True
-        route.save()
+        RouteOptimizationService._save_day_solution(date, model, installers, solution)
+        
+        return {
+            'mode': 'day',
+            'date': date,
+            'routes': len(solution.routes),
+            'total_distance': round(solution.distance, 2),
+            'baseline_distance': round(solution.baseline_distance, 2),
+            'distance_saved': round(solution.distance_saved, 2),
+            'reassigned': solution.reassigned,
+            'window_violations': solution.unassigned,
+            'baseline_window_violations': solution.baseline_violations,
+            'elapsed': round(solution.elapsed, 3),
+        }
+    
+    @staticmethod
+    def _optimize_day_per_installer(date, model, reason: str) -> Dict:
+        """Резервный режим: маршрут каждого монтажника строится отдельно"""
+        installer_ids = sorted(model.installer_ids())
+        tasks = RouteOptimizationService.build_route_tasks([date], installer_ids, geocode=False)
+        routes = RouteOptimizationService.save_route_results([compute_route(task) for task in tasks])
+        return {
+            'mode': 'installer',
+            'fallback_reason': reason,
+            'date': date,
+            'routes': len(routes),
+            'total_distance': round(sum(route.total_distance or 0 for route in routes), 2),
+            'baseline_distance': round(sum(route.baseline_distance or 0 for route in routes), 2),
+        }
+    
+    @staticmethod
+    @transaction.atomic
+    def _save_day_solution(date, model, installers, solution):
+        """Маршруты, точки, переназначения и данные о переездах - пакетными запросами"""
+        # Переназначенные монтажи
+        if solution.reassigned:
+            Through = InstallationSchedule.installers.through
+            Through.objects.filter(installationschedule_id__in=list(solution.reassigned)).delete()
+            Through.objects.bulk_create([
+                Through(installationschedule_id=schedule_id, user_id=installer_id)
+                for schedule_id, installer_id in solution.reassigned.items()
+            ])
+            # bulk-операции не вызывают сигналы - занятость, назначения и ленты
+            # прежних и новых монтажников обновляются явно
+            affected = set(solution.reassigned.values()) | {
+                installer_id for schedule_id in solution.reassigned for installer_id in model.crews_of(schedule_id)
+            }
+            refresh_days((installer_id, date) for installer_id in affected)
+            sync_assignments(solution.reassigned)
+            ics.invalidate_feeds(affected)
+        
+        # Маршруты монтажников без монтажей на этот день больше не нужны
+        RouteOptimization.objects.filter(date=date, installer_id__in=list(installers)).exclude(
+            installer_id__in=list(solution.routes)
+        ).delete()
+        
+        existing = {
+            route.installer_id: route
+            for route in RouteOptimization.objects.filter(date=date, installer_id__in=list(solution.routes))
+        }
+        start_location = getattr(settings, 'CALENDAR_SETTINGS', {}).get('WAREHOUSE_ADDRESS', 'Склад компании')
+        now = timezone.now()
+        
+        routes, created, updated_routes = [], [], []
+        for installer_id, stops in solution.routes.items():
+            route = existing.get(installer_id)
+            if route is None:
+                route = RouteOptimization(installer_id=installer_id, date=date, start_location=start_location)
+                created.append(route)
+            else:
+                updated_routes.append(route)
+            route.total_distance = sum(stop.distance for stop in stops)
+            route.total_travel_time = timedelta(minutes=sum(stop.travel for stop in stops))
+            route.baseline_distance = solution.baseline_by_crew.get(installer_id, route.total_distance)
+            route.is_optimized = True
+            route.updated_at = now
+            routes.append((route, stops))
+        
+        RouteOptimization.objects.bulk_create(created)
+        RouteOptimization.objects.bulk_update(
+            updated_routes, ['total_distance', 'total_travel_time', 'baseline_distance', 'is_optimized', 'updated_at']
+        )
+        RoutePoint.objects.filter(route__in=updated_routes).delete()
+        
+        points = []
+        updated_schedules = []
+        for route, stops in routes:
+            for sequence, stop in enumerate(stops, 1):
+                points.append(RoutePoint(
+                    route=route,
+                    schedule_id=stop.job_id,
+                    sequence_number=sequence,
+                    arrival_time=from_minutes(round(stop.start)),
+                    departure_time=from_minutes(round(stop.end)),
+                ))
+                updated_schedules.append(InstallationSchedule(
+                    id=stop.job_id, travel_distance_to=stop.distance, travel_time_to=timedelta(minutes=stop.travel),
+                ))
+        
+        RoutePoint.objects.bulk_create(points)
+        InstallationSchedule.objects.bulk_update(updated_schedules, ['travel_distance_to', 'travel_time_to'])
+    
+    @staticmethod
+    def build_route_tasks(dates, installer_ids: Optional[List[int]] = None, geocode: bool = True) -> List[RouteTask]:
+        """
+        Задачи (монтажник, дата) для compute_route() по запланированным монтажам
+        из компактной модели дней (calendar_app.daymodel). Недостающие координаты геокодируются пакетно (batch_geocoding.geocode_many)
+        и сохраняются одним bulk_update, матрицы расстояний берутся из кэша пар
+        (calendar_app.travel). geocode=False - только координаты из кэша, остальные
+        адреса уходят в фоновое геокодирование (для обработчиков запросов).
+        """
+        model = DayModel.load(dates, installer_ids, installers_only=True)
+        model.fill_coordinates(geocode=geocode)
+        
+        calendar_settings = getattr(settings, 'CALENDAR_SETTINGS', {})
+        depot = RouteOptimizationService._get_depot()
+        tasks = model.to_route_tasks(
+            depot,
+            time_budget=calendar_settings.get('ROUTE_TIME_BUDGET', 1.0),
+            seed=calendar_settings.get('ROUTE_SEED', 0),
+        )
         
-        return route
+        # Матрицы всех задач - из кэша пар, у провайдера только недостающие
+        matrices = travel_matrices([task_points(task.stops, depot) for task in tasks], get_work_hours()[0])
+        return [
+            replace(task, distances=tuple(map(tuple, distances.tolist())), durations=tuple(map(tuple, durations.tolist())))
+            for task, (distances, durations) in zip(tasks, matrices)
+        ]
     
     @staticmethod
-    def _simple_optimization(schedules: List[InstallationSchedule]) -> List[InstallationSchedule]:
+    @transaction.atomic
+    def save_route_results(results) -> List[RouteOptimization]:
         """
-        Простой алгоритм оптимизации маршрута по принципу "ближайшего соседа"
-        В реальном проекте можно использовать более сложные алгоритмы
+        Сохраняет результаты compute_route() одной транзакцией:
+        маршруты и точки - bulk_create/bulk_update, переезды - bulk_update
         """
-        if not schedules:
+        results = [result for result in results if not result.error and result.stops]
+        if not results:
             return []
         
-        # Фильтруем только те расписания, у которых есть координаты
-        schedules_with_coords = [s for s in schedules if s.latitude and s.longitude]
-        schedules_without_coords = [s for s in schedules if not s.latitude or not s.longitude]
-        
-        if not schedules_with_coords:
-            return schedules
-        
-        optimized = []
-        remaining = schedules_with_coords.copy()
-        
-        # Начинаем с расписания с наивысшим приоритетом
-        current = min(remaining, key=lambda x: {
-            'urgent': 0, 'high': 1, 'normal': 2, 'low': 3
-        }.get(x.priority, 2))
-        
-        optimized.append(current)
-        remaining.remove(current)
-        
-        # Алгоритм ближайшего соседа
-        while remaining:
-            current_lat, current_lon = current.latitude, current.longitude
-            
-            nearest = min(remaining, key=lambda s: RouteCalculationService.calculate_distance(
-                current_lat, current_lon, s.latitude, s.longitude
-            ))
-            
-            optimized.append(nearest)
-            remaining.remove(nearest)
-            current = nearest
-        
-        # Добавляем расписания без координат в конец
-        optimized.extend(schedules_without_coords)
+        existing = {
+            (route.installer_id, route.date): route
+            for route in RouteOptimization.objects.filter(
+                date__in={result.date for result in results},
+                installer_id__in={result.installer_id for result in results},
+            )
+        }
+        start_location = getattr(settings, 'CALENDAR_SETTINGS', {}).get('WAREHOUSE_ADDRESS', 'Склад компании')
+        now = timezone.now()
+        
+        routes, created, updated_routes = [], [], []
+        for result in results:
+            route = existing.get((result.installer_id, result.date))
+            if route is None:
+                route = RouteOptimization(
+                    installer_id=result.installer_id, date=result.date, start_location=start_location
+                )
+                created.append(route)
+            else:
+                updated_routes.append(route)
+            route.total_distance = result.total_distance
+            route.total_travel_time = timedelta(seconds=result.total_travel_seconds)
+            route.baseline_distance = result.baseline_distance
+            route.is_optimized = True
+            route.updated_at = now
+            routes.append(route)
+        
+        RouteOptimization.objects.bulk_create(created)
+        RouteOptimization.objects.bulk_update(
+            updated_routes, ['total_distance', 'total_travel_time', 'baseline_distance', 'is_optimized', 'updated_at']
+        )
+        RoutePoint.objects.filter(route__in=updated_routes).delete()
+        
+        points = []
+        travel = {}
+        for route, result in zip(routes, results):
+            for sequence, stop in enumerate(result.stops, 1):
+                points.append(RoutePoint(
+                    route=route,
+                    schedule_id=stop.schedule_id,
+                    sequence_number=sequence,
+                    arrival_time=from_minutes(stop.arrival),
+                    departure_time=from_minutes(stop.departure),
+                ))
+                if stop.distance is not None:
+                    travel[stop.schedule_id] = InstallationSchedule(
+                        id=stop.schedule_id,
+                        travel_distance_to=stop.distance,
+                        travel_time_to=timedelta(seconds=stop.travel_seconds),
+                    )
         
-        return optimized
+        RoutePoint.objects.bulk_create(points)
+        InstallationSchedule.objects.bulk_update(list(travel.values()), ['travel_distance_to', 'travel_time_to'])
+        return routes
+    
+    @staticmethod
+    def _get_depot() -> Optional[Tuple[float, float]]:
+        """Координаты склада из CALENDAR_SETTINGS или None"""
+        coordinates = getattr(settings, 'CALENDAR_SETTINGS', {}).get('WAREHOUSE_COORDINATES')
+        return tuple(coordinates) if coordinates else None
     
     @staticmethod
     def get_route_summary(installer_id: int, date) -> Dict:
@@ -362,6 +553,11 @@ class RouteOptimizationService:
                 'date': route.date,
                 'total_distance': route.total_distance,
                 'total_travel_time': route.total_travel_time,
+                'baseline_distance': route.baseline_distance,
+                'distance_saved': (
+                    round(max(route.baseline_distance - route.total_distance, 0), 2)
+                    if route.baseline_distance is not None and route.total_distance is not None else None
+                ),
                 'is_optimized': route.is_optimized,
                 'start_location': route.start_location,
                 'points': [
@@ -369,6 +565,7 @@ class RouteOptimizationService:
                         'sequence': point.sequence_number,
                         'arrival_time': point.arrival_time,
                         'departure_time': point.departure_time,
+                        'is_late': point.is_late,
                         'client_name': point.schedule.order.client.name,
                         'client_address': point.schedule.order.client.address,
                         'client_phone': point.schedule.order.client.phone,
@@ -0,0 +1,166 @@
+# calendar_app/signals.py
+from django.db.models import Q
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+from customer_clients.models import Client
+from orders.models import Order
+from user_accounts.models import User
+from . import booking, ics, occupancy
+from .models import InstallationSchedule
+from .services import GeocodeService
+
+# Поля, от которых зависят занятость и назначения монтажников
+TIMING_FIELDS = {'scheduled_date', 'scheduled_time_start', 'scheduled_time_end', 'status'}
+# Поля клиента, заказа и пользователей, которые календарь показывает вместе с расписанием
+CLIENT_DISPLAY_FIELDS = {'name', 'address', 'phone'}
+ORDER_DISPLAY_FIELDS = {'client', 'manager'}
+USER_DISPLAY_FIELDS = {'first_name', 'last_name', 'username'}
+
+
+def _touch_schedules(schedules, created, update_fields, display_fields):
+    """
+    Обновляет updated_at расписаний, если у связанной записи могли измениться
+    показываемые поля: ETag/Last-Modified календаря и версии лент ICS
+    считаются по updated_at
+    """
+    if created or (update_fields and not set(update_fields) & display_fields):
+        return
+    schedule_ids = list(schedules.values_list('id', flat=True).distinct())
+    if not schedule_ids:
+        return
+    InstallationSchedule.objects.filter(id__in=schedule_ids).update(updated_at=timezone.now())
+    # Эти поля входят и в ленты ICS монтажников
+    ics.invalidate_feeds(
+        InstallationSchedule.installers.through.objects.filter(
+            installationschedule_id__in=schedule_ids
+        ).values_list('user_id', flat=True)
+    )
+
+
+@receiver(post_save, sender=Client)
+def geocode_client_address(sender, instance, raw=False, **kwargs):
+    """
+    После смены адреса клиента берет координаты из кэша, а если их там нет -
+    ставит адрес в фоновое геокодирование (запрос не ждет геокодер)
+    """
+    if raw or not getattr(instance, '_address_changed', False):
+        return
+    
+    GeocodeService.known_coordinates(instance, save=True)
+
+
+@receiver(post_save, sender=Client)
+def touch_schedules_on_client_change(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    """Имя, адрес и телефон клиента входят в календарь"""
+    if not raw:
+        _touch_schedules(
+            InstallationSchedule.objects.filter(order__client=instance), created, update_fields, CLIENT_DISPLAY_FIELDS
+        )
+
+
+@receiver(post_save, sender=Order)
+def touch_schedules_on_order_change(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    """Клиент и менеджер заказа входят в календарь"""
+    if not raw:
+        _touch_schedules(
+            InstallationSchedule.objects.filter(order=instance), created, update_fields, ORDER_DISPLAY_FIELDS
+        )
+
+
+@receiver(post_save, sender=User)
+def touch_schedules_on_user_change(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    """Имена менеджера заказа и монтажников входят в календарь (last_login и т.п. - нет)"""
+    if not raw:
+        _touch_schedules(
+            InstallationSchedule.objects.filter(Q(order__manager=instance) | Q(installers=instance)),
+            created, update_fields, USER_DISPLAY_FIELDS,
+        )
+
+
+@receiver(m2m_changed, sender=InstallationSchedule.installers.through)
+def touch_schedules_on_installers_change(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Смена монтажников не меняет строку расписания - обновляем updated_at,
+    чтобы ETag/Last-Modified календаря учитывали такие изменения
+    """
+    if not reverse:
+        if action not in ('post_add', 'post_remove', 'post_clear'):
+            return
+        schedules = InstallationSchedule.objects.filter(pk=instance.pk)
+    elif action in ('post_add', 'post_remove'):
+        schedules = InstallationSchedule.objects.filter(pk__in=pk_set)
+    elif action == 'pre_clear':
+        # После очистки связей уже не узнать, какие расписания затронуты
+        schedules = InstallationSchedule.objects.filter(installers=instance)
+    else:
+        return
+    schedules.update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=InstallationSchedule)
+def schedule_saved(sender, instance, created, raw=False, **kwargs):
+    """
+    Изменение, отмена или перенос расписания: сброс лент ICS, пересчет
+    занятости его монтажников за текущий и прежний день и их назначений.
+    У нового расписания монтажников еще нет - их обработает m2m_changed
+    """
+    if raw or created:
+        return
+    installer_ids = list(instance.installers.values_list('id', flat=True))
+    ics.invalidate_feeds(installer_ids)
+    update_fields = kwargs.get('update_fields')
+    if update_fields and not set(update_fields) & TIMING_FIELDS:
+        return
+    days = {instance.scheduled_date, getattr(instance, '_loaded_date', None)}
+    occupancy.refresh_days((installer_id, day) for installer_id in installer_ids for day in days)
+    booking.sync_assignments([instance.pk])
+
+
+@receiver(pre_delete, sender=InstallationSchedule)
+def schedule_deleting(sender, instance, **kwargs):
+    """Монтажники удаляемого расписания - связи удаляются раньше post_delete"""
+    instance._deleted_installer_ids = list(instance.installers.values_list('id', flat=True))
+    ics.invalidate_feeds(instance._deleted_installer_ids)
+
+
+@receiver(post_delete, sender=InstallationSchedule)
+def schedule_deleted(sender, instance, **kwargs):
+    occupancy.refresh_days(
+        (installer_id, instance.scheduled_date) for installer_id in getattr(instance, '_deleted_installer_ids', [])
+    )
+
+
+@receiver(m2m_changed, sender=InstallationSchedule.installers.through)
+def installers_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """Назначение и снятие монтажников: ленты ICS и занятость затронутых монтажников"""
+    if reverse:
+        # instance - монтажник, pk_set - расписания
+        if action in ('post_add', 'post_remove'):
+            schedules = list(InstallationSchedule.objects.filter(pk__in=pk_set).values_list('id', 'scheduled_date'))
+        elif action == 'pre_clear':
+            instance._cleared_schedules = list(
+                InstallationSchedule.objects.filter(installers=instance).values_list('id', 'scheduled_date')
+            )
+            return
+        elif action == 'post_clear':
+            schedules = getattr(instance, '_cleared_schedules', [])
+        else:
+            return
+        ics.invalidate_feeds([instance.pk])
+        occupancy.refresh_days((instance.pk, day) for _, day in schedules)
+        booking.sync_assignments(schedule_id for schedule_id, _ in schedules)
+        return
+    
+    if action in ('post_add', 'post_remove'):
+        installer_ids = pk_set
+    elif action == 'pre_clear':
+        instance._cleared_installer_ids = list(instance.installers.values_list('id', flat=True))
+        return
+    elif action == 'post_clear':
+        installer_ids = getattr(instance, '_cleared_installer_ids', [])
+    else:
+        return
+    ics.invalidate_feeds(installer_ids)
+    occupancy.refresh_days((installer_id, instance.scheduled_date) for installer_id in installer_ids)
+    booking.sync_assignments([instance.pk])
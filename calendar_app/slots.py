@@ -0,0 +1,171 @@
+# calendar_app/slots.py
+"""
+Поиск ближайших свободных слотов для монтажа.
+
+Занятость за весь период загружается в AvailabilityIndex и битовые карты
+OccupancyIndex (константное число запросов), дальше кандидаты перебираются
+в памяти. Для каждого времени начала выбираются монтажники с наименьшим
+добавочным пробегом, слоты ранжируются по времени начала с учетом времени
+на дорогу.
+"""
+import heapq
+from datetime import timedelta
+from math import ceil
+from typing import Dict, List, Optional, Tuple
+
+from django.conf import settings
+
+from .availability import AvailabilityIndex, get_work_hours, from_minutes
+from .occupancy import OccupancyIndex
+from .services import RouteCalculationService
+
+DEFAULT_STEP_MINUTES = 30
+DEFAULT_LIMIT = 5
+MINUTES_PER_DAY = 24 * 60
+
+
+def _distance(first, second) -> Optional[float]:
+    if first is None or second is None:
+        return None
+    return RouteCalculationService.calculate_distance(first[0], first[1], second[0], second[1])
+
+
+def _travel_minutes(distance_km: Optional[float]) -> int:
+    if not distance_km:
+        return 0
+    return ceil(RouteCalculationService.estimate_travel_time(distance_km).total_seconds() / 60)
+
+
+def _point(interval) -> Optional[Tuple[float, float]]:
+    if interval is None or interval.latitude is None or interval.longitude is None:
+        return None
+    return interval.latitude, interval.longitude
+
+
+def _installer_option(index: AvailabilityIndex, installer_id: int, day, start: int, end: int,
+                      location: Optional[Tuple[float, float]]):
+    """
+    Добавочный пробег монтажника для окна [start, end) с учетом дороги
+    от предыдущего объекта и до следующего. None - окно недоступно
+    """
+    intervals = index.day_intervals(installer_id, day)
+    previous = next_interval = None
+    for interval in intervals:
+        if interval.end <= start:
+            if previous is None or interval.end > previous.end:
+                previous = interval
+        elif interval.start >= end:
+            if next_interval is None or interval.start < next_interval.start:
+                next_interval = interval
+        else:
+            return None
+
+    distance_in = _distance(_point(previous), location)
+    distance_out = _distance(location, _point(next_interval))
+
+    # Дорога до объекта и обратно должна помещаться между соседними монтажами
+    if previous is not None and previous.end + _travel_minutes(distance_in) > start:
+        return None
+    if next_interval is not None and end + _travel_minutes(distance_out) > next_interval.start:
+        return None
+
+    if location is None:
+        return 0.0
+    baseline = _distance(_point(previous), _point(next_interval)) or 0.0
+    return max(0.0, (distance_in or 0.0) + (distance_out or 0.0) - baseline)
+
+
+def _candidate_starts(index: AvailabilityIndex, installer_ids, day, work_start: int, work_end: int,
+                      duration: int, step: int) -> List[int]:
+    """Начала свободных окон всех монтажников и точки сетки с шагом step"""
+    starts = set(range(work_start, work_end - duration + 1, step))
+    for installer_id in installer_ids:
+        for window_start, window_end in index.free_windows(installer_id, day, work_start, work_end, duration):
+            starts.add(window_start)
+    return sorted(starts)
+
+
+def find_free_slots(duration: int, installers_count: int = 1, date_from=None, date_to=None,
+                    location: Optional[Tuple[float, float]] = None, limit: int = DEFAULT_LIMIT,
+                    step: int = DEFAULT_STEP_MINUTES, work_hours: Optional[Tuple[int, int]] = None,
+                    include_weekends: bool = False, installer_ids=None,
+                    index: Optional[AvailabilityIndex] = None,
+                    occupancy: Optional[OccupancyIndex] = None,
+                    hold_token: Optional[str] = None) -> List[Dict]:
+    """
+    Ближайшие слоты длительностью duration минут для installers_count монтажников.
+    Оценка слота = минуты от начала периода + время на добавочный пробег,
+    поэтому из двух близких по времени слотов выше тот, что ближе по маршруту.
+    Дни, в которые у монтажника нет свободного окна, отсекаются по битовым
+    картам занятости (occupancy) без перебора интервалов. Чужие временные
+    брони занимают окна, брони hold_token - нет.
+    """
+    work_start, work_end = work_hours or get_work_hours()
+    if index is None:
+        index = AvailabilityIndex.load(date_from, date_to, installer_ids=installer_ids, hold_token=hold_token)
+        occupancy = occupancy or OccupancyIndex.load(
+            date_from, date_to, installer_ids=installer_ids, hold_token=hold_token
+        )
+    installers = sorted(index.installers)
+    max_per_day = getattr(settings, 'CALENDAR_SETTINGS', {}).get('MAX_INSTALLATIONS_PER_DAY')
+
+    if installers_count < 1 or len(installers) < installers_count or duration <= 0:
+        return []
+
+    best = []  # куча (-оценка, -порядковый номер, слот) - худший слот на вершине
+    counter = 0
+    day = date_from
+    while day <= date_to:
+        day_offset = (day - date_from).days * MINUTES_PER_DAY
+        if not include_weekends and day.weekday() >= 5:
+            day += timedelta(days=1)
+            continue
+        # Оценка не меньше смещения начала, дальше искать нет смысла
+        if len(best) >= limit and day_offset + work_start > -best[0][0]:
+            break
+
+        # Битовая карта отсекает монтажников, у которых окно нужной длины не помещается
+        day_installers = [
+            installer_id for installer_id in installers
+            if (not max_per_day or len(index.day_intervals(installer_id, day)) < max_per_day)
+            and (occupancy is None or occupancy.has_room(installer_id, day, duration, work_start, work_end))
+        ]
+        if len(day_installers) < installers_count:
+            day += timedelta(days=1)
+            continue
+
+        for start in _candidate_starts(index, day_installers, day, work_start, work_end, duration, step):
+            if len(best) >= limit and day_offset + start > -best[0][0]:
+                break
+
+            options = []
+            for installer_id in day_installers:
+                added = _installer_option(index, installer_id, day, start, start + duration, location)
+                if added is not None:
+                    options.append((added, installer_id))
+            if len(options) < installers_count:
+                continue
+
+            chosen = heapq.nsmallest(installers_count, options)
+            added_distance = sum(added for added, _ in chosen)
+            score = day_offset + start + _travel_minutes(added_distance)
+            counter += 1
+            slot = {
+                'date': day,
+                'start_time': from_minutes(start),
+                'end_time': from_minutes(start + duration),
+                'installer_ids': [installer_id for _, installer_id in chosen],
+                'installers': [index.installers[installer_id] for _, installer_id in chosen],
+                'added_distance_km': round(added_distance, 2),
+                'added_travel_minutes': _travel_minutes(added_distance),
+                'score': score,
+            }
+            entry = (-score, -counter, slot)
+            if len(best) < limit:
+                heapq.heappush(best, entry)
+            elif entry > best[0]:
+                heapq.heapreplace(best, entry)
+
+        day += timedelta(days=1)
+
+    return [slot for _, _, slot in sorted(best, key=lambda entry: (-entry[0], -entry[1]))]
@@ -0,0 +1,70 @@
+# calendar_app/synthetic.py
+"""
+Синтетические дни для проверки и замеров маршрутизации.
+Генерация детерминирована по seed и не использует базу данных.
+"""
+from typing import List, Tuple
+
+import numpy as np
+
+from .vrp import Crew, Job
+
+MOSCOW_CENTER = (55.7558, 37.6176)
+
+
+def _points(rng, count: int, spread: float, clusters: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Координаты точек: равномерно в квадрате spread или вокруг центров районов"""
+    if clusters <= 0:
+        return (MOSCOW_CENTER[0] + rng.uniform(-spread, spread, count),
+                MOSCOW_CENTER[1] + rng.uniform(-spread * 1.6, spread * 1.6, count))
+    centers = np.column_stack((
+        MOSCOW_CENTER[0] + rng.uniform(-spread, spread, clusters),
+        MOSCOW_CENTER[1] + rng.uniform(-spread * 1.6, spread * 1.6, clusters),
+    ))
+    # Районы разного размера: в крупные попадает больше монтажей
+    weights = rng.dirichlet(np.full(clusters, 2.0))
+    members = rng.choice(clusters, size=count, p=weights)
+    offsets = rng.normal(0.0, spread / 6, (count, 2)) * (1.0, 1.6)
+    points = centers[members] + offsets
+    return points[:, 0], points[:, 1]
+
+
+def generate_day(crews: int = 20, jobs: int = 150, seed: int = 0, work_start: int = 8 * 60,
+                 work_end: int = 18 * 60, spread: float = 0.12,
+                 clusters: int = 0) -> Tuple[List[Job], List[Crew], Tuple[float, float]]:
+    """
+    День с jobs монтажами, распределенными по crews бригадам.
+    Монтажи бригады идут последовательными слотами внутри рабочего дня,
+    окна шириной 2.5-4 часа, длительность 30-90 минут.
+    clusters > 0 - точки собраны вокруг clusters районов, иначе равномерны.
+    Возвращает (монтажи, бригады, склад).
+    """
+    rng = np.random.default_rng(seed)
+    latitudes, longitudes = _points(rng, jobs, spread, clusters)
+    durations = rng.choice([30, 45, 60, 90], size=jobs, p=[0.3, 0.35, 0.25, 0.1])
+    priorities = rng.choice([0, 1, 2, 3], size=jobs, p=[0.05, 0.15, 0.6, 0.2])
+    owners = rng.integers(0, crews, size=jobs)
+
+    crew_list = [Crew(id=crew_id + 1, start=work_start) for crew_id in range(crews)]
+    job_list = []
+    for crew_id in range(crews):
+        own = np.flatnonzero(owners == crew_id)
+        if not len(own):
+            continue
+        slot = (work_end - work_start) / len(own)
+        for order, index in enumerate(own):
+            window_start = int(work_start + order * slot)
+            width = int(rng.choice([150, 180, 240]))
+            duration = int(durations[index])
+            job_list.append(Job(
+                id=int(index) + 1,
+                point=(float(latitudes[index]), float(longitudes[index])),
+                earliest=window_start,
+                latest=max(window_start, min(window_start + width, work_end) - duration),
+                duration=duration,
+                priority=int(priorities[index]),
+                crews=(crew_id + 1,),
+            ))
+
+    job_list.sort(key=lambda job: job.id)
+    return job_list, crew_list, MOSCOW_CENTER
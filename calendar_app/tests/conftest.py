@@ -0,0 +1,22 @@
+# calendar_app/tests/conftest.py
+import pytest
+
+from calendar_app import geocoding
+from calendar_app.geocoder_stub import start_stub_geocoder
+
+
+@pytest.fixture
+def stub_geocoder(request, settings):
+    """
+    Локальная заглушка геокодера; параметры сервера (fail_every, max_qps) -
+    через @pytest.mark.geocoder_stub(...). GEOCODER направлен на заглушку
+    без фонового потока и с короткой задержкой повтора
+    """
+    marker = request.node.get_closest_marker('geocoder_stub')
+    server, url = start_stub_geocoder(**(marker.kwargs if marker else {}))
+    settings.GEOCODER = dict(settings.GEOCODER, URL=url, BACKGROUND=False, BACKOFF_SECONDS=0.01)
+    geocoding.memory_cache.clear()
+    yield server
+    geocoding.memory_cache.clear()
+    server.shutdown()
+    server.server_close()
@@ -0,0 +1,79 @@
+# calendar_app/tests/test_batch_geocoding.py
+"""
+Пакетное геокодирование против локальной заглушки, которая отвечает 503
+на каждый третий запрос и 429 при превышении лимита запросов в секунду.
+"""
+import time
+from datetime import date, time as clock, timedelta
+
+import pytest
+
+from calendar_app.batch_geocoding import BatchStats, RateLimiter, geocode_many, geocode_pending
+from calendar_app.geocoder_stub import stub_coordinates
+from calendar_app.models import InstallationSchedule
+from customer_clients.models import Client
+from orders.models import Order
+from user_accounts.models import User
+
+QPS = 10
+STUB_MAX_QPS = 15
+ADDRESSES = [f'Москва, ул. Тестовая, д. {number}' for number in range(12)]
+
+pytestmark = [
+    pytest.mark.django_db,
+    pytest.mark.geocoder_stub(fail_every=3, max_qps=STUB_MAX_QPS),
+]
+
+
+def test_rate_limiter_spaces_requests():
+    limiter = RateLimiter(20)
+    began = time.monotonic()
+    for _ in range(5):
+        limiter.acquire()
+    assert time.monotonic() - began >= 4 / 20 * 0.9
+
+
+def test_retries_recover_failed_addresses_under_rate_cap(stub_geocoder):
+    stats = BatchStats()
+    began = time.monotonic()
+    result = geocode_many(ADDRESSES, workers=4, qps=QPS, max_retries=3, stats=stats)
+    elapsed = time.monotonic() - began
+
+    assert result == {address: stub_coordinates(address) for address in ADDRESSES}
+    assert stats.failed == 0
+    assert stats.retries > 0
+    # Все отказы заглушки - плановые 503, ни одного 429 за превышение лимита
+    assert stub_geocoder.rejected_count == stub_geocoder.requests_count // 3
+    assert stub_geocoder.requests_count / elapsed <= QPS * 1.1
+
+
+def test_pending_coordinates_land_on_clients_and_schedules(stub_geocoder):
+    manager = User.objects.create(username='manager', role='manager')
+    clients = [
+        Client.objects.create(name=f'Клиент {number}', address=address, phone='+70000000000', source='other')
+        for number, address in enumerate(ADDRESSES[:6])
+    ]
+    missing = Client.objects.create(name='Без адреса', address='Адреса нет', phone='+70000000000', source='other')
+    schedules = [
+        InstallationSchedule.objects.create(
+            order=Order.objects.create(client=client, manager=manager),
+            scheduled_date=date(2031, 6, 2), scheduled_time_start=clock(10), scheduled_time_end=clock(12),
+            estimated_duration=timedelta(hours=2),
+        )
+        for client in clients + [missing]
+    ]
+
+    stats = geocode_pending(workers=4, qps=QPS, max_retries=3)
+
+    assert stats.failed == 0
+    assert (stats.found, stats.not_found) == (6, 1)
+    assert (stats.clients_updated, stats.schedules_updated) == (6, 6)
+    for client, schedule in zip(clients, schedules):
+        client.refresh_from_db()
+        schedule.refresh_from_db()
+        expected = stub_coordinates(client.address)
+        assert (client.latitude, client.longitude) == expected
+        assert (schedule.latitude, schedule.longitude) == expected
+    missing.refresh_from_db()
+    assert missing.latitude is None
+    assert InstallationSchedule.objects.get(order__client=missing).latitude is None
@@ -0,0 +1,163 @@
+# calendar_app/tests/test_booking_concurrency.py
+"""
+Параллельное бронирование пересекающихся окон одних и тех же монтажников
+(booking_section): после гонки потоков отчет find_conflicts не содержит
+двойных броней, а попыток в секунду не меньше, чем у прежнего порядка
+"проверка, затем запись". Запускается на тестовой базе с собственными данными.
+"""
+import random
+import threading
+import time
+from collections import Counter
+from datetime import date, datetime, timedelta
+
+import pytest
+from django.db import IntegrityError, OperationalError, connection, transaction
+from django.utils import timezone
+
+from calendar_app.availability import from_minutes, get_work_hours
+from calendar_app.conflicts import find_conflicts
+from calendar_app.models import InstallationSchedule, InstallerAssignment
+from calendar_app.services import CalendarService
+from customer_clients.models import Client
+from orders.models import Order
+from user_accounts.models import User
+
+pytestmark = pytest.mark.django_db(transaction=True)
+
+THREADS = 6
+ATTEMPTS = 8
+DAY = date(2031, 5, 12)
+THROUGHPUT_TOLERANCE = 0.7
+
+
+@pytest.fixture
+def installers():
+    return [User.objects.create(username=f'installer-{number}', role='installer') for number in range(2)]
+
+
+@pytest.fixture
+def make_orders():
+    """У заказа одно расписание - каждой попытке свой заказ"""
+    manager = User.objects.create(username='manager', role='manager')
+
+    def make(count, prefix=''):
+        return [
+            Order.objects.create(
+                client=Client.objects.create(
+                    name=f'Клиент {prefix}{number}', address=f'Адрес {prefix}{number}', phone='+70000000000',
+                    source='other', latitude=55.75 + number * 0.001, longitude=37.61,
+                ),
+                manager=manager,
+            )
+            for number in range(count)
+        ]
+
+    return make
+
+
+@pytest.fixture
+def orders(make_orders):
+    return make_orders(THREADS * ATTEMPTS)
+
+
+def book_unsafe(order, scheduled_date, start_time, end_time, installers_ids, **kwargs):
+    """Прежний порядок до booking_section: проверка доступности, затем запись без общей транзакции"""
+    conflicts = CalendarService.check_installer_availability(installers_ids, scheduled_date, start_time, end_time)
+    if conflicts:
+        raise ValueError(f'Конфликт расписания для монтажников: {conflicts}')
+    schedule = InstallationSchedule.objects.create(
+        order=order,
+        scheduled_date=scheduled_date,
+        scheduled_time_start=start_time,
+        scheduled_time_end=end_time,
+        **kwargs
+    )
+    schedule.installers.set(installers_ids)
+    return schedule
+
+
+def race(book, orders, installer_ids, day):
+    """
+    Потоки бронируют случайные окна монтажников. Возвращает исходы и
+    пропускную способность - обработанных попыток (бронь или отказ) в секунду:
+    ошибки базы ("database is locked") запрос не обслуживают
+    """
+    work_start, work_end = get_work_hours()
+    outcomes, lock = Counter(), threading.Lock()
+
+    def worker(number):
+        rng = random.Random(number)
+        try:
+            for attempt in range(ATTEMPTS):
+                duration = rng.choice((60, 90, 120, 180))
+                start = work_start + 15 * rng.randrange(max(1, (work_end - work_start - duration) // 15 + 1))
+                try:
+                    book(
+                        order=orders[number * ATTEMPTS + attempt],
+                        scheduled_date=day,
+                        start_time=from_minutes(start),
+                        end_time=from_minutes(start + duration),
+                        installers_ids=[rng.choice(installer_ids)],
+                        estimated_duration=timedelta(minutes=duration),
+                    )
+                except ValueError:
+                    outcome = 'rejected'
+                except OperationalError:
+                    outcome = 'errors'
+                else:
+                    outcome = 'booked'
+                with lock:
+                    outcomes[outcome] += 1
+        finally:
+            connection.close()
+
+    began = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(number,)) for number in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return outcomes, (outcomes['booked'] + outcomes['rejected']) / (time.perf_counter() - began)
+
+
+def test_parallel_bookings_do_not_overlap(installers, orders):
+    installer_ids = [installer.id for installer in installers]
+    outcomes, _ = race(CalendarService.create_schedule, orders, installer_ids, DAY)
+
+    assert outcomes['errors'] == 0
+    assert outcomes['booked'] > 0
+    assert outcomes['rejected'] > 0
+    assert find_conflicts(DAY, DAY, installer_ids).overlaps == []
+
+
+def test_booking_section_throughput(installers, make_orders):
+    """Пропускная способность booking_section не хуже прежнего порядка "проверка, затем запись" """
+    installer_ids = [installer.id for installer in installers]
+    _, unsafe_rate = race(book_unsafe, make_orders(THREADS * ATTEMPTS, 'old-'), installer_ids, DAY)
+    _, safe_rate = race(CalendarService.create_schedule, make_orders(THREADS * ATTEMPTS, 'new-'), installer_ids,
+                        DAY + timedelta(days=1))
+    print(f'\nобработано попыток/с: без защиты {unsafe_rate:.1f}, booking_section {safe_rate:.1f}')
+
+    # Запас на шум замера времени
+    assert safe_rate >= unsafe_rate * THROUGHPUT_TOLERANCE
+
+
+@pytest.mark.skipif(connection.vendor != 'postgresql', reason='Ограничение исключения есть только в PostgreSQL')
+def test_exclusion_constraint_rejects_overlap_outside_section(installers, orders):
+    installer = installers[0]
+    first = CalendarService.create_schedule(
+        order=orders[0], scheduled_date=DAY, start_time=from_minutes(600), end_time=from_minutes(720),
+        installers_ids=[installer.id],
+    )
+    # Запись в обход booking_section: расписание без монтажников и назначение вручную
+    second = InstallationSchedule.objects.create(
+        order=orders[1], scheduled_date=DAY, scheduled_time_start=from_minutes(660),
+        scheduled_time_end=from_minutes(720),
+    )
+    starts_at = timezone.make_aware(datetime.combine(DAY, from_minutes(660)))
+    with pytest.raises(IntegrityError), transaction.atomic():
+        InstallerAssignment.objects.create(
+            schedule=second, installer=installer, starts_at=starts_at, ends_at=starts_at + timedelta(hours=1),
+        )
+    assert InstallerAssignment.objects.filter(schedule=first, installer=installer).exists()
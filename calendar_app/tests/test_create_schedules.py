@@ -0,0 +1,79 @@
+# calendar_app/tests/test_create_schedules.py
+"""
+Команда create_schedules: окна, занятые параллельным бронированием после
+планирования, не записываются.
+"""
+from datetime import date, timedelta
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+from calendar_app.conflicts import find_conflicts
+from calendar_app.management.commands.create_schedules import Command
+from calendar_app.models import InstallationSchedule
+from calendar_app.services import CalendarService
+from customer_clients.models import Client
+from orders.models import Order
+from user_accounts.models import User
+
+pytestmark = pytest.mark.django_db
+
+MONDAY = date(2031, 6, 2)
+
+
+@pytest.fixture
+def installer():
+    return User.objects.create(username='installer', first_name='', last_name='', role='installer')
+
+
+@pytest.fixture
+def make_order():
+    manager = User.objects.create(username='manager', role='manager')
+
+    def make(number, status='new'):
+        client = Client.objects.create(
+            name=f'Клиент {number}', address=f'Адрес {number}', phone='+70000000000', source='other',
+            latitude=55.75, longitude=37.61,
+        )
+        return Order.objects.create(client=client, manager=manager, status=status)
+
+    return make
+
+
+def test_window_taken_after_planning_is_skipped(installer, make_order, monkeypatch):
+    # Заказ диспетчера не попадает в план команды
+    order, rival = make_order(1), make_order(2, status='completed')
+    save_schedules = Command._save_schedules
+
+    def book_rival_first(planned, geocoded=None):
+        # Диспетчер бронирует то же окно между планированием и записью
+        _, installer_id, schedule = planned[0]
+        CalendarService.create_schedule(
+            rival, schedule.scheduled_date, schedule.scheduled_time_start, schedule.scheduled_time_end,
+            [installer_id], estimated_duration=timedelta(hours=1),
+        )
+        return save_schedules(planned, geocoded)
+
+    monkeypatch.setattr(Command, '_save_schedules', staticmethod(book_rival_first))
+    out = StringIO()
+    call_command('create_schedules', start_date=str(MONDAY), stdout=out)
+
+    assert 'Создано 0 расписаний' in out.getvalue()
+    assert f'Окно заказа #{order.id} заняли' in out.getvalue()
+    assert not InstallationSchedule.objects.filter(order=order).exists()
+    assert find_conflicts(MONDAY, MONDAY, [installer.id]).overlaps == []
+
+
+def test_dry_run_shows_full_name_like_before(installer, make_order):
+    User.objects.create(username='ivanov', first_name='Иван', last_name='Иванов', role='installer')
+    # Шестой монтаж дня уже не помещается первому монтажнику (MAX_INSTALLATIONS_PER_DAY)
+    orders = [make_order(number) for number in range(6)]
+    out = StringIO()
+    call_command('create_schedules', start_date=str(MONDAY), dry_run=True, stdout=out)
+
+    # Имя - как User.get_full_name(): без имени пусто, без подстановки логина
+    assert f'({installer.get_full_name()}, приоритет: low)' in out.getvalue()
+    assert '(Иван Иванов, приоритет: low)' in out.getvalue()
+    assert installer.username not in out.getvalue()
+    assert not InstallationSchedule.objects.filter(order__in=orders).exists()
@@ -0,0 +1,60 @@
+# calendar_app/tests/test_geocoding.py
+"""
+Кэш геокодирования (calendar_app.geocoding) против локальной заглушки:
+повторный адрес не уходит в HTTP, ключ - нормализованный адрес,
+"не найден" тоже кэшируется, истекшая запись запрашивается заново.
+"""
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+
+from calendar_app import geocoding
+from calendar_app.geocoder_stub import stub_coordinates
+from calendar_app.models import GeocodeCache
+
+pytestmark = pytest.mark.django_db
+
+ADDRESS = 'Москва, улица Ленина, дом 5'
+
+
+def test_cache_hit_skips_http(stub_geocoder):
+    assert geocoding.geocode(ADDRESS) == stub_coordinates(ADDRESS)
+    assert geocoding.geocode(ADDRESS) == stub_coordinates(ADDRESS)
+    # Без LRU процесса - из таблицы GeocodeCache
+    geocoding.memory_cache.clear()
+    assert geocoding.geocode(ADDRESS) == stub_coordinates(ADDRESS)
+    assert stub_geocoder.requests_count == 1
+
+
+def test_differently_written_addresses_share_key(stub_geocoder):
+    variant = '  москва ул. Ленина,  д.5 '
+    assert geocoding.normalize_address(variant) == geocoding.normalize_address(ADDRESS)
+
+    coordinates = geocoding.geocode(ADDRESS)
+    assert geocoding.geocode(variant) == coordinates
+    assert GeocodeCache.objects.count() == 1
+    assert stub_geocoder.requests_count == 1
+
+
+def test_not_found_is_cached(stub_geocoder):
+    address = 'Такого адреса нет'
+    assert geocoding.geocode(address) is None
+    assert geocoding.geocode(address) is None
+    assert stub_geocoder.requests_count == 1
+
+    entry = GeocodeCache.objects.get(address_key=geocoding.normalize_address(address))
+    assert not entry.found
+    assert entry.expires_at < timezone.now() + timedelta(days=geocoding.get_geocoder_settings()['CACHE_TTL_DAYS'])
+
+
+def test_expired_entry_is_fetched_again(stub_geocoder):
+    geocoding.geocode(ADDRESS)
+    expired = timezone.now() - timedelta(seconds=1)
+    key = geocoding.normalize_address(ADDRESS)
+    GeocodeCache.objects.filter(address_key=key).update(expires_at=expired)
+    geocoding.memory_cache.set(key, stub_coordinates(ADDRESS), expired)
+
+    assert geocoding.geocode(ADDRESS) == stub_coordinates(ADDRESS)
+    assert stub_geocoder.requests_count == 2
+    assert GeocodeCache.objects.get(address_key=key).expires_at > timezone.now()
@@ -0,0 +1,56 @@
+# calendar_app/tests/test_ics.py
+"""
+Лента ICS монтажника: ответ выводится из версии ленты в базе, поэтому
+воркеры, построившие ленту в разное время, отдают одинаковый ETag.
+"""
+from datetime import time, timedelta
+
+import pytest
+from django.core.cache import cache
+from django.utils import timezone
+
+from calendar_app import ics
+from calendar_app.models import InstallationSchedule
+from customer_clients.models import Client
+from orders.models import Order
+from user_accounts.models import User
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def installer():
+    installer = User.objects.create(username='installer', first_name='Петр', role='installer')
+    client = Client.objects.create(
+        name='Клиент', address='Адрес', phone='+70000000000', source='other', latitude=55.75, longitude=37.61,
+    )
+    schedule = InstallationSchedule.objects.create(
+        order=Order.objects.create(client=client, manager=User.objects.create(username='manager', role='manager')),
+        scheduled_date=timezone.localdate(), scheduled_time_start=time(10), scheduled_time_end=time(12),
+        estimated_duration=timedelta(hours=2),
+    )
+    schedule.installers.set([installer])
+    return installer
+
+
+def test_feeds_built_at_different_times_match(installer, monkeypatch):
+    cache.clear()
+    first = ics.get_feed(installer)
+
+    # Другой воркер со своим кэшем строит ту же ленту минутой позже
+    cache.clear()
+    later = timezone.now() + timedelta(minutes=1)
+    monkeypatch.setattr(timezone, 'now', lambda: later)
+    second = ics.get_feed(installer)
+
+    assert second['etag'] == first['etag']
+    assert second['body'] == first['body']
+    assert second['last_modified'] == first['last_modified']
+
+
+def test_edit_changes_etag(installer):
+    cache.clear()
+    first = ics.get_feed(installer)
+    InstallationSchedule.objects.get(installers=installer).save()
+
+    assert ics.get_feed(installer)['etag'] != first['etag']
@@ -0,0 +1,69 @@
+# calendar_app/tests/test_insertion.py
+"""
+Вставка монтажа в построенный маршрут: добавочный пробег и время считаются
+в метрике провайдера расстояний, которым строился маршрут.
+"""
+from datetime import date, time, timedelta
+from math import ceil
+
+import numpy as np
+import pytest
+
+from calendar_app.insertion import cheapest_insertions, pair_distances
+from calendar_app.models import InstallationSchedule
+from calendar_app.services import RouteOptimizationService
+from customer_clients.models import Client
+from orders.models import Order
+from user_accounts.models import User
+
+pytestmark = pytest.mark.django_db
+
+DAY = date(2031, 3, 3)
+DETOUR = 1.3
+MORNING_SPEED = 22
+STOPS = [(55.70, 37.50), (55.72, 37.56), (55.74, 37.62)]
+NEW_POINT = (55.735, 37.57)
+
+
+@pytest.fixture(autouse=True)
+def table_provider(settings):
+    settings.CALENDAR_SETTINGS = dict(
+        settings.CALENDAR_SETTINGS, TRAVEL_PROVIDER='table', TRAVEL_DETOUR_FACTOR=DETOUR,
+        TRAVEL_SPEED_TABLE={'morning': MORNING_SPEED}, WAREHOUSE_COORDINATES=None, ROUTE_TIME_BUDGET=0.01,
+    )
+
+
+@pytest.fixture
+def route():
+    manager = User.objects.create(username='manager', role='manager')
+    installer = User.objects.create(username='installer', role='installer')
+    for number, (latitude, longitude) in enumerate(STOPS):
+        client = Client.objects.create(
+            name=f'Клиент {number}', address=f'Адрес {number}', phone='+70000000000', source='other',
+            latitude=latitude, longitude=longitude,
+        )
+        schedule = InstallationSchedule.objects.create(
+            order=Order.objects.create(client=client, manager=manager),
+            scheduled_date=DAY, scheduled_time_start=time(8), scheduled_time_end=time(18),
+            estimated_duration=timedelta(minutes=30), latitude=latitude, longitude=longitude,
+        )
+        schedule.installers.set([installer])
+    return RouteOptimizationService.optimize_daily_route(installer.id, DAY)
+
+
+def test_added_distance_uses_one_metric(route):
+    result = cheapest_insertions(NEW_POINT, 30, DAY, DAY)
+    option = result['options'][0]
+    assert option['after_schedule_id'] and option['before_schedule_id']
+
+    previous = InstallationSchedule.objects.get(id=option['after_schedule_id'])
+    following = InstallationSchedule.objects.get(id=option['before_schedule_id'])
+    first = np.asarray([(previous.latitude, previous.longitude), NEW_POINT, (previous.latitude, previous.longitude)])
+    second = np.asarray([NEW_POINT, (following.latitude, following.longitude), (following.latitude, following.longitude)])
+    distance_in, distance_out, replaced = pair_distances(first, second)
+    # Табличный провайдер умножает все участки на извилистость, поэтому
+    # и добавочный пробег - прямой добавочный пробег с тем же множителем
+    added = DETOUR * (distance_in + distance_out - replaced)
+
+    assert option['added_distance_km'] == pytest.approx(added, abs=0.01)
+    assert option['added_travel_minutes'] == ceil(added / MORNING_SPEED * 60)
@@ -0,0 +1,101 @@
+# calendar_app/tests/test_route_persistence.py
+"""
+Сохранение оптимизированных маршрутов пакетными запросами: число запросов
+optimize_daily_route не зависит от количества монтажей, а optimize_day -
+от количества бригад, ни при первом расчете, ни при повторном (маршруты
+и точки уже есть).
+"""
+from datetime import date, time, timedelta
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from calendar_app.models import InstallationSchedule, RouteOptimization, RoutePoint
+from calendar_app.services import RouteOptimizationService
+from customer_clients.models import Client
+from orders.models import Order
+from user_accounts.models import User
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(autouse=True)
+def fast_routes(settings):
+    settings.CALENDAR_SETTINGS = dict(settings.CALENDAR_SETTINGS, ROUTE_TIME_BUDGET=0.01, WAREHOUSE_COORDINATES=None)
+
+
+def make_day(stops: int, day: date, offset: float) -> User:
+    """Монтажник и stops его монтажей на день с разными координатами"""
+    manager, _ = User.objects.get_or_create(username=f'manager-{day}', role='manager')
+    installer = User.objects.create(username=f'installer-{day}-{offset}', role='installer')
+    for number in range(stops):
+        latitude, longitude = 55.70 + offset + number * 0.01, 37.50 + offset + number * 0.013
+        client = Client.objects.create(
+            name=f'Клиент {number}', address=f'Адрес {day} {offset} {number}', phone='+70000000000', source='other',
+            latitude=latitude, longitude=longitude,
+        )
+        schedule = InstallationSchedule.objects.create(
+            order=Order.objects.create(client=client, manager=manager),
+            scheduled_date=day,
+            scheduled_time_start=time(8 + number),
+            scheduled_time_end=time(9 + number),
+            estimated_duration=timedelta(minutes=45),
+            latitude=latitude,
+            longitude=longitude,
+        )
+        schedule.installers.set([installer])
+    return installer
+
+
+def count_queries(installer: User, day: date) -> int:
+    with CaptureQueriesContext(connection) as context:
+        route = RouteOptimizationService.optimize_daily_route(installer.id, day)
+    assert route is not None
+    return len(context)
+
+
+def test_query_count_does_not_grow_with_stops(django_assert_num_queries):
+    small_day, large_day = date(2031, 3, 3), date(2031, 3, 4)
+    small = make_day(3, small_day, offset=0.0)
+    large = make_day(9, large_day, offset=0.2)
+
+    first_run = count_queries(small, small_day)
+    with django_assert_num_queries(first_run):
+        RouteOptimizationService.optimize_daily_route(large.id, large_day)
+
+    rerun = count_queries(small, small_day)
+    with django_assert_num_queries(rerun):
+        RouteOptimizationService.optimize_daily_route(large.id, large_day)
+
+    assert RouteOptimization.objects.filter(installer=large, date=large_day).count() == 1
+    assert RoutePoint.objects.filter(route__installer=large, route__date=large_day).count() == 9
+
+
+def make_crews(crews: int, day: date) -> None:
+    for number in range(crews):
+        make_day(2, day, offset=number * 0.05)
+
+
+def count_day_queries(day: date) -> int:
+    with CaptureQueriesContext(connection) as context:
+        result = RouteOptimizationService.optimize_day(day, allow_reassign=False, time_budget=0.05)
+    assert result['mode'] == 'day'
+    return len(context)
+
+
+def test_day_query_count_does_not_grow_with_crews(django_assert_num_queries):
+    small_day, large_day = date(2031, 3, 10), date(2031, 3, 11)
+    make_crews(2, small_day)
+    make_crews(5, large_day)
+
+    first_run = count_day_queries(small_day)
+    with django_assert_num_queries(first_run):
+        RouteOptimizationService.optimize_day(large_day, allow_reassign=False, time_budget=0.05)
+
+    rerun = count_day_queries(small_day)
+    with django_assert_num_queries(rerun):
+        RouteOptimizationService.optimize_day(large_day, allow_reassign=False, time_budget=0.05)
+
+    assert RouteOptimization.objects.filter(date=large_day).count() == 5
+    assert RoutePoint.objects.filter(route__date=large_day).count() == 10
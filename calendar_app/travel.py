@@ -0,0 +1,265 @@
+# calendar_app/travel.py
+"""
+Расстояния и время в пути между точками с постоянным кэшем.
+
+Точки округляются до ячеек (CALENDAR_SETTINGS['TRAVEL_CELL_PRECISION'] знаков
+координат, 4 знака - около 10 м), пары ячеек хранятся в TravelTimeCache
+вместе с провайдером и интервалом суток. При построении матрицы из кэша
+читаются все известные пары, а у провайдера запрашиваются только
+недостающие - повторная оптимизация пересекающихся дней почти не
+обращается к провайдеру.
+
+Провайдеры (CALENDAR_SETTINGS['TRAVEL_PROVIDER']):
+- haversine - прямое расстояние, 30 км/ч и 20% на пробки;
+- table - прямое расстояние с коэффициентом извилистости и скоростью по
+  интервалам суток из TRAVEL_SPEED_TABLE;
+- osrm - сервис /table/v1/driving в формате OSRM (TRAVEL_OSRM_URL),
+  например локальный OSRM или заглушка calendar_app.osrm_stub.
+"""
+import logging
+from datetime import timedelta
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import requests
+from django.conf import settings
+from django.utils import timezone
+
+from .routing import distance_matrix
+
+logger = logging.getLogger(__name__)
+
+Point = Tuple[float, float]
+
+AVERAGE_SPEED_KMH = 30
+TRAFFIC_FACTOR = 1.2
+ANY_TIME = 'any'
+# Интервалы суток: (название, час начала, час окончания)
+TIME_BUCKETS = (
+    ('night', 0, 7),
+    ('morning', 7, 10),
+    ('day', 10, 17),
+    ('evening', 17, 21),
+    ('night', 21, 24),
+)
+DEFAULT_SPEED_TABLE = {'night': 45, 'morning': 22, 'day': 30, 'evening': 20}
+ORIGIN_CHUNK_SIZE = 500
+
+
+class TravelProviderError(Exception):
+    """Провайдер не смог посчитать матрицу - пары не кэшируются"""
+
+
+def _calendar_settings() -> dict:
+    return getattr(settings, 'CALENDAR_SETTINGS', {})
+
+
+def time_bucket(minutes: Optional[int]) -> str:
+    """Интервал суток для времени в минутах от полуночи"""
+    if minutes is None:
+        return 'day'
+    hour = (int(minutes) // 60) % 24
+    for name, start, end in TIME_BUCKETS:
+        if start <= hour < end:
+            return name
+    return 'day'
+
+
+def cell_key(point: Point, precision: Optional[int] = None) -> str:
+    """Ключ ячейки: координаты, округленные до precision знаков"""
+    precision = _calendar_settings().get('TRAVEL_CELL_PRECISION', 4) if precision is None else precision
+    return f'{point[0]:.{precision}f},{point[1]:.{precision}f}'
+
+
+class HaversineProvider:
+    """Прямое расстояние и средняя скорость 30 км/ч с надбавкой 20%"""
+    name = 'haversine'
+    time_dependent = False
+
+    def distances(self, origins: Sequence[Point], destinations: Sequence[Point]) -> np.ndarray:
+        return distance_matrix(origins, destinations)
+
+    def matrix(self, origins: Sequence[Point], destinations: Sequence[Point],
+               bucket: str = ANY_TIME) -> Tuple[np.ndarray, np.ndarray]:
+        """(расстояния в км, время в минутах) размера origins × destinations"""
+        distances = self.distances(origins, destinations)
+        return distances, distances / AVERAGE_SPEED_KMH * TRAFFIC_FACTOR * 60
+
+
+class TableProvider(HaversineProvider):
+    """Табличная модель: извилистость дорог и скорость по интервалам суток"""
+    name = 'table'
+    time_dependent = True
+
+    def __init__(self, speeds: Optional[Dict[str, float]] = None, detour: float = 1.3):
+        self.speeds = dict(DEFAULT_SPEED_TABLE, **(speeds or {}))
+        self.detour = detour
+
+    def matrix(self, origins, destinations, bucket=ANY_TIME):
+        distances = self.distances(origins, destinations) * self.detour
+        speed = self.speeds.get(bucket, self.speeds['day'])
+        return distances, distances / speed * 60
+
+
+class OSRMProvider:
+    """Сервис таблиц OSRM: GET {url}/table/v1/driving/{lon,lat;...}"""
+    name = 'osrm'
+    time_dependent = False
+
+    def __init__(self, url: str, timeout: float = 10, session=None):
+        self.url = url.rstrip('/')
+        self.timeout = timeout
+        self.session = session or requests
+
+    def matrix(self, origins, destinations, bucket=ANY_TIME):
+        points = list(origins) + list(destinations)
+        coordinates = ';'.join(f'{longitude},{latitude}' for latitude, longitude in points)
+        params = {
+            'sources': ';'.join(str(index) for index in range(len(origins))),
+            'destinations': ';'.join(str(index) for index in range(len(origins), len(points))),
+            'annotations': 'duration,distance',
+        }
+        try:
+            response = self.session.get(
+                f'{self.url}/table/v1/driving/{coordinates}', params=params, timeout=self.timeout
+            )
+            response.raise_for_status()
+            data = response.json()
+            if data.get('code') != 'Ok':
+                raise TravelProviderError(data.get('message') or data.get('code'))
+            distances = np.asarray(data['distances'], dtype=np.float64) / 1000
+            durations = np.asarray(data['durations'], dtype=np.float64) / 60
+        except (requests.RequestException, ValueError, KeyError, TypeError) as e:
+            raise TravelProviderError(str(e)) from e
+        return distances, durations
+
+
+def get_provider():
+    """Провайдер из CALENDAR_SETTINGS['TRAVEL_PROVIDER']"""
+    calendar_settings = _calendar_settings()
+    name = calendar_settings.get('TRAVEL_PROVIDER', 'haversine')
+    if name == 'osrm':
+        return OSRMProvider(calendar_settings.get('TRAVEL_OSRM_URL', 'http://127.0.0.1:5000'))
+    if name == 'table':
+        return TableProvider(calendar_settings.get('TRAVEL_SPEED_TABLE'), calendar_settings.get('TRAVEL_DETOUR_FACTOR', 1.3))
+    return HaversineProvider()
+
+
+class TravelStats:
+    """Счетчики обращений к кэшу за один расчет"""
+
+    def __init__(self):
+        self.pairs = 0
+        self.cached = 0
+        self.requested = 0
+
+    def __repr__(self):
+        return f'TravelStats(pairs={self.pairs}, cached={self.cached}, requested={self.requested})'
+
+
+def travel_matrices(groups: Sequence[Sequence[Point]], start_minutes: Optional[int] = None,
+                    provider=None, stats: Optional[TravelStats] = None) -> List[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Матрицы (км, минуты) для нескольких наборов точек разом: известные пары
+    читаются из TravelTimeCache, недостающие запрашиваются у провайдера
+    (по одному запросу на набор) и сохраняются одним bulk_create
+    """
+    from .models import TravelTimeCache
+
+    provider = provider or get_provider()
+    stats = stats if stats is not None else TravelStats()
+    bucket = time_bucket(start_minutes) if provider.time_dependent else ANY_TIME
+    ttl_days = _calendar_settings().get('TRAVEL_CACHE_TTL_DAYS', 30)
+
+    group_keys = [[cell_key(point) for point in group] for group in groups]
+    cells = sorted({key for keys in group_keys for key in keys})
+
+    known = {}
+    for chunk_start in range(0, len(cells), ORIGIN_CHUNK_SIZE):
+        rows = TravelTimeCache.objects.filter(
+            provider=provider.name,
+            time_bucket=bucket,
+            origin__in=cells[chunk_start:chunk_start + ORIGIN_CHUNK_SIZE],
+            expires_at__gt=timezone.now(),
+        ).values_list('origin', 'destination', 'distance_km', 'duration_minutes')
+        cell_set = set(cells)
+        for origin, destination, distance, duration in rows:
+            if destination in cell_set:
+                known[(origin, destination)] = (distance, duration)
+
+    results = []
+    created = {}
+    for group, keys in zip(groups, group_keys):
+        size = len(keys)
+        distances = np.zeros((size, size))
+        durations = np.zeros((size, size))
+        missing_origins, missing_destinations = {}, {}
+        for i, origin in enumerate(keys):
+            for j, destination in enumerate(keys):
+                if origin == destination:
+                    continue
+                stats.pairs += 1
+                pair = known.get((origin, destination)) or created.get((origin, destination))
+                if pair is None:
+                    missing_origins.setdefault(origin, group[i])
+                    missing_destinations.setdefault(destination, group[j])
+                else:
+                    stats.cached += 1
+                    distances[i, j], durations[i, j] = pair
+
+        if missing_origins:
+            origin_keys, destination_keys = list(missing_origins), list(missing_destinations)
+            try:
+                new_distances, new_durations = provider.matrix(
+                    [missing_origins[key] for key in origin_keys],
+                    [missing_destinations[key] for key in destination_keys],
+                    bucket,
+                )
+            except TravelProviderError as e:
+                # Без провайдера маршрут все равно строится по прямым расстояниям, но в кэш не попадает
+                logger.warning('Ошибка провайдера расстояний %s: %s', provider.name, e)
+                new_distances, new_durations = HaversineProvider().matrix(
+                    [missing_origins[key] for key in origin_keys],
+                    [missing_destinations[key] for key in destination_keys],
+                )
+            else:
+                stats.requested += 1
+                for a, origin in enumerate(origin_keys):
+                    for b, destination in enumerate(destination_keys):
+                        if origin != destination and (origin, destination) not in known:
+                            created[(origin, destination)] = (
+                                float(new_distances[a, b]), float(new_durations[a, b])
+                            )
+            origin_index = {key: a for a, key in enumerate(origin_keys)}
+            destination_index = {key: b for b, key in enumerate(destination_keys)}
+            for i, origin in enumerate(keys):
+                for j, destination in enumerate(keys):
+                    if origin != destination and origin in origin_index and destination in destination_index \
+                            and (origin, destination) not in known:
+                        distances[i, j] = new_distances[origin_index[origin], destination_index[destination]]
+                        durations[i, j] = new_durations[origin_index[origin], destination_index[destination]]
+
+        results.append((distances, durations))
+
+    if created:
+        expires_at = timezone.now() + timedelta(days=ttl_days)
+        TravelTimeCache.objects.bulk_create(
+            [
+                TravelTimeCache(
+                    origin=origin, destination=destination, provider=provider.name, time_bucket=bucket,
+                    distance_km=distance, duration_minutes=duration, expires_at=expires_at,
+                )
+                for (origin, destination), (distance, duration) in created.items()
+            ],
+            batch_size=1000,
+            update_conflicts=True,
+            unique_fields=['origin', 'destination', 'provider', 'time_bucket'],
+            update_fields=['distance_km', 'duration_minutes', 'expires_at'],
+        )
+    return results
+
+
+def travel_matrix(points: Sequence[Point], start_minutes: Optional[int] = None,
+                  provider=None, stats: Optional[TravelStats] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """Матрица (км, минуты) для одного набора точек"""
+    return travel_matrices([points], start_minutes, provider, stats)[0]
@@ -14,10 +14,21 @@ urlpatterns = [
     # Маршрутизация
     path('routes/', views.RouteOptimizationView.as_view(), name='route-optimization'),
     path('routes/optimize/', views.RouteOptimizationView.as_view(), name='optimize-route'),
+    path('routes/insertion/', views.RouteInsertionView.as_view(), name='route-insertion'),
     
     # Расписание монтажника
     path('installer/<int:installer_id>/schedule/', views.InstallerScheduleView.as_view(), name='installer-schedule'),
+    path('installer/<int:installer_id>/feed-token/', views.InstallerFeedTokenView.as_view(), name='installer-feed-token'),
+    path('feed/<str:token>.ics', views.InstallerCalendarFeedView.as_view(), name='calendar-feed'),
     
     # Проверка доступности
     path('availability/check/', views.AvailabilityCheckView.as_view(), name='availability-check'),
+    path('availability/slots/', views.SlotSearchView.as_view(), name='availability-slots'),
+    
+    # Временные брони окон
+    path('holds/', views.SlotHoldView.as_view(), name='slot-holds'),
+    path('holds/<str:token>/', views.SlotHoldView.as_view(), name='slot-hold-detail'),
+    
+    # Проверка расписания
+    path('conflicts/', views.ScheduleConflictsView.as_view(), name='schedule-conflicts'),
 ]
\ No newline at end of file
@@ -6,11 +6,24 @@ from django.shortcuts import get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.utils.decorators import method_decorator
 from django.utils import timezone
+from django.conf import settings
 from datetime import datetime, timedelta, time
-from django.db.models import Q
+from django.db.models import Count, Max, Prefetch, Q
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from django.http import HttpResponse
+from django.urls import reverse
+from rest_framework.permissions import AllowAny
+import hashlib
 
-from .models import InstallationSchedule, RouteOptimization
-from .services import CalendarService, RouteOptimizationService
+from . import holds, ics
+from .models import CalendarFeedToken, InstallationSchedule, RouteOptimization, SlotHold
+from .services import CalendarService, GeocodeService, RouteOptimizationService
+from .slots import find_free_slots, DEFAULT_LIMIT, DEFAULT_STEP_MINUTES
+from .insertion import DEFAULT_LIMIT as INSERTION_LIMIT, cheapest_insertions
+from .retiming import retime_downstream
+from .availability import get_work_hours, to_minutes
+from .conflicts import DEFAULT_MIN_GAP_MINUTES, find_conflicts
 from .serializers import InstallationScheduleSerializer, RouteOptimizationSerializer
 from orders.models import Order
 from user_accounts.models import User
@@ -43,7 +56,7 @@ class CalendarView(APIView):
         # Фильтруем расписания
         schedules_query = InstallationSchedule.objects.filter(
             scheduled_date__range=(start_date, end_date)
-        ).select_related('order', 'order__client', 'order__manager')
+        )
         
         if installer_id:
             schedules_query = schedules_query.filter(installers__id=installer_id)
@@ -54,7 +67,21 @@ class CalendarView(APIView):
         elif request.user.role == 'manager':
             schedules_query = schedules_query.filter(order__manager=request.user)
         
-        schedules = schedules_query.distinct().order_by('scheduled_date', 'scheduled_time_start')
+        # Условный GET: неизмененный календарь отдается как 304 без сериализации
+        local_now = timezone.localtime().replace(tzinfo=None)
+        etag, last_modified = self._validators(request, schedules_query, local_now)
+        not_modified = get_conditional_response(
+            request, etag=etag, last_modified=last_modified and int(last_modified.timestamp())
+        )
+        if not_modified is not None:
+            return self._with_validators(not_modified, etag, last_modified)
+        
+        schedules = list(
+            InstallationSchedule.objects.filter(id__in=schedules_query.values('id'))
+            .select_related('order', 'order__client', 'order__manager')
+            .prefetch_related(Prefetch('installers', queryset=User.objects.only('id', 'first_name', 'last_name')))
+            .order_by('scheduled_date', 'scheduled_time_start')
+        )
         
         # Группируем по дням
         calendar_data = {}
@@ -84,14 +111,56 @@ class CalendarView(APIView):
                     for installer in schedule.installers.all()
                 ],
                 'notes': schedule.notes,
-                'is_overdue': schedule.is_overdue,
+                'is_overdue': schedule.is_overdue_at(local_now),
                 'estimated_duration': str(schedule.estimated_duration) if schedule.estimated_duration else None,
             })
         
-        return Response({
+        response = Response({
             'calendar': calendar_data,
-            'total_schedules': schedules.count()
+            'total_schedules': len(schedules)
         })
+        return self._with_validators(response, etag, last_modified)
+    
+    @staticmethod
+    def _validators(request, schedules_query, local_now):
+        """
+        ETag и Last-Modified календаря одним агрегирующим запросом.
+        Учитываются последнее изменение, число расписаний (удаления) и число
+        просроченных: признак просрочки меняется со временем без правок записей.
+        Правки клиента, заказа, менеджера и монтажников обновляют updated_at
+        расписаний (calendar_app.signals), поэтому тоже меняют ETag.
+        """
+        ids = schedules_query.values('id')
+        overdue_q = InstallationSchedule.overdue_q(local_now)
+        summary = InstallationSchedule.objects.filter(id__in=ids).aggregate(
+            last_updated=Max('updated_at'),
+            total=Count('id'),
+            overdue=Count('id', filter=overdue_q),
+            last_overdue_date=Max('scheduled_date', filter=overdue_q),
+        )
+        
+        last_modified = summary['last_updated']
+        if summary['last_overdue_date']:
+            # Момент, когда просроченным стало последнее из просроченных расписаний
+            last_end = InstallationSchedule.objects.filter(
+                overdue_q, id__in=ids, scheduled_date=summary['last_overdue_date']
+            ).aggregate(value=Max('scheduled_time_end'))['value']
+            became_overdue = timezone.make_aware(datetime.combine(summary['last_overdue_date'], last_end))
+            last_modified = max(last_modified, became_overdue)
+        
+        source = '|'.join(str(value) for value in (
+            request.user.id, request.get_full_path(), summary['last_updated'], summary['total'], summary['overdue'],
+        ))
+        return f'"{hashlib.md5(source.encode()).hexdigest()}"', last_modified
+    
+    @staticmethod
+    def _with_validators(response, etag, last_modified):
+        response['ETag'] = etag
+        if last_modified:
+            response['Last-Modified'] = http_date(last_modified.timestamp())
+        # Ответ зависит от пользователя: только личный кэш и проверка при каждом запросе
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
     
     def post(self, request):
         """Создание нового расписания монтажа"""
@@ -134,6 +203,7 @@ class CalendarView(APIView):
                 start_time=start_time,
                 end_time=end_time,
                 installers_ids=installer_ids,
+                hold_token=data.get('hold_token') or None,
                 priority=priority,
                 notes=notes,
                 estimated_duration=estimated_duration
@@ -214,6 +284,9 @@ class StartWorkView(APIView):
         schedule.actual_start_time = timezone.now()
         schedule.save()
         
+        # Сдвигаем следующие точки маршрута по фактическому началу
+        retimed = retime_downstream(schedule)
+        
         # Обновляем статус заказа
         if schedule.order.status == 'new':
             schedule.order.status = 'in_progress'
@@ -222,7 +295,9 @@ class StartWorkView(APIView):
         return Response({
             'message': 'Работа начата',
             'actual_start_time': schedule.actual_start_time,
-            'status': schedule.status
+            'status': schedule.status,
+            'route_points_updated': retimed.updated,
+            'late_schedule_ids': retimed.late_schedule_ids,
         })
 
 @method_decorator(login_required, name='dispatch')
@@ -244,6 +319,9 @@ class CompleteWorkView(APIView):
         schedule.actual_end_time = timezone.now()
         schedule.save()
         
+        # Сдвигаем следующие точки маршрута по фактическому окончанию
+        retimed = retime_downstream(schedule)
+        
         # Обновляем статус заказа на завершенный
         schedule.order.status = 'completed'
         schedule.order.completed_at = timezone.now()
@@ -253,7 +331,9 @@ class CompleteWorkView(APIView):
             'message': 'Работа завершена',
             'actual_end_time': schedule.actual_end_time,
             'duration': str(schedule.duration),
-            'status': schedule.status
+            'status': schedule.status,
+            'route_points_updated': retimed.updated,
+            'late_schedule_ids': retimed.late_schedule_ids,
         })
 
 @method_decorator(login_required, name='dispatch')
@@ -294,6 +374,9 @@ class RouteOptimizationView(APIView):
     
     def post(self, request):
         """Создание/обновление оптимизированного маршрута"""
+        if request.data.get('mode') == 'day':
+            return self._optimize_day(request)
+        
         installer_id = request.data.get('installer_id')
         date_str = request.data.get('date')
         
@@ -337,6 +420,143 @@ class RouteOptimizationView(APIView):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+    def _optimize_day(self, request):
+        """Маршруты всех монтажников на день с учетом окон монтажей"""
+        if request.user.role not in ['owner', 'manager']:
+            return Response({'error': 'Недостаточно прав'}, status=status.HTTP_403_FORBIDDEN)
+        
+        try:
+            date = datetime.strptime(request.data.get('date') or '', '%Y-%m-%d').date()
+        except ValueError:
+            return Response(
+                {'error': 'Неверный формат параметров'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        allow_reassign = request.data.get('allow_reassign', True)
+        if isinstance(allow_reassign, str):
+            allow_reassign = allow_reassign.lower() not in ('0', 'false', 'no')
+        
+        try:
+            result = RouteOptimizationService.optimize_day(date, allow_reassign=bool(allow_reassign))
+        except Exception as e:
+            return Response(
+                {'error': f'Ошибка оптимизации маршрутов: {str(e)}'}, 
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+        
+        if not result:
+            return Response({'message': 'Нет расписаний для оптимизации'}, status=status.HTTP_404_NOT_FOUND)
+        
+        return Response({
+            'message': 'Маршруты успешно оптимизированы',
+            'result': result
+        }, status=status.HTTP_201_CREATED)
+
+@method_decorator(login_required, name='dispatch')
+class RouteInsertionView(APIView):
+    """Варианты вставки нового монтажа в построенные маршруты"""
+    MAX_HORIZON_DAYS = 31
+    MAX_LIMIT = 50
+    
+    def get(self, request):
+        """Бригады и дни с наименьшим добавочным пробегом для заказа"""
+        if request.user.role not in ['owner', 'manager']:
+            return Response({'error': 'Недостаточно прав'}, status=status.HTTP_403_FORBIDDEN)
+        
+        calendar_settings = getattr(settings, 'CALENDAR_SETTINGS', {})
+        try:
+            duration_param = request.GET.get('duration')
+            if duration_param and ':' in duration_param:
+                hours, minutes = map(int, duration_param.split(':'))
+                duration = hours * 60 + minutes
+            elif duration_param:
+                duration = int(duration_param)
+            else:
+                duration = int(calendar_settings.get('DEFAULT_INSTALLATION_DURATION', 2) * 60)
+            
+            limit = min(int(request.GET.get('limit', INSERTION_LIMIT)), self.MAX_LIMIT)
+            
+            date_from = request.GET.get('date_from')
+            date_from = (datetime.strptime(date_from, '%Y-%m-%d').date() if date_from
+                         else timezone.localdate() + timedelta(days=1))
+            date_to = request.GET.get('date_to')
+            date_to = (datetime.strptime(date_to, '%Y-%m-%d').date() if date_to
+                       else date_from + timedelta(days=13))
+            
+            window = None
+            if request.GET.get('window_start') or request.GET.get('window_end'):
+                work_start, work_end = get_work_hours()
+                window = (
+                    to_minutes(datetime.strptime(request.GET['window_start'], '%H:%M').time())
+                    if request.GET.get('window_start') else work_start,
+                    to_minutes(datetime.strptime(request.GET['window_end'], '%H:%M').time())
+                    if request.GET.get('window_end') else work_end,
+                )
+            
+            installer_ids = None
+            if request.GET.get('installer_ids'):
+                installer_ids = [int(value) for value in request.GET['installer_ids'].split(',') if value]
+            
+            location = None
+            if request.GET.get('latitude') and request.GET.get('longitude'):
+                location = (float(request.GET['latitude']), float(request.GET['longitude']))
+            order_id = int(request.GET['order_id']) if request.GET.get('order_id') else None
+        except (KeyError, ValueError):
+            return Response(
+                {'error': 'Неверный формат параметров'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        if duration <= 0 or limit < 1 or (window and window[0] >= window[1]):
+            return Response(
+                {'error': 'Неверные значения параметров'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        if date_to < date_from or (date_to - date_from).days >= self.MAX_HORIZON_DAYS:
+            return Response(
+                {'error': f'Период поиска должен быть от 1 до {self.MAX_HORIZON_DAYS} дней'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        if order_id is not None:
+            order = get_object_or_404(Order.objects.select_related('client'), id=order_id)
+            if request.user.role == 'manager' and order.manager_id != request.user.id:
+                return Response({'error': 'Нет доступа к заказу'}, status=status.HTTP_403_FORBIDDEN)
+            # Координаты адреса клиента без ожидания геокодера
+            location = location or GeocodeService.known_coordinates(order.client)
+        
+        if location is None:
+            return Response(
+                {'error': 'Нужны order_id с геокодированным адресом клиента или latitude и longitude'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        result = cheapest_insertions(
+            location, duration, date_from, date_to,
+            window=window, limit=limit, installer_ids=installer_ids,
+        )
+        
+        return Response({
+            'duration_minutes': duration,
+            'date_from': date_from,
+            'date_to': date_to,
+            'latitude': location[0],
+            'longitude': location[1],
+            'routes_checked': result['routes'],
+            'positions_checked': result['positions'],
+            'elapsed': result['elapsed'],
+            'options': [
+                dict(
+                    option,
+                    arrival_time=option['arrival_time'].strftime('%H:%M'),
+                    departure_time=option['departure_time'].strftime('%H:%M'),
+                )
+                for option in result['options']
+            ],
+        })
+
 @method_decorator(login_required, name='dispatch')
 class InstallerScheduleView(APIView):
     """Расписание конкретного монтажника"""
@@ -374,6 +594,66 @@ class InstallerScheduleView(APIView):
             'schedule': schedule_data
         })
 
+@method_decorator(login_required, name='dispatch')
+class InstallerFeedTokenView(APIView):
+    """Ссылка на подписку монтажника в календаре телефона (ICS)"""
+    
+    def _check_access(self, request, installer_id):
+        if request.user.role == 'installer' and request.user.id != int(installer_id):
+            return Response({'error': 'Нет доступа'}, status=status.HTTP_403_FORBIDDEN)
+        return None
+    
+    def _response(self, request, feed_token, response_status=status.HTTP_200_OK):
+        path = reverse('calendar-feed', kwargs={'token': feed_token.token})
+        return Response({
+            'installer_id': feed_token.installer_id,
+            'feed_url': request.build_absolute_uri(path),
+            'created_at': feed_token.created_at,
+        }, status=response_status)
+    
+    def get(self, request, installer_id):
+        """Ссылка на ленту (токен создается при первом запросе)"""
+        denied = self._check_access(request, installer_id)
+        if denied:
+            return denied
+        installer = get_object_or_404(User, id=installer_id, role='installer')
+        return self._response(request, CalendarFeedToken.for_installer(installer))
+    
+    def post(self, request, installer_id):
+        """Новый токен - прежняя ссылка перестает работать"""
+        denied = self._check_access(request, installer_id)
+        if denied:
+            return denied
+        installer = get_object_or_404(User, id=installer_id, role='installer')
+        return self._response(
+            request, CalendarFeedToken.for_installer(installer, regenerate=True), status.HTTP_201_CREATED
+        )
+
+class InstallerCalendarFeedView(APIView):
+    """
+    Лента монтажей в формате iCalendar по секретному токену из ссылки:
+    календарные приложения не умеют авторизоваться, доступ дает сам токен
+    """
+    authentication_classes = []
+    permission_classes = [AllowAny]
+    
+    def get(self, request, token):
+        feed_token = CalendarFeedToken.objects.select_related('installer').filter(token=token).first()
+        if feed_token is None or not feed_token.installer.is_active:
+            return HttpResponse(status=status.HTTP_404_NOT_FOUND)
+        
+        feed = ics.get_feed(feed_token.installer)
+        response = get_conditional_response(
+            request, etag=feed['etag'], last_modified=int(feed['last_modified'].timestamp())
+        )
+        if response is None:
+            response = HttpResponse(feed['body'], content_type='text/calendar; charset=utf-8')
+            response['Content-Disposition'] = 'inline; filename="installations.ics"'
+        response['ETag'] = feed['etag']
+        response['Last-Modified'] = http_date(feed['last_modified'].timestamp())
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
 @method_decorator(login_required, name='dispatch')
 class AvailabilityCheckView(APIView):
     """Проверка доступности монтажников"""
@@ -401,12 +681,242 @@ class AvailabilityCheckView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        conflicts = CalendarService.check_installer_availability(
-            installer_ids, date, start_time, end_time
+        try:
+            installer_ids = [int(installer_id) for installer_id in installer_ids]
+        except (TypeError, ValueError):
+            return Response(
+                {'error': 'Неверный формат данных'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        availability = CalendarService.get_availability(
+            installer_ids, date, start_time, end_time, hold_token=request.data.get('hold_token') or None
         )
+        conflicts = [conflict['name'] for conflict in availability['conflicts']]
+        conflicts.extend(f"Монтажник #{installer_id} не найден" for installer_id in availability['unknown_installers'])
         
         return Response({
-            'available': len(conflicts) == 0,
+            'available': availability['available'],
             'conflicts': conflicts,
-            'message': 'Все монтажники доступны' if not conflicts else f'Конфликты: {", ".join(conflicts)}'
-        })
\ No newline at end of file
+            'message': 'Все монтажники доступны' if not conflicts else f'Конфликты: {", ".join(conflicts)}',
+            'conflict_details': availability['conflicts'],
+            'unknown_installers': availability['unknown_installers'],
+            'free_windows': {
+                installer_id: [
+                    {'start': window['start'].strftime('%H:%M'), 'end': window['end'].strftime('%H:%M')}
+                    for window in windows
+                ]
+                for installer_id, windows in availability['free_windows'].items()
+            },
+            'common_free_windows': [
+                {'start': window['start'].strftime('%H:%M'), 'end': window['end'].strftime('%H:%M')}
+                for window in availability['common_free_windows']
+            ],
+        })
+
+@method_decorator(login_required, name='dispatch')
+class SlotSearchView(APIView):
+    """Поиск ближайших свободных слотов для монтажа"""
+    MAX_HORIZON_DAYS = 62
+    MAX_LIMIT = 50
+    
+    def get(self, request):
+        """Top-N слотов по времени начала и добавочному пробегу"""
+        calendar_settings = getattr(settings, 'CALENDAR_SETTINGS', {})
+        
+        try:
+            duration_param = request.GET.get('duration')
+            if duration_param and ':' in duration_param:
+                hours, minutes = map(int, duration_param.split(':'))
+                duration = hours * 60 + minutes
+            elif duration_param:
+                duration = int(duration_param)
+            else:
+                duration = int(calendar_settings.get('DEFAULT_INSTALLATION_DURATION', 2) * 60)
+            
+            installers_count = int(request.GET.get('installers_count', 1))
+            limit = min(int(request.GET.get('limit', DEFAULT_LIMIT)), self.MAX_LIMIT)
+            step = int(request.GET.get('step', DEFAULT_STEP_MINUTES))
+            
+            date_from = request.GET.get('date_from')
+            date_from = (datetime.strptime(date_from, '%Y-%m-%d').date() if date_from
+                         else timezone.localdate() + timedelta(days=1))
+            date_to = request.GET.get('date_to')
+            date_to = (datetime.strptime(date_to, '%Y-%m-%d').date() if date_to
+                       else date_from + timedelta(days=13))
+            
+            location = None
+            if request.GET.get('latitude') and request.GET.get('longitude'):
+                location = (float(request.GET['latitude']), float(request.GET['longitude']))
+            
+            installer_ids = None
+            if request.GET.get('installer_ids'):
+                installer_ids = [int(value) for value in request.GET['installer_ids'].split(',') if value]
+        except ValueError:
+            return Response(
+                {'error': 'Неверный формат параметров'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        if duration <= 0 or installers_count < 1 or limit < 1 or step < 5:
+            return Response(
+                {'error': 'Неверные значения параметров'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        if date_to < date_from or (date_to - date_from).days >= self.MAX_HORIZON_DAYS:
+            return Response(
+                {'error': f'Период поиска должен быть от 1 до {self.MAX_HORIZON_DAYS} дней'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        slots = find_free_slots(
+            duration=duration,
+            installers_count=installers_count,
+            date_from=date_from,
+            date_to=date_to,
+            location=location,
+            limit=limit,
+            step=step,
+            include_weekends=request.GET.get('include_weekends') == '1',
+            installer_ids=installer_ids,
+            hold_token=request.GET.get('hold_token') or None,
+        )
+        
+        return Response({
+            'duration_minutes': duration,
+            'installers_count': installers_count,
+            'date_from': date_from,
+            'date_to': date_to,
+            'slots': [
+                {
+                    'date': slot['date'],
+                    'start_time': slot['start_time'].strftime('%H:%M'),
+                    'end_time': slot['end_time'].strftime('%H:%M'),
+                    'installer_ids': slot['installer_ids'],
+                    'installers': slot['installers'],
+                    'added_distance_km': slot['added_distance_km'],
+                    'added_travel_minutes': slot['added_travel_minutes'],
+                }
+                for slot in slots
+            ]
+        })
+
+@method_decorator(login_required, name='dispatch')
+class SlotHoldView(APIView):
+    """Временная бронь окна на время согласования с клиентом"""
+    
+    @staticmethod
+    def _hold_data(hold):
+        return {
+            'token': hold['token'],
+            'installer_ids': hold['installer_ids'],
+            'date': hold['date'],
+            'start_time': hold['start_time'].strftime('%H:%M'),
+            'end_time': hold['end_time'].strftime('%H:%M'),
+            'expires_at': hold['expires_at'],
+        }
+    
+    def post(self, request):
+        """Бронь окна; с token - перенос или продление существующей брони"""
+        if request.user.role not in ['owner', 'manager']:
+            return Response({'error': 'Недостаточно прав'}, status=status.HTTP_403_FORBIDDEN)
+        
+        data = request.data
+        token = data.get('token') or None
+        if token and not SlotHold.objects.filter(token=token).exists():
+            return Response({'error': 'Бронь не найдена или истекла'}, status=status.HTTP_404_NOT_FOUND)
+        if (token and request.user.role == 'manager'
+                and SlotHold.objects.filter(token=token).exclude(created_by=request.user).exists()):
+            return Response({'error': 'Нет прав на эту бронь'}, status=status.HTTP_403_FORBIDDEN)
+        
+        try:
+            date = datetime.strptime(data.get('scheduled_date'), '%Y-%m-%d').date()
+            start_time = datetime.strptime(data.get('start_time'), '%H:%M').time()
+            end_time = datetime.strptime(data.get('end_time'), '%H:%M').time()
+            installer_ids = [int(installer_id) for installer_id in data.get('installer_ids', [])]
+            minutes = int(data['minutes']) if data.get('minutes') else None
+        except (TypeError, ValueError):
+            return Response({'error': 'Неверный формат данных'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            hold = CalendarService.hold_slot(
+                installer_ids, date, start_time, end_time,
+                created_by=request.user, minutes=minutes, token=token,
+            )
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response(self._hold_data(hold), status=status.HTTP_201_CREATED)
+    
+    def delete(self, request, token):
+        """Снятие брони"""
+        if request.user.role not in ['owner', 'manager']:
+            return Response({'error': 'Недостаточно прав'}, status=status.HTTP_403_FORBIDDEN)
+        if (request.user.role == 'manager'
+                and SlotHold.objects.filter(token=token).exclude(created_by=request.user).exists()):
+            return Response({'error': 'Нет прав на эту бронь'}, status=status.HTTP_403_FORBIDDEN)
+        
+        if not holds.release(token):
+            return Response({'error': 'Бронь не найдена'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+@method_decorator(login_required, name='dispatch')
+class ScheduleConflictsView(APIView):
+    """Отчет о пересечениях, перегрузках и простоях в расписании"""
+    MAX_HORIZON_DAYS = 366
+    
+    @staticmethod
+    def _times(item):
+        return {
+            key: value.strftime('%H:%M') if isinstance(value, time) else value
+            for key, value in item.items()
+        }
+    
+    def get(self, request):
+        """Проверка периода: один запрос монтажей и проход заметающей прямой"""
+        if request.user.role == 'installer':
+            return Response({'error': 'Нет доступа'}, status=status.HTTP_403_FORBIDDEN)
+        
+        try:
+            date_from = request.GET.get('date_from')
+            date_from = datetime.strptime(date_from, '%Y-%m-%d').date() if date_from else timezone.localdate()
+            date_to = request.GET.get('date_to')
+            date_to = (datetime.strptime(date_to, '%Y-%m-%d').date() if date_to
+                       else date_from + timedelta(days=30))
+            min_gap = int(request.GET.get('min_gap', DEFAULT_MIN_GAP_MINUTES))
+            
+            installer_ids = None
+            if request.GET.get('installer_ids'):
+                installer_ids = [int(value) for value in request.GET['installer_ids'].split(',') if value]
+        except ValueError:
+            return Response(
+                {'error': 'Неверный формат параметров'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        if date_to < date_from or (date_to - date_from).days >= self.MAX_HORIZON_DAYS:
+            return Response(
+                {'error': f'Период проверки должен быть от 1 до {self.MAX_HORIZON_DAYS} дней'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        report = find_conflicts(date_from, date_to, installer_ids, min_gap=min_gap)
+        
+        def with_name(item):
+            item = self._times(item)
+            item['installer'] = report.installers.get(item['installer_id'])
+            return item
+        
+        return Response({
+            'date_from': date_from,
+            'date_to': date_to,
+            'summary': report.summary(),
+            'overlaps': [
+                dict(with_name(overlap), first=self._times(overlap['first']), second=self._times(overlap['second']))
+                for overlap in report.overlaps
+            ],
+            'outside_hours': [with_name(item) for item in report.outside_hours],
+            'overloads': [with_name(item) for item in report.overloads],
+            'gaps': [with_name(item) for item in report.gaps],
+        })
@@ -0,0 +1,383 @@
+# calendar_app/vrp.py
+"""
+Дневная маршрутизация всех бригад с временными окнами (VRPTW).
+
+Решатель не обращается к ORM: на вход получает монтажи (Job) и бригады
+(Crew), на выходе - маршрут каждой бригады с временем прибытия и начала
+работ. Монтаж с несколькими монтажниками или без права переназначения
+закреплен за своими бригадами и может двигаться только внутри маршрута.
+
+Алгоритм:
+1. Жадная вставка по возрастанию приоритета и позднего времени начала:
+   каждый монтаж ставится в самое дешевое допустимое место среди всех
+   разрешенных бригад.
+2. Улучшение перемещениями (relocate) в пределах бюджета времени:
+   монтаж вынимается из маршрута и вставляется в лучшее допустимое место,
+   если это сокращает пробег. Порядок обхода задается seed.
+
+Окна жесткие: работы начинаются не раньше earliest и не позже latest,
+ожидание на объекте допускается.
+"""
+import time as time_module
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .routing import distance_matrix
+
+EPSILON = 1e-9
+# Средняя скорость 30 км/ч с надбавкой 20% на пробки (как RouteCalculationService)
+MINUTES_PER_KM = 60 / 30 * 1.2
+
+
+@dataclass
+class Job:
+    """Монтаж: окно начала работ в минутах от полуночи"""
+    id: int
+    point: Tuple[float, float]
+    earliest: int
+    latest: int
+    duration: int
+    priority: int = 2  # 0 - срочно, 3 - низкий
+    crews: Tuple[int, ...] = ()  # текущие бригады
+    locked: bool = False  # нельзя переназначать на другие бригады
+
+
+@dataclass
+class Crew:
+    """Бригада (монтажник) и начало его рабочего дня"""
+    id: int
+    start: int
+
+
+@dataclass
+class Stop:
+    job_id: int
+    arrival: float
+    start: float
+    end: float
+    distance: float
+    travel: float = 0.0  # минут в пути от предыдущей точки
+
+
+@dataclass
+class DaySolution:
+    routes: Dict[int, List[Stop]]
+    distance: float
+    baseline_distance: float
+    baseline_by_crew: Dict[int, float] = field(default_factory=dict)
+    baseline_violations: int = 0  # нарушенных окон в текущем распределении
+    unassigned: List[int] = field(default_factory=list)  # не поместились в окна, оставлены у текущих бригад
+    reassigned: Dict[int, int] = field(default_factory=dict)  # job_id → новая бригада
+    moves: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def distance_saved(self) -> float:
+        return max(0.0, self.baseline_distance - self.distance)
+
+
+class _Visit:
+    """Посещение: монтаж в конкретной бригаде (у закрепленных - по одному на бригаду)"""
+    __slots__ = ('job', 'node', 'allowed')
+
+    def __init__(self, job: Job, node: int, allowed: Tuple[int, ...]):
+        self.job = job
+        self.node = node
+        self.allowed = allowed
+
+
+class DaySolver:
+    """Решатель VRPTW на один день"""
+
+    def __init__(self, jobs: Sequence[Job], crews: Sequence[Crew],
+                 depot: Optional[Tuple[float, float]] = None, allow_reassign: bool = True,
+                 crew_cost: float = 0.0, matrices: Optional[Tuple[np.ndarray, np.ndarray]] = None):
+        """matrices - (км, минуты) для точек [склад] + монтажи; по умолчанию гаверсинус и 30 км/ч"""
+        self.jobs = list(jobs)
+        self.crews = {crew.id: crew for crew in crews}
+        self.depot = depot
+        # Условная стоимость (км) задействования бригады: без нее выгодно
+        # раздать монтажи по одному всем свободным монтажникам
+        self.crew_cost = crew_cost
+
+        points = [job.point for job in self.jobs]
+        offset = 1 if depot else 0
+        if depot:
+            points.insert(0, depot)
+        if matrices is not None:
+            matrix, minutes = (np.asarray(values, dtype=np.float64) for values in matrices)
+        else:
+            matrix = distance_matrix(points) if points else np.zeros((0, 0))
+            minutes = matrix * MINUTES_PER_KM
+        # Списки Python быстрее поэлементной индексации массивов в горячем цикле
+        self.distances = matrix.tolist()
+        self.travel = minutes.tolist()
+        self.start_node = 0 if depot else None
+
+        crew_ids = tuple(self.crews)
+        self.visits: List[_Visit] = []
+        for index, job in enumerate(self.jobs):
+            node = index + offset
+            current = tuple(crew_id for crew_id in job.crews if crew_id in self.crews)
+            if job.locked or len(current) > 1 or not allow_reassign:
+                # Закрепленный монтаж - отдельное посещение в каждой своей бригаде
+                for crew_id in current:
+                    self.visits.append(_Visit(job, node, (crew_id,)))
+            else:
+                self.visits.append(_Visit(job, node, crew_ids))
+
+    # --- оценка маршрута ---
+
+    def _leg(self, previous: Optional[int], node: int) -> Tuple[float, float]:
+        """Расстояние и время в пути; без склада первый переезд бесплатный"""
+        if previous is None:
+            return 0.0, 0.0
+        return self.distances[previous][node], self.travel[previous][node]
+
+    def evaluate(self, crew_id: int, route: List[_Visit]) -> Optional[float]:
+        """Пробег маршрута или None, если нарушено окно"""
+        clock = self.crews[crew_id].start
+        previous = self.start_node
+        distance = 0.0
+        for visit in route:
+            leg_distance, leg_time = self._leg(previous, visit.node)
+            clock = max(clock + leg_time, visit.job.earliest)
+            if clock > visit.job.latest + EPSILON:
+                return None
+            distance += leg_distance
+            clock += visit.job.duration
+            previous = visit.node
+        return distance
+
+    def _cost(self, crew_id: int, route: List[_Visit]) -> Optional[float]:
+        """Пробег маршрута плюс стоимость бригады; None, если нарушено окно"""
+        distance = self.evaluate(crew_id, route)
+        if distance is None:
+            return None
+        return distance + (self.crew_cost if route else 0.0)
+
+    def timeline(self, crew_id: int, route: List[_Visit]) -> List[Stop]:
+        clock = self.crews[crew_id].start
+        previous = self.start_node
+        stops = []
+        for visit in route:
+            leg_distance, leg_time = self._leg(previous, visit.node)
+            arrival = clock + leg_time
+            start = max(arrival, visit.job.earliest)
+            clock = start + visit.job.duration
+            stops.append(Stop(visit.job.id, arrival, start, clock, float(leg_distance), float(leg_time)))
+            previous = visit.node
+        return stops
+
+    def _best_insertion(self, visit: _Visit, routes: Dict[int, List[_Visit]],
+                        costs: Dict[int, float]) -> Optional[Tuple[float, int, int]]:
+        """Самая дешевая допустимая вставка: (прирост пробега, бригада, позиция)"""
+        best = None
+        for crew_id in visit.allowed:
+            route = routes[crew_id]
+            for position in range(len(route) + 1):
+                candidate = route[:position] + [visit] + route[position:]
+                distance = self._cost(crew_id, candidate)
+                if distance is None:
+                    continue
+                delta = distance - costs[crew_id]
+                if best is None or delta < best[0] - EPSILON:
+                    best = (delta, crew_id, position)
+        return best
+
+    # --- решение ---
+
+    def check_sequence(self, crew_id: int, job_ids: Sequence[int]) -> Tuple[float, int]:
+        """Пробег и число нарушенных окон для заданного порядка монтажей бригады"""
+        nodes = {job.id: index + (1 if self.depot else 0) for index, job in enumerate(self.jobs)}
+        jobs = {job.id: job for job in self.jobs}
+        clock = self.crews[crew_id].start
+        previous = self.start_node
+        distance, violations = 0.0, 0
+        for job_id in job_ids:
+            job, node = jobs[job_id], nodes[job_id]
+            leg_distance, leg_time = self._leg(previous, node)
+            clock = max(clock + leg_time, job.earliest)
+            if clock > job.latest + EPSILON:
+                violations += 1
+            distance += leg_distance
+            clock += job.duration
+            previous = node
+        return distance, violations
+
+    def _current_crew(self, visit: _Visit) -> Optional[int]:
+        if len(visit.allowed) == 1:
+            return visit.allowed[0]
+        if visit.job.crews and visit.job.crews[0] in self.crews:
+            return visit.job.crews[0]
+        return None
+
+    def baseline(self) -> Tuple[Dict[int, List[_Visit]], float]:
+        """Текущее распределение: бригады как есть, монтажи по времени начала окна"""
+        routes = {crew_id: [] for crew_id in self.crews}
+        for visit in self.visits:
+            crew_id = self._current_crew(visit)
+            if crew_id is not None:
+                routes[crew_id].append(visit)
+        distance = 0.0
+        for crew_id, route in routes.items():
+            route.sort(key=lambda visit: (visit.job.earliest, visit.job.id))
+            previous = self.start_node
+            for visit in route:
+                leg_distance, _ = self._leg(previous, visit.node)
+                distance += leg_distance
+                previous = visit.node
+        return routes, float(distance)
+
+    def _insert_all(self, visits, routes, costs, unassigned):
+        """Вставляет посещения по очереди в лучшие допустимые места"""
+        for visit in visits:
+            insertion = self._best_insertion(visit, routes, costs)
+            if insertion is None:
+                unassigned.append(visit)
+                continue
+            delta, crew_id, position = insertion
+            routes[crew_id].insert(position, visit)
+            costs[crew_id] += delta
+
+    def _construct_greedy(self):
+        """Жадная вставка с нуля: сначала срочные и с ранним крайним сроком"""
+        routes = {crew_id: [] for crew_id in self.crews}
+        costs = {crew_id: 0.0 for crew_id in self.crews}
+        unassigned = []
+        self._insert_all(sorted(self.visits, key=_urgency), routes, costs, unassigned)
+        return routes, costs, unassigned
+
+    def _construct_from_baseline(self, baseline_routes):
+        """
+        Текущее распределение, из которого убраны монтажи с нарушенным окном;
+        они вставляются заново в лучшие допустимые места
+        """
+        routes = {crew_id: [] for crew_id in self.crews}
+        costs = {crew_id: 0.0 for crew_id in self.crews}
+        dropped = [visit for visit in self.visits if not any(visit in route for route in baseline_routes.values())]
+        for crew_id, route in baseline_routes.items():
+            for visit in route:
+                candidate = routes[crew_id] + [visit]
+                distance = self._cost(crew_id, candidate)
+                if distance is None:
+                    dropped.append(visit)
+                else:
+                    routes[crew_id], costs[crew_id] = candidate, distance
+        unassigned = []
+        self._insert_all(sorted(dropped, key=_urgency), routes, costs, unassigned)
+        return routes, costs, unassigned
+
+    def solve(self, time_budget: float = 2.0, seed: int = 0) -> DaySolution:
+        began = time_module.perf_counter()
+        deadline = began + max(time_budget, 0.0)
+        baseline_routes, baseline_distance = self.baseline()
+
+        # Из двух начальных решений берем то, где меньше непоставленных, затем короче
+        routes, costs, unassigned = min(
+            (self._construct_greedy(), self._construct_from_baseline(baseline_routes)),
+            key=lambda candidate: (len(candidate[2]), sum(candidate[1].values())),
+        )
+
+        # Улучшение перемещениями
+        rng = np.random.default_rng(seed)
+        moves = 0
+        improved = True
+        while improved and time_module.perf_counter() < deadline:
+            improved = False
+            located = [(crew_id, visit) for crew_id, route in routes.items() for visit in route]
+            for index in rng.permutation(len(located)):
+                if time_module.perf_counter() >= deadline:
+                    break
+                crew_id, visit = located[index]
+                route = routes[crew_id]
+                position = route.index(visit)
+                reduced = route[:position] + route[position + 1:]
+                reduced_cost = self._cost(crew_id, reduced)
+                if reduced_cost is None:
+                    continue
+                gain = costs[crew_id] - reduced_cost
+
+                routes[crew_id], costs[crew_id] = reduced, reduced_cost
+                insertion = self._best_insertion(visit, routes, costs)
+                if insertion is not None and insertion[0] < gain - EPSILON:
+                    delta, target, target_position = insertion
+                    routes[target].insert(target_position, visit)
+                    costs[target] += delta
+                    moves += 1
+                    improved = True
+                else:
+                    routes[crew_id], costs[crew_id] = route, costs[crew_id] + gain
+
+            # Повторная попытка вставить непоставленные
+            for visit in list(unassigned):
+                insertion = self._best_insertion(visit, routes, costs)
+                if insertion is not None:
+                    delta, crew_id, position = insertion
+                    routes[crew_id].insert(position, visit)
+                    costs[crew_id] += delta
+                    unassigned.remove(visit)
+                    improved = True
+
+        # Монтажи без допустимого места остаются у текущих бригад по времени окна
+        for visit in unassigned:
+            crew_id = self._current_crew(visit)
+            if crew_id is None:
+                continue
+            route = routes[crew_id]
+            # Позиция с наименьшим числом нарушенных окон, затем с меньшим пробегом
+            options = []
+            for position in range(len(route) + 1):
+                sequence = [other.job.id for other in route[:position]] + [visit.job.id] + [other.job.id for other in route[position:]]
+                distance, violations = self.check_sequence(crew_id, sequence)
+                options.append((violations, distance, position))
+            _, distance, position = min(options)
+            costs[crew_id] = distance + self.crew_cost
+            route.insert(position, visit)
+
+        reassigned = {}
+        for crew_id, route in routes.items():
+            for visit in route:
+                if len(visit.allowed) > 1 and crew_id not in visit.job.crews:
+                    reassigned[visit.job.id] = crew_id
+
+        baseline_checks = {
+            crew_id: self.check_sequence(crew_id, [visit.job.id for visit in route])
+            for crew_id, route in baseline_routes.items() if route
+        }
+
+        timelines = {crew_id: self.timeline(crew_id, route) for crew_id, route in routes.items() if route}
+
+        return DaySolution(
+            routes=timelines,
+            distance=float(sum(stop.distance for stops in timelines.values() for stop in stops)),
+            baseline_distance=baseline_distance,
+            baseline_by_crew={crew_id: check[0] for crew_id, check in baseline_checks.items()},
+            baseline_violations=sum(check[1] for check in baseline_checks.values()),
+            unassigned=sorted({visit.job.id for visit in unassigned}),
+            reassigned=reassigned,
+            moves=moves,
+            elapsed=time_module.perf_counter() - began,
+        )
+
+
+def _urgency(visit: _Visit):
+    return visit.job.priority, visit.job.latest, visit.job.earliest, visit.job.id
+
+
+def solve_day(jobs: Sequence[Job], crews: Sequence[Crew], depot: Optional[Tuple[float, float]] = None,
+              allow_reassign: bool = True, time_budget: float = 2.0, seed: int = 0,
+              crew_cost: float = 0.0, travel=None) -> DaySolution:
+    """
+    Маршруты всех бригад на день с соблюдением временных окон.
+    Без склада бригады выезжают из центра монтажей дня.
+    travel(points) -> (км, минуты) - источник матриц (например, calendar_app.travel)
+    """
+    if depot is None and jobs:
+        depot = tuple(np.mean([job.point for job in jobs], axis=0).tolist())
+    matrices = None
+    if travel is not None and jobs:
+        matrices = travel([depot] + [job.point for job in jobs])
+    return DaySolver(jobs, crews, depot, allow_reassign, crew_cost, matrices).solve(time_budget, seed)
@@ -48,6 +48,21 @@ INSTALLED_APPS = [
 # Получите ключ API на https://developer.tech.yandex.ru/
 YANDEX_MAPS_API_KEY = ''  # Ваш ключ API Яндекс.Карт
 
+# Геокодирование (calendar_app.geocoding). Без ключа настоящий API не вызывается;
+# для разработки URL можно направить на заглушку: python manage.py geocoder_stub
+GEOCODER = {
+    'URL': os.environ.get('GEOCODER_URL', 'https://geocode-maps.yandex.ru/1.x/'),
+    'TIMEOUT': 5,  # секунды на запрос
+    'CACHE_TTL_DAYS': 180,  # срок жизни найденных координат
+    'NEGATIVE_TTL_DAYS': 7,  # срок жизни ответа "адрес не найден"
+    'MEMORY_CACHE_SIZE': 2048,  # размер LRU-кэша в процессе
+    'BATCH_WORKERS': 4,  # потоков пакетного геокодирования
+    'BATCH_QPS': 10,  # общий лимит запросов к геокодеру в секунду
+    'MAX_RETRIES': 4,  # повторов при сетевых ошибках, 429 и 5xx
+    'BACKOFF_SECONDS': 0.5,  # первая задержка повтора, дальше удваивается
+    'BACKGROUND': True,  # фоновый поток геокодирования; False - только команда geocode_addresses
+}
+
 # Настройки календаря
 CALENDAR_SETTINGS = {
     'DEFAULT_WORK_START_TIME': '08:00',
@@ -55,6 +70,49 @@ CALENDAR_SETTINGS = {
     'DEFAULT_INSTALLATION_DURATION': 2,  # часы
     'MAX_INSTALLATIONS_PER_DAY': 5,
     'WAREHOUSE_ADDRESS': 'Москва, ул. Складская, 1',  # Адрес склада для маршрутизации
+    'WAREHOUSE_COORDINATES': None,  # (широта, долгота) склада - начало маршрута; None - от первого монтажа
+    'ROUTE_TIME_BUDGET': 1.0,  # секунды на улучшение одного маршрута (2-opt/Or-opt)
+    'ROUTE_SEED': 0,  # seed возмущений локального поиска
+    'DAY_ROUTE_TIME_BUDGET': 5.0,  # секунды на дневную маршрутизацию всех бригад
+    'DAY_ROUTE_CREW_COST_KM': 30.0,  # условная стоимость (км) выезда еще одной бригады
+    'ICS_PAST_DAYS': 30,  # период ленты ICS монтажника: дней назад
+    'ICS_FUTURE_DAYS': 90,  # и дней вперед
+    'SLOT_HOLD_MINUTES': 10,  # срок временной брони окна (не больше 60 минут)
+    # Расстояния и время в пути (calendar_app.travel): haversine, table или osrm
+    'TRAVEL_PROVIDER': os.environ.get('TRAVEL_PROVIDER', 'haversine'),
+    'TRAVEL_OSRM_URL': os.environ.get('TRAVEL_OSRM_URL', 'http://127.0.0.1:5000'),
+    'TRAVEL_SPEED_TABLE': {'night': 45, 'morning': 22, 'day': 30, 'evening': 20},  # км/ч для table
+    'TRAVEL_DETOUR_FACTOR': 1.3,  # извилистость дорог для table
+    'TRAVEL_CELL_PRECISION': 4,  # знаков координат в ключе кэша (~10 м)
+    'TRAVEL_CACHE_TTL_DAYS': 30,
+}
+
+# Кэш: при наличии REDIS_URL - общий для всех воркеров и команд управления
+# (сброс кэша в одном процессе виден остальным), иначе - память процесса
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+            'KEY_PREFIX': 'crm',
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Живые обновления дашборда (SSE)
+# При наличии REDIS_URL дельты рассылаются через Redis всем воркерам,
+# иначе используется локальный брокер внутри процесса
+LIVE_DASHBOARD = {
+    'BROKER': os.environ.get('LIVE_DASHBOARD_BROKER', 'redis' if os.environ.get('REDIS_URL') else 'local'),
+    'REDIS_URL': os.environ.get('REDIS_URL', ''),
+    'CHANNEL': 'crm:dashboard',
+    'HEARTBEAT_SECONDS': 15,
+    'MAX_QUEUE_SIZE': 100,
 }
 
 MIDDLEWARE = [
@@ -3,11 +3,12 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
-from analytics.views import dashboard
+from analytics.views import dashboard, dashboard_stream
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('', dashboard, name='dashboard'),
+    path('dashboard/stream/', dashboard_stream, name='dashboard_stream'),
     path('user_accounts/', include('user_accounts.urls')),
     path('clients/', include('customer_clients.urls')),
     path('services/', include('services.urls')),
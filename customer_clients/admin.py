@@ -3,7 +3,8 @@ from .models import Client
 
 @admin.register(Client)
 class ClientAdmin(admin.ModelAdmin):
-    list_display = ('name', 'phone', 'address', 'source', 'created_at')
+    list_display = ('name', 'phone', 'address', 'source', 'orders_count', 'lifetime_revenue', 'last_order_at', 'created_at')
     list_filter = ('source', 'created_at')
     search_fields = ('name', 'phone', 'address')
-    date_hierarchy = 'created_at'
\ No newline at end of file
+    date_hierarchy = 'created_at'
+    readonly_fields = Client.COUNTER_FIELDS + ('latitude', 'longitude')
\ No newline at end of file
@@ -0,0 +1,13 @@
+# customer_clients/management/commands/rebuild_client_counters.py
+from django.core.management.base import BaseCommand
+from customer_clients.models import Client
+
+
+class Command(BaseCommand):
+    help = 'Полный пересчет счетчиков заказов клиентов'
+
+    def handle(self, *args, **options):
+        updated = Client.refresh_order_counters()
+        self.stdout.write(
+            self.style.SUCCESS(f'Счетчики заказов пересчитаны: {updated} клиентов')
+        )
@@ -0,0 +1,64 @@
+# Generated by Django 5.2.1 on 2026-10-19 12:08
+
+from django.db import migrations, models
+from django.db.models import Count, Max, Min, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def fill_order_counters(apps, schema_editor):
+    """Начальное заполнение счетчиков (та же логика, что Client.refresh_order_counters)"""
+    Client = apps.get_model('customer_clients', 'Client')
+    Order = apps.get_model('orders', 'Order')
+
+    def order_subquery(aggregate):
+        orders = Order.objects.filter(client=OuterRef('pk')).order_by().values('client')
+        return Subquery(orders.annotate(value=aggregate).values('value'))
+
+    completed = Q(status='completed')
+    Client.objects.update(
+        orders_count=Coalesce(order_subquery(Count('id')), Value(0)),
+        completed_count=Coalesce(order_subquery(Count('id', filter=completed)), Value(0)),
+        lifetime_revenue=Coalesce(
+            order_subquery(Sum('total_cost', filter=completed)),
+            Value(0, output_field=models.DecimalField(max_digits=12, decimal_places=2))
+        ),
+        first_order_at=order_subquery(Min('created_at')),
+        last_order_at=order_subquery(Max('created_at')),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customer_clients', '0001_initial'),
+        ('orders', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='client',
+            name='completed_count',
+            field=models.PositiveIntegerField(db_index=True, default=0, verbose_name='Завершенных заказов'),
+        ),
+        migrations.AddField(
+            model_name='client',
+            name='first_order_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Первый заказ'),
+        ),
+        migrations.AddField(
+            model_name='client',
+            name='last_order_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True, verbose_name='Последний заказ'),
+        ),
+        migrations.AddField(
+            model_name='client',
+            name='lifetime_revenue',
+            field=models.DecimalField(db_index=True, decimal_places=2, default=0, max_digits=12, verbose_name='Выручка за все время'),
+        ),
+        migrations.AddField(
+            model_name='client',
+            name='orders_count',
+            field=models.PositiveIntegerField(db_index=True, default=0, verbose_name='Заказов'),
+        ),
+        migrations.RunPython(fill_order_counters, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,6 @@
 from django.db import models
+from django.db.models import Count, Max, Min, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
 
 class Client(models.Model):
     SOURCE_CHOICES = (
@@ -15,10 +17,83 @@ class Client(models.Model):
     source = models.CharField(max_length=15, choices=SOURCE_CHOICES, verbose_name="Источник")
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Дата создания")
     
+    # Счетчики по заказам клиента (поддерживаются сигналами orders.signals)
+    orders_count = models.PositiveIntegerField(default=0, db_index=True, verbose_name="Заказов")
+    completed_count = models.PositiveIntegerField(default=0, db_index=True, verbose_name="Завершенных заказов")
+    lifetime_revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0, db_index=True, verbose_name="Выручка за все время")
+    first_order_at = models.DateTimeField(null=True, blank=True, verbose_name="Первый заказ")
+    last_order_at = models.DateTimeField(null=True, blank=True, db_index=True, verbose_name="Последний заказ")
+    
+    COUNTER_FIELDS = ('orders_count', 'completed_count', 'lifetime_revenue', 'first_order_at', 'last_order_at')
+    COORDINATE_FIELDS = ('latitude', 'longitude')
+    
+    # Координаты адреса (заполняются геокодированием calendar_app при смене адреса)
+    latitude = models.FloatField(null=True, blank=True, verbose_name="Широта")
+    longitude = models.FloatField(null=True, blank=True, verbose_name="Долгота")
+    
     def __str__(self):
         return f"{self.name} ({self.phone})"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Исходный адрес: по нему save() определяет, что адрес изменился
+        if 'address' in field_names:
+            instance._loaded_address = values[field_names.index('address')]
+        return instance
+    
+    @property
+    def address_changed(self) -> bool:
+        """Новый клиент или адрес изменен с момента загрузки"""
+        loaded = getattr(self, '_loaded_address', None)
+        return self._state.adding or (loaded is not None and loaded != self.address)
+    
+    def save(self, *args, **kwargs):
+        # Флаг для сигнала calendar_app.signals.geocode_client_address
+        self._address_changed = self.address_changed
+        if self._address_changed and not self._state.adding:
+            # Координаты старого адреса больше не действительны
+            self.latitude = self.longitude = None
+        
+        # Счетчики меняются только атомарными UPDATE из сигналов заказов,
+        # поэтому обычное сохранение клиента их не перезаписывает. Координаты
+        # пишет фоновое геокодирование тоже через UPDATE - без смены адреса
+        # сохранение не затирает их значениями, загруженными раньше
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            skipped = self.COUNTER_FIELDS if self._address_changed else self.COUNTER_FIELDS + self.COORDINATE_FIELDS
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in skipped
+            ]
+        super().save(*args, **kwargs)
+        self._loaded_address = self.address
+    
     class Meta:
         verbose_name = "Клиент"
         verbose_name_plural = "Клиенты"
-        ordering = ['-created_at']
\ No newline at end of file
+        ordering = ['-created_at']
+    
+    @classmethod
+    def refresh_order_counters(cls, queryset=None):
+        """
+        Пересчитывает счетчики заказов одним UPDATE с подзапросами.
+        queryset - ограничение набора клиентов (по умолчанию все)
+        """
+        from orders.models import Order
+        
+        def order_subquery(aggregate):
+            orders = Order.objects.filter(client=OuterRef('pk')).order_by().values('client')
+            return Subquery(orders.annotate(value=aggregate).values('value'))
+        
+        completed = Q(status='completed')
+        queryset = cls.objects.all() if queryset is None else queryset
+        return queryset.update(
+            orders_count=Coalesce(order_subquery(Count('id')), Value(0)),
+            completed_count=Coalesce(order_subquery(Count('id', filter=completed)), Value(0)),
+            lifetime_revenue=Coalesce(
+                order_subquery(Sum('total_cost', filter=completed)),
+                Value(0, output_field=models.DecimalField(max_digits=12, decimal_places=2))
+            ),
+            first_order_at=order_subquery(Min('created_at')),
+            last_order_at=order_subquery(Max('created_at')),
+        )
@@ -6,15 +6,35 @@ from .models import Client
 from .forms import ClientForm
 from orders.models import Order
 
+# Допустимые сортировки списка клиентов (по индексированным счетчикам)
+CLIENT_SORT_FIELDS = {
+    'created': '-created_at',
+    'name': 'name',
+    'orders': '-orders_count',
+    'completed': '-completed_count',
+    'revenue': '-lifetime_revenue',
+    'last_order': '-last_order_at',
+}
+
 @login_required
 def client_list(request):
     """Список клиентов"""
+    sort = request.GET.get('sort')
+    if sort not in CLIENT_SORT_FIELDS:
+        sort = 'created'
+    clients = Client.objects.all().order_by(CLIENT_SORT_FIELDS[sort], '-id')
+    
     # Фильтрация по источнику, если указан
     source = request.GET.get('source')
     if source:
-        clients = Client.objects.filter(source=source).order_by('-created_at')
-    else:
-        clients = Client.objects.all().order_by('-created_at')
+        clients = clients.filter(source=source)
+    
+    # Только клиенты с заказами / без заказов
+    has_orders = request.GET.get('has_orders')
+    if has_orders == '1':
+        clients = clients.filter(orders_count__gt=0)
+    elif has_orders == '0':
+        clients = clients.filter(orders_count=0)
     
     # Поиск по имени или телефону
     search_query = request.GET.get('search')
@@ -25,7 +45,7 @@ def client_list(request):
             Q(address__icontains=search_query)
         )
     
-    return render(request, 'clients/list.html', {'clients': clients})
+    return render(request, 'clients/list.html', {'clients': clients, 'sort': sort})
 
 @login_required
 def client_detail(request, pk):
@@ -1,17 +1,26 @@
 from django.contrib import admin
-from .models import Order, OrderItem
+from .models import Order, OrderItem, OrderStatusEvent
 
 class OrderItemInline(admin.TabularInline):
     model = OrderItem
     extra = 1
 
+class OrderStatusEventInline(admin.TabularInline):
+    model = OrderStatusEvent
+    extra = 0
+    can_delete = False
+    readonly_fields = ('from_status', 'to_status', 'created_at')
+    
+    def has_add_permission(self, request, obj=None):
+        return False
+
 @admin.register(Order)
 class OrderAdmin(admin.ModelAdmin):
     list_display = ('id', 'client', 'manager', 'status', 'total_cost', 'created_at', 'completed_at')
     list_filter = ('status', 'manager', 'created_at')
     search_fields = ('client__name', 'id')
     readonly_fields = ('total_cost',)
-    inlines = [OrderItemInline]
+    inlines = [OrderItemInline, OrderStatusEventInline]
     filter_horizontal = ('installers',)
 
 @admin.register(OrderItem)
@@ -0,0 +1,57 @@
+# Generated by Django 5.2.1 on 2026-10-19 12:06
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def backfill_status_events(apps, schema_editor):
+    """
+    Начальная история для существующих заказов.
+    Время перехода в 'in_progress' не сохранялось, поэтому оно
+    приравнивается к дате создания заказа.
+    """
+    Order = apps.get_model('orders', 'Order')
+    OrderStatusEvent = apps.get_model('orders', 'OrderStatusEvent')
+
+    events = []
+    for order_id, status, created_at, completed_at in Order.objects.values_list(
+        'id', 'status', 'created_at', 'completed_at'
+    ).iterator():
+        events.append(OrderStatusEvent(
+            order_id=order_id, from_status=None, to_status='new', created_at=created_at
+        ))
+        if status != 'new':
+            events.append(OrderStatusEvent(
+                order_id=order_id, from_status='new', to_status=status,
+                created_at=(completed_at if status == 'completed' and completed_at else created_at),
+            ))
+
+    OrderStatusEvent.objects.bulk_create(events, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderStatusEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('from_status', models.CharField(blank=True, choices=[('new', 'Новый'), ('in_progress', 'В работе'), ('completed', 'Завершен')], max_length=15, null=True, verbose_name='Предыдущий статус')),
+                ('to_status', models.CharField(choices=[('new', 'Новый'), ('in_progress', 'В работе'), ('completed', 'Завершен')], max_length=15, verbose_name='Новый статус')),
+                ('created_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now, verbose_name='Время перехода')),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='status_events', to='orders.order', verbose_name='Заказ')),
+            ],
+            options={
+                'verbose_name': 'Изменение статуса заказа',
+                'verbose_name_plural': 'История статусов заказов',
+                'ordering': ['order', 'created_at', 'id'],
+                'indexes': [models.Index(fields=['order', 'created_at'], name='orders_orde_order_i_1e3f4d_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_status_events, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,7 @@
 from django.db import models
 from django.db.models.signals import post_save
 from django.dispatch import receiver
+from django.utils import timezone
 from user_accounts.models import User  # Исправлено с accounts.models
 from customer_clients.models import Client  # Исправлено с clients.models
 from services.models import Service
@@ -41,6 +42,24 @@ class OrderItem(models.Model):
         verbose_name = "Позиция заказа"
         verbose_name_plural = "Позиции заказа"
 
+class OrderStatusEvent(models.Model):
+    """Журнал переходов статуса заказа (только добавление записей)"""
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name="status_events", verbose_name="Заказ")
+    from_status = models.CharField(max_length=15, choices=Order.STATUS_CHOICES, null=True, blank=True, verbose_name="Предыдущий статус")
+    to_status = models.CharField(max_length=15, choices=Order.STATUS_CHOICES, verbose_name="Новый статус")
+    created_at = models.DateTimeField(default=timezone.now, db_index=True, verbose_name="Время перехода")
+    
+    def __str__(self):
+        return f"Заказ #{self.order_id}: {self.from_status or '-'} → {self.to_status}"
+    
+    class Meta:
+        verbose_name = "Изменение статуса заказа"
+        verbose_name_plural = "История статусов заказов"
+        ordering = ['order', 'created_at', 'id']
+        indexes = [
+            models.Index(fields=['order', 'created_at']),
+        ]
+
 @receiver(post_save, sender=OrderItem)
 def update_order_total(sender, instance, **kwargs):
     order = instance.order
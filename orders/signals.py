@@ -1,21 +1,47 @@
 # orders/signals.py
-from django.db.models.signals import post_save, pre_save
+from django.db.models import Case, F, Value, When
+from django.db.models.signals import post_save, pre_save, post_delete
 from django.dispatch import receiver
 from django.utils import timezone
-from .models import Order
+from .models import Order, OrderStatusEvent
 from finance.models import Transaction
+from customer_clients.models import Client
 
 @receiver(pre_save, sender=Order)
-def track_order_status_change(sender, instance, **kwargs):
+def track_order_status_change(sender, instance, update_fields=None, **kwargs):
     """Отслеживаем изменение статуса заказа"""
+    if update_fields is not None and 'status' not in update_fields:
+        # Частичное сохранение без статуса (например, completed_at из сигнала ниже)
+        # не должно затирать исходный статус для остальных обработчиков
+        return
+
+    instance._old_status = None
+    instance._old_total_cost = None
+    instance._old_client_id = None
+
     if instance.pk:  # Если заказ уже существует
-        try:
-            old_instance = Order.objects.get(pk=instance.pk)
-            instance._old_status = old_instance.status
-        except Order.DoesNotExist:
-            instance._old_status = None
-    else:
-        instance._old_status = None
+        old_values = Order.objects.filter(pk=instance.pk).values('status', 'total_cost', 'client_id').first()
+        if old_values:
+            instance._old_status = old_values['status']
+            instance._old_total_cost = old_values['total_cost']
+            instance._old_client_id = old_values['client_id']
+
+@receiver(post_save, sender=Order)
+def record_status_event(sender, instance, created, update_fields=None, **kwargs):
+    """Пишем переход статуса в журнал OrderStatusEvent"""
+    if update_fields is not None and 'status' not in update_fields:
+        return
+
+    old_status = None if created else getattr(instance, '_old_status', None)
+    if not created and (old_status is None or old_status == instance.status):
+        return
+
+    OrderStatusEvent.objects.create(
+        order=instance,
+        from_status=old_status,
+        to_status=instance.status,
+        created_at=instance.created_at if created else timezone.now(),
+    )
 
 @receiver(post_save, sender=Order)
 def create_transaction_on_completion(sender, instance, created, **kwargs):
@@ -77,4 +103,59 @@ def create_expense_transactions_on_completion(sender, instance, created, **kwarg
                         amount=total_cost_price,
                         description=f'Себестоимость заказа #{instance.id} - {instance.client.name}',
                         order=instance
-                    )
\ No newline at end of file
+                    )
+
+@receiver(post_save, sender=Order)
+def update_client_counters(sender, instance, created, update_fields=None, **kwargs):
+    """Инкрементально обновляем счетчики заказов клиента"""
+    if update_fields is not None and not {'status', 'total_cost', 'client'} & set(update_fields):
+        return
+    
+    clients = Client.objects.filter(pk=instance.client_id)
+    is_completed = instance.status == 'completed'
+    
+    if created:
+        created_at = Value(instance.created_at)
+        clients.update(
+            orders_count=F('orders_count') + 1,
+            completed_count=F('completed_count') + (1 if is_completed else 0),
+            lifetime_revenue=F('lifetime_revenue') + (instance.total_cost if is_completed else 0),
+            first_order_at=Case(
+                When(first_order_at__isnull=True, then=created_at),
+                When(first_order_at__gt=instance.created_at, then=created_at),
+                default=F('first_order_at'),
+            ),
+            last_order_at=Case(
+                When(last_order_at__isnull=True, then=created_at),
+                When(last_order_at__lt=instance.created_at, then=created_at),
+                default=F('last_order_at'),
+            ),
+        )
+        return
+    
+    old_client_id = getattr(instance, '_old_client_id', None)
+    if old_client_id and old_client_id != instance.client_id:
+        # Заказ перенесен на другого клиента - пересчитываем обоих
+        Client.refresh_order_counters(Client.objects.filter(pk__in=[old_client_id, instance.client_id]))
+        return
+    
+    was_completed = getattr(instance, '_old_status', None) == 'completed'
+    old_total = getattr(instance, '_old_total_cost', None) or 0
+    
+    if is_completed and not was_completed:
+        clients.update(
+            completed_count=F('completed_count') + 1,
+            lifetime_revenue=F('lifetime_revenue') + instance.total_cost,
+        )
+    elif was_completed and not is_completed:
+        clients.update(
+            completed_count=F('completed_count') - 1,
+            lifetime_revenue=F('lifetime_revenue') - old_total,
+        )
+    elif is_completed and instance.total_cost != old_total:
+        clients.update(lifetime_revenue=F('lifetime_revenue') + (instance.total_cost - old_total))
+
+@receiver(post_delete, sender=Order)
+def refresh_client_counters_on_delete(sender, instance, **kwargs):
+    """При удалении заказа пересчитываем счетчики клиента (first/last меняются)"""
+    Client.refresh_order_counters(Client.objects.filter(pk=instance.client_id))
@@ -1,9 +1,15 @@
 from django.contrib import admin
-from .models import Service
+from .models import Service, ServiceRecommendation
 
 @admin.register(Service)
 class ServiceAdmin(admin.ModelAdmin):
     list_display = ('name', 'category', 'cost_price', 'selling_price', 'created_at')
     list_filter = ('category', 'created_at')
     search_fields = ('name',)
-    date_hierarchy = 'created_at'
\ No newline at end of file
+    date_hierarchy = 'created_at'
+
+@admin.register(ServiceRecommendation)
+class ServiceRecommendationAdmin(admin.ModelAdmin):
+    list_display = ('service', 'recommended', 'rank', 'pair_count', 'confidence', 'lift', 'built_at')
+    list_filter = ('service__category',)
+    search_fields = ('service__name', 'recommended__name')
@@ -3,4 +3,7 @@ from django.apps import AppConfig
 class ServicesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'services'
-    verbose_name = 'Услуги'
\ No newline at end of file
+    verbose_name = 'Услуги'
+
+    def ready(self):
+        import services.signals  # Сброс кэша рекомендаций
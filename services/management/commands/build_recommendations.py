@@ -0,0 +1,27 @@
+# services/management/commands/build_recommendations.py
+from django.core.management.base import BaseCommand
+from services.recommendations import (
+    build_recommendations, DEFAULT_TOP_K, DEFAULT_MIN_PAIR_COUNT, DEFAULT_CHUNK_SIZE
+)
+
+
+class Command(BaseCommand):
+    help = 'Пересчет рекомендаций услуг по совместным покупкам'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top-k', type=int, default=DEFAULT_TOP_K,
+                            help='Количество рекомендаций на услугу')
+        parser.add_argument('--min-count', type=int, default=DEFAULT_MIN_PAIR_COUNT,
+                            help='Минимальное число совместных заказов для пары')
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                            help='Количество заказов в одной порции')
+
+    def handle(self, *args, **options):
+        orders, rows = build_recommendations(
+            top_k=options['top_k'],
+            min_pair_count=options['min_count'],
+            chunk_size=options['chunk_size'],
+        )
+        self.stdout.write(
+            self.style.SUCCESS(f'Рекомендации построены: {orders} заказов, {rows} рекомендаций')
+        )
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.1 on 2026-10-19 12:11
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('services', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ServiceRecommendation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveSmallIntegerField(verbose_name='Позиция')),
+                ('pair_count', models.PositiveIntegerField(verbose_name='Совместных заказов')),
+                ('support', models.FloatField(verbose_name='Поддержка')),
+                ('confidence', models.FloatField(verbose_name='Достоверность')),
+                ('lift', models.FloatField(verbose_name='Лифт')),
+                ('built_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата расчета')),
+                ('recommended', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='services.service', verbose_name='Рекомендуемая услуга')),
+                ('service', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recommendations', to='services.service', verbose_name='Услуга')),
+            ],
+            options={
+                'verbose_name': 'Рекомендация услуги',
+                'verbose_name_plural': 'Рекомендации услуг',
+                'ordering': ['service', 'rank'],
+                'unique_together': {('service', 'recommended')},
+            },
+        ),
+    ]
@@ -20,4 +20,27 @@ class Service(models.Model):
     
     class Meta:
         verbose_name = "Услуга"
-        verbose_name_plural = "Услуги"
\ No newline at end of file
+        verbose_name_plural = "Услуги"
+
+class ServiceRecommendation(models.Model):
+    """
+    Предрассчитанные рекомендации "с этой услугой также покупают".
+    Строится командой build_recommendations по совместным покупкам в заказах.
+    """
+    service = models.ForeignKey(Service, on_delete=models.CASCADE, related_name="recommendations", verbose_name="Услуга")
+    recommended = models.ForeignKey(Service, on_delete=models.CASCADE, related_name="+", verbose_name="Рекомендуемая услуга")
+    rank = models.PositiveSmallIntegerField(verbose_name="Позиция")
+    pair_count = models.PositiveIntegerField(verbose_name="Совместных заказов")
+    support = models.FloatField(verbose_name="Поддержка")
+    confidence = models.FloatField(verbose_name="Достоверность")
+    lift = models.FloatField(verbose_name="Лифт")
+    built_at = models.DateTimeField(auto_now_add=True, verbose_name="Дата расчета")
+    
+    def __str__(self):
+        return f"{self.service} → {self.recommended}"
+    
+    class Meta:
+        verbose_name = "Рекомендация услуги"
+        verbose_name_plural = "Рекомендации услуг"
+        unique_together = ('service', 'recommended')
+        ordering = ['service', 'rank']
@@ -0,0 +1,187 @@
+# services/recommendations.py
+"""
+Рекомендации услуг по совместным покупкам.
+
+Пакетный расчет: корзины заказов читаются порциями, для каждой порции
+строится плотная матрица заказ × услуга (0/1), и матрица совместной
+встречаемости копится как B.T @ B. Диагональ - число заказов с услугой.
+
+    support(A, B)    = n(A, B) / N
+    confidence(A→B)  = n(A, B) / n(A)
+    lift(A→B)        = confidence(A→B) / (n(B) / N)
+
+Для каждой услуги сохраняются top-k рекомендаций в ServiceRecommendation,
+готовый словарь для модального окна заказа кладется в кэш.
+Во время запроса ничего не считается.
+
+Ключ кэша включает время последнего расчета (built_at) из базы, поэтому
+пересчет в отдельном процессе (build_recommendations) виден всем воркерам
+и при кэше в памяти процесса. Изменения услуг сбрасывают кэш явно, а
+запись живет не дольше CACHE_TIMEOUT.
+"""
+import numpy as np
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Max
+
+from orders.models import OrderItem
+from .models import Service, ServiceRecommendation
+
+CACHE_KEY = 'services:recommendations'
+CACHE_TIMEOUT = 300  # секунд
+DEFAULT_TOP_K = 5
+DEFAULT_MIN_PAIR_COUNT = 2
+DEFAULT_CHUNK_SIZE = 5000
+
+
+def _baskets(chunk_size):
+    """Порции корзин: (индексы заказов в порции, id услуг), без повторов услуги в заказе"""
+    rows = OrderItem.objects.order_by('order_id').values_list('order_id', 'service_id').distinct()
+    order_ids, service_ids = [], []
+    last_order = None
+    orders_in_chunk = 0
+
+    for order_id, service_id in rows.iterator(chunk_size=chunk_size):
+        if order_id != last_order:
+            if orders_in_chunk >= chunk_size:
+                yield order_ids, service_ids
+                order_ids, service_ids, orders_in_chunk = [], [], 0
+            last_order = order_id
+            orders_in_chunk += 1
+        order_ids.append(order_id)
+        service_ids.append(service_id)
+
+    if order_ids:
+        yield order_ids, service_ids
+
+
+def build_cooccurrence(chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Матрица совместной встречаемости услуг.
+    Возвращает (id услуг, матрица [услуга × услуга], число заказов).
+    """
+    service_ids = np.array(sorted(Service.objects.values_list('id', flat=True)), dtype=np.int64)
+    matrix = np.zeros((len(service_ids), len(service_ids)), dtype=np.int64)
+    total_orders = 0
+
+    for order_ids, item_services in _baskets(chunk_size):
+        orders = np.asarray(order_ids, dtype=np.int64)
+        _, rows = np.unique(orders, return_inverse=True)
+        columns = np.searchsorted(service_ids, np.asarray(item_services, dtype=np.int64))
+
+        baskets = np.zeros((rows.max() + 1, len(service_ids)), dtype=np.int32)
+        baskets[rows, columns] = 1
+        matrix += baskets.T @ baskets
+        total_orders += baskets.shape[0]
+
+    return service_ids, matrix, total_orders
+
+
+def score_pairs(matrix, total_orders):
+    """Поддержка, достоверность и лифт для всех пар (A → B)"""
+    counts = np.diag(matrix).astype(np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        support = matrix / total_orders if total_orders else np.zeros(matrix.shape)
+        confidence = np.nan_to_num(matrix / counts[:, None])
+        lift = np.nan_to_num(confidence / (counts[None, :] / total_orders)) if total_orders else np.zeros(matrix.shape)
+    return support, confidence, lift
+
+
+def top_recommendations(matrix, total_orders, top_k=DEFAULT_TOP_K, min_pair_count=DEFAULT_MIN_PAIR_COUNT):
+    """
+    Top-k рекомендаций для каждой услуги: сортировка по достоверности, затем по лифту.
+    Возвращает список (индекс услуги, индекс рекомендации, ранг, n, support, confidence, lift).
+    """
+    support, confidence, lift = score_pairs(matrix, total_orders)
+    eligible = matrix >= min_pair_count
+    np.fill_diagonal(eligible, False)
+
+    result = []
+    for source in np.flatnonzero(eligible.any(axis=1)):
+        candidates = np.flatnonzero(eligible[source])
+        order = np.lexsort((-lift[source, candidates], -confidence[source, candidates]))[:top_k]
+        for rank, target in enumerate(candidates[order], start=1):
+            result.append((
+                int(source), int(target), rank, int(matrix[source, target]),
+                float(support[source, target]), float(confidence[source, target]), float(lift[source, target]),
+            ))
+    return result
+
+
+@transaction.atomic
+def build_recommendations(top_k=DEFAULT_TOP_K, min_pair_count=DEFAULT_MIN_PAIR_COUNT, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Полный пересчет таблицы рекомендаций. Возвращает (число заказов, число рекомендаций)"""
+    service_ids, matrix, total_orders = build_cooccurrence(chunk_size)
+    rows = top_recommendations(matrix, total_orders, top_k, min_pair_count)
+
+    ServiceRecommendation.objects.all().delete()
+    ServiceRecommendation.objects.bulk_create([
+        ServiceRecommendation(
+            service_id=int(service_ids[source]), recommended_id=int(service_ids[target]),
+            rank=rank, pair_count=pair_count, support=support, confidence=confidence, lift=lift,
+        )
+        for source, target, rank, pair_count, support, confidence, lift in rows
+    ], batch_size=1000)
+
+    transaction.on_commit(invalidate_cache)
+    return total_orders, len(rows)
+
+
+def _cache_key():
+    """Ключ кэша текущего расчета: меняется после каждого build_recommendations"""
+    built_at = ServiceRecommendation.objects.aggregate(built_at=Max('built_at'))['built_at']
+    return f'{CACHE_KEY}:{built_at.timestamp() if built_at else "empty"}'
+
+
+def invalidate_cache():
+    cache.delete(_cache_key())
+
+
+def get_recommendations_map():
+    """
+    Словарь {id услуги: [рекомендации]} из кэша.
+    При промахе читается готовая таблица одним запросом.
+    """
+    key = _cache_key()
+    data = cache.get(key)
+    if data is not None:
+        return data
+
+    category_labels = dict(Service.CATEGORY_CHOICES)
+    data = {}
+    for row in ServiceRecommendation.objects.values(
+        'service_id', 'recommended_id', 'recommended__name', 'recommended__category',
+        'recommended__selling_price', 'confidence', 'lift', 'support'
+    ).order_by('service_id', 'rank'):
+        data.setdefault(row['service_id'], []).append({
+            'service_id': row['recommended_id'],
+            'name': row['recommended__name'],
+            'category': row['recommended__category'],
+            'category_display': category_labels.get(row['recommended__category'], row['recommended__category']),
+            'selling_price': str(row['recommended__selling_price']),
+            'confidence': round(row['confidence'], 3),
+            'lift': round(row['lift'], 2),
+            'support': round(row['support'], 4),
+        })
+
+    cache.set(key, data, CACHE_TIMEOUT)
+    return data
+
+
+def suggest_for_services(service_ids, limit=DEFAULT_TOP_K, recommendations=None):
+    """
+    Объединенные рекомендации для набора услуг (например, позиций заказа).
+    Уже выбранные услуги исключаются, при повторе берется лучшая оценка.
+    """
+    recommendations = get_recommendations_map() if recommendations is None else recommendations
+    selected = set(service_ids)
+    best = {}
+    for service_id in selected:
+        for suggestion in recommendations.get(service_id, []):
+            if suggestion['service_id'] in selected:
+                continue
+            current = best.get(suggestion['service_id'])
+            if current is None or (suggestion['confidence'], suggestion['lift']) > (current['confidence'], current['lift']):
+                best[suggestion['service_id']] = suggestion
+
+    return sorted(best.values(), key=lambda item: (-item['confidence'], -item['lift']))[:limit]
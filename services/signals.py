@@ -0,0 +1,12 @@
+# services/signals.py
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import Service
+from .recommendations import invalidate_cache
+
+
+@receiver(post_save, sender=Service)
+@receiver(post_delete, sender=Service)
+def reset_recommendations_cache(sender, **kwargs):
+    """Название и цена услуги входят в кэш рекомендаций"""
+    invalidate_cache()
@@ -0,0 +1,68 @@
+// Живые обновления дашборда через Server-Sent Events
+//
+// Сервер присылает снимок метрик (event: snapshot), затем только дельты.
+// Элементы с атрибутом data-metric="<имя метрики>" обновляются локально,
+// новые заказы добавляются в контейнер data-live="recent-orders".
+
+const CURRENCY_METRICS = ['company_balance', 'income_this_month', 'expenses_this_month'];
+
+const DashboardLive = {
+    metrics: {},
+    source: null,
+
+    connect(url = '/dashboard/stream/') {
+        if (!window.EventSource) return;
+
+        this.source = new EventSource(url);
+
+        this.source.addEventListener('snapshot', (event) => {
+            this.metrics = JSON.parse(event.data);
+            this.render();
+        });
+
+        ['delta', 'order_created', 'order_status', 'transaction'].forEach((type) => {
+            this.source.addEventListener(type, (event) => this.apply(JSON.parse(event.data)));
+        });
+        // EventSource переподключается сам и получает новый снимок
+    },
+
+    apply(message) {
+        Object.entries(message.delta || {}).forEach(([metric, change]) => {
+            this.metrics[metric] = (this.metrics[metric] || 0) + change;
+        });
+        this.render(Object.keys(message.delta || {}));
+
+        if (message.type === 'order_created' && message.order) {
+            this.prependOrder(message.order);
+        }
+    },
+
+    render(changed = null) {
+        const metrics = changed || Object.keys(this.metrics);
+        metrics.forEach((metric) => {
+            document.querySelectorAll(`[data-metric="${metric}"]`).forEach((element) => {
+                const value = this.metrics[metric];
+                element.textContent = CURRENCY_METRICS.includes(metric)
+                    ? NumberUtils.formatCurrency(value)
+                    : value;
+            });
+        });
+    },
+
+    prependOrder(order) {
+        const container = document.querySelector('[data-live="recent-orders"]');
+        if (!container) return;
+
+        const row = document.createElement('div');
+        row.className = 'recent-order';
+        row.textContent = `#${order.id} ${order.client_name} — ${NumberUtils.formatCurrency(order.total_cost)}`;
+        container.prepend(row);
+
+        // Держим в списке только последние 5 заказов, как при полной загрузке
+        while (container.children.length > 5) {
+            container.lastElementChild.remove();
+        }
+    }
+};
+
+window.DashboardLive = DashboardLive;